@@ -7,22 +7,38 @@ Invoked by Claw when user says "Betty, <task>".
 """
 
 import json
+import re
 import sys
 from pathlib import Path
 
 # Add workspace to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from betty_router import TaskRouter, Route
+from specialist_pool import WorkerPoolManager
+from hedge_scan_stream import HEDGE_TEST_SCRIPT, SCAN_TIMEOUT, format_event, run_scan
+from task_queue import (PRIORITIES, PRIORITY_INTERACTIVE, TASK_TIMEOUT, TaskFailed, TaskQueue,
+                        concurrency_limits)
+from betty_tracing import RECORDER, format_trace, span, trace, traced
+
 # Configuration
 BETTY_CONFIG = Path(__file__).parent / "betty_config.json"
-HEDGE_TEST_SCRIPT = "/home/luxinterior/.openclaw/workspace/hedge_test"
+SCAN_INTENT = "scan_markets"    # the only hedge intent run as a hedge_test scan; others go to HedgeSpecialist
 
 class Betty:
     """Orchestrator that routes tasks to specialists."""
 
-    def __init__(self):
+    def __init__(self, serve_all: bool = False):
         self.load_config()
-
+        # Warm specialist workers, spawned on first use and reused afterwards
+        self.pools = WorkerPoolManager(self.specialists)
+        self.scan_script = HEDGE_TEST_SCRIPT
+        # Shared queue: priorities, per-specialist limits, identical tasks coalesced.
+        # Only the daemon (serve_all) runs tasks other processes submitted.
+        self.queue = TaskQueue({"execute": self._run_queued}, concurrency_limits(self.specialists),
+                               serve_all=serve_all)
+
+    @traced("load_config")
     def load_config(self):
         """Load personality and routing config."""
         if BETTY_CONFIG.exists():
@@ -35,6 +51,7 @@ class Betty:
                     self.acknowledgments = config["acknowledgments"]
                     self.specialists = config["specialists"]
                     self.examples = config["examples"]
+                    self.router = TaskRouter(self.specialists)
             except Exception as e:
                 print(f"⚠️  Could not load Betty config: {e}")
                 self.fallback_config()
@@ -67,81 +84,114 @@ class Betty:
                 "keywords": ["code", "review", "bug", "quality", "refactor", "test"],
             }
         }
+        self.router = TaskRouter(self.specialists)
 
-    def route_task(self, task: str) -> tuple[str, str]:
+    def route_task(self, task: str, route: Route = None) -> tuple[str, str]:
         """Route task to appropriate specialist.
         Returns: (specialist_name, response)
         """
-        task_lower = task.lower()
+        with span("route_task") as current:
+            route = route or self.router.route(task)
+            current.set(specialist=route.specialist, intent=route.intent)
 
-        # Route to hedge specialist
-        for label, spec in self.specialists.items():
-            if any(keyword in task_lower for keyword in spec["keywords"]):
-                return spec["name"], f"{self.emoji} {self.acknowledgments['routing']} {spec['name']}"
+        if route.specialist:
+            return route.name, f"{self.emoji} {self.acknowledgments['routing']} {route.name}"
 
         # Unknown
         return None, f"{self.emoji} {self.acknowledgments['unknown']}"
 
-    def execute_task(self, task: str) -> str:
-        """Execute a task by delegating to appropriate specialist."""
-        task_lower = task.lower()
+    def execute_task(self, task: str, route: Route = None, on_progress=None,
+                     priority: int = PRIORITY_INTERACTIVE, timeout: float = TASK_TIMEOUT) -> str:
+        """Execute a task through the shared task queue.
+
+        Identical in-flight tasks share one execution and result; interactive
+        tasks run before scheduled ones. on_progress(event) receives live
+        hedge scan progress events; timeout bounds the wait and the run.
+        """
+        route = route or self.router.route(task)
+        with span("execute_task", specialist=route.specialist, intent=route.intent):
+            if not route.specialist:
+                return self.run_task(task, route, on_progress, timeout)
+
+            try:
+                return self.queue.execute("execute", route.specialist, task, priority,
+                                          dedupe_key=self.dedupe_key(task, route), on_progress=on_progress,
+                                          timeout=timeout)
+            except (TaskFailed, TimeoutError) as e:
+                return f"❌ Error: {e}"
+
+    def dedupe_key(self, task: str, route: Route) -> str:
+        """Tasks with the same key coalesce; every hedge scan of N markets is the same scan."""
+        if route.specialist == "hedge-specialist" and route.intent == SCAN_INTENT:
+            return f"hedge-specialist:{SCAN_INTENT}:{self.scan_limit(task)}"
+        return f"{route.specialist}:{route.intent}:{' '.join(task.lower().split())}"
+
+    @staticmethod
+    def scan_limit(task: str) -> str:
+        limit_match = re.search(r'(\d+)', task)
+        return limit_match.group(1) if limit_match else "20"
+
+    def _run_queued(self, specialist: str, task: str, on_progress=None, timeout: float = None) -> str:
+        return self.run_task(task, self.router.route(task), on_progress, timeout)
 
-        # Hedge-related tasks
-        if any(k in task_lower for k in ["scan", "hedge", "market", "trading", "polymarket"]):
-            import subprocess
+    def run_task(self, task: str, route: Route, on_progress=None, timeout: float = None) -> str:
+        """Run a task on its specialist right now (the queue calls this).
 
-            # Parse for scan limit
-            import re
-            limit_match = re.search(r'(\d+)', task)
-            limit = limit_match.group(1) if limit_match else "20"
+        timeout caps the specialist's run; scans never exceed SCAN_TIMEOUT.
+        """
+        with span("run_task", specialist=route.specialist, intent=route.intent):
+            return self._run_specialist(task, route, on_progress, timeout)
+
+    def _run_specialist(self, task: str, route: Route, on_progress=None, timeout: float = None) -> str:
+        # Hedge scans
+        if route.specialist == "hedge-specialist" and route.intent == SCAN_INTENT:
+            limit = self.scan_limit(task)
+            scan_timeout = min(SCAN_TIMEOUT, timeout or SCAN_TIMEOUT)
 
             try:
-                result = subprocess.run(
-                    [HEDGE_TEST_SCRIPT, "scan", "--limit", limit],
-                    capture_output=True,
-                    text=True,
-                    timeout=300
+                result = run_scan(
+                    [self.scan_script, "scan", "--limit", limit],
+                    on_event=on_progress,
+                    timeout=scan_timeout
                 )
 
-                if result.returncode == 0:
-                    return f"✅ Scan complete!\n\n{result.stdout[-500:]}"
+                if result.timed_out:
+                    return f"❌ Scan timed out after {scan_timeout:.0f}s:\n{result.tail[-500:]}"
+                elif result.returncode == 0:
+                    return f"✅ Scan complete!\n\n{result.tail[-500:]}"
                 else:
-                    return f"❌ Scan failed:\n{result.stderr}"
+                    return f"❌ Scan failed:\n{result.tail}"
             except Exception as e:
                 return f"❌ Error: {e}"
 
+        # Other hedge intents (find, analyze, monitor, backtest) run in HedgeSpecialist.handle_task
+        elif route.specialist == "hedge-specialist":
+            try:
+                return self.pools.submit("hedge-specialist", task, timeout)
+            except Exception as e:
+                return f"❌ Hedge specialist error: {e}"
+
         # Research tasks
-        elif any(k in task_lower for k in ["research", "find", "search", "investigate", "competitor"]):
-            import subprocess
+        elif route.specialist == "researcher":
             try:
-                researcher_path = Path(__file__).parent / "researcher.py"
-                result = subprocess.run(
-                    ["python3", str(researcher_path), "--task", task],
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-                return result.stdout
+                return self.pools.submit("researcher", task, timeout)
             except Exception as e:
                 return f"❌ Research error: {e}"
 
         # Code review tasks
-        elif any(k in task_lower for k in ["code", "review", "bug", "quality", "debug", "fix"]):
-            import subprocess
+        elif route.specialist == "code-reviewer":
             try:
-                reviewer_path = Path(__file__).parent / "code_reviewer.py"
-                result = subprocess.run(
-                    ["python3", str(reviewer_path), "--task", task],
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-                return result.stdout
+                return self.pools.submit("code-reviewer", task, timeout)
             except Exception as e:
                 return f"❌ Code review error: {e}"
 
         return f"{self.emoji} Task received: '{task}'\n\nRouting..."
 
+    def close(self):
+        """Stop the queue dispatcher and warm specialist workers."""
+        self.queue.close()
+        self.pools.close()
+
     def show_help(self) -> str:
         """Show Betty's capabilities."""
         msg = f"{self.emoji} **{self.name} - Orchestrator**\n\n"
@@ -164,19 +214,40 @@ def main():
 
     parser = argparse.ArgumentParser(description="Betty - Orchestrator Agent")
     parser.add_argument("--task", help="Task to orchestrate")
+    parser.add_argument("--follow", action="store_true", help="Print hedge scan progress live")
+    parser.add_argument("--priority", choices=list(PRIORITIES), default="interactive")
+    parser.add_argument("--trace", action="store_true", help="Print where the time went, per stage")
     args = parser.parse_args()
 
-    betty = Betty()
+    with trace() as trace_id:
+        run(args)
+    if args.trace:
+        print(f"\n⏱️  Trace {trace_id}")
+        print(format_trace(RECORDER.spans(trace_id)))
 
-    if args.task:
-        # Route and execute
-        specialist, routing_msg = betty.route_task(args.task)
-        response = betty.execute_task(args.task)
 
-        print(f"{routing_msg}\n{response}")
-    else:
-        # Show help
-        print(betty.show_help())
+def run(args):
+    betty = Betty()
+    try:
+        if args.task:
+            # Route once, then execute
+            route = betty.router.route(args.task)
+            specialist, routing_msg = betty.route_task(args.task, route)
+
+            on_progress = None
+            if args.follow:
+                print(routing_msg, flush=True)
+                on_progress = lambda event: print(format_event(event), flush=True)
+            response = betty.execute_task(args.task, route, on_progress=on_progress,
+                                          priority=PRIORITIES[args.priority])
+
+            print(response if args.follow else f"{routing_msg}\n{response}")
+        else:
+            # Show help
+            print(betty.show_help())
+    finally:
+        # Stop dispatching so this short-lived process doesn't claim other tasks on its way out
+        betty.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Betty benchmark suite.
+
+Reproducible, offline measurements of:
+
+- routing:    Betty.route_task throughput over a corpus of real task strings
+- startup:    wall time of each entry point, from exec to exit
+- delegation: execute_task latency through the task queue and warm workers,
+              with stand-in specialist scripts doing no work (so the number
+              is pure orchestration overhead); cold start included
+- hedgedb:    the hedge_summary queries behind check_hedges.py and
+              hedge_status_report.py on synthetic databases of 1k/100k/1M
+              hedges, live, indexed and materialized
+
+Results are JSON. Save one as a baseline and compare later runs against it;
+compare exits non-zero when a metric regressed beyond the threshold.
+
+Usage:
+    python3 betty_bench.py run --save baseline
+    python3 betty_bench.py run --suite routing delegation --compare baseline
+    python3 betty_bench.py run --suite hedgedb --sizes 1000 100000 1000000
+    python3 betty_bench.py compare baseline current
+"""
+
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+BETTY_DIR = Path(__file__).parent
+BASELINE_DIR = BETTY_DIR / "benchmarks"
+BENCH_DIR = Path(os.environ.get("BETTY_BENCH_DIR", "/tmp/betty_bench"))   # synthetic DBs, stand-ins
+
+SUITES = ("routing", "startup", "delegation", "hedgedb")
+HEDGE_SIZES = (1_000, 100_000, 1_000_000)
+SYNTHETIC_VERSION = 1       # bump when the synthetic schema or data changes
+SEED = 1337
+
+DEFAULT_THRESHOLD = 0.10    # relative change that counts as a regression
+MIN_DELTA_MS = 0.05         # ignore smaller absolute changes (timer noise)
+
+# Real task strings from Discord, cron and the config examples
+TASK_CORPUS = (
+    "Scan top 20 markets for hedges",
+    "scan 50 markets min coverage 0.85 tier 2",
+    "scan trending 30",
+    "find hedges with 95% coverage",
+    "monitor active hedges",
+    "check hedge status",
+    "analyze my positions and P&L",
+    "research Polymarket competitors",
+    "research prediction market fees",
+    "find information about Kalshi regulation",
+    "review my trading bot code in /bot/discord_hedge_bot.py",
+    "check if there are bugs in this script",
+    "review code quality of betty.py",
+    "suggest improvements for hedge_scheduler.py",
+    "Analyze market trends",
+    "what's the weather like",
+)
+
+# Entry point -> arguments; each run must exit on its own
+ENTRY_POINTS = {
+    "interpreter": ["-c", "pass"],
+    "betty_client": ["betty_client.py", "--help"],
+    "betty": ["betty.py"],
+    "betty_router": ["betty_router.py", "scan 20 markets"],
+    "betty_daemon": ["betty_daemon.py", "--help"],
+    "task_queue": ["task_queue.py", "stats"],
+    "code_analysis": ["code_analysis.py", "rules"],
+    "hedge_summary": ["hedge_summary.py", "--help"],
+}
+
+DELEGATION_TASKS = {
+    "hedge-specialist": "scan 20 markets",
+    "researcher": "research prediction market fees",
+    "code-reviewer": "review code betty.py",
+}
+
+# Stand-in specialist worker: speaks specialist_worker.py's protocol, does nothing
+STUB_WORKER = '''\
+import json, os, sys
+print(json.dumps({"type": "ready", "pid": os.getpid()}), flush=True)
+for line in sys.stdin:
+    request = json.loads(line)
+    result = "pong" if request.get("type") == "ping" else "stub: " + request.get("task", "")
+    print(json.dumps({"id": request.get("id"), "ok": True, "result": result}), flush=True)
+'''
+
+# Stand-in for the hedge_test scan script: the progress lines hedge_scan_stream parses
+STUB_SCAN = f'''\
+#!{sys.executable}
+print("Market 1/2")
+print("Market 2/2")
+print("Markets scanned: 2")
+print("Hedges logged: 0")
+'''
+
+HEDGE_SCHEMA = """
+CREATE TABLE hedges (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target_market_id TEXT,
+    cover_market_id TEXT,
+    tier INTEGER,
+    coverage REAL,
+    total_real_cost REAL,
+    status TEXT,
+    created_at TEXT
+);
+CREATE TABLE scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_timestamp TEXT,
+    markets_scanned INTEGER,
+    hedges_found INTEGER
+);
+"""
+
+
+class Comparison(NamedTuple):
+    name: str
+    unit: str
+    baseline: float
+    current: float
+    change: float      # relative, positive = worse
+    status: str        # "regression", "improvement", "ok", "new" or "missing"
+
+
+def _metric(unit: str, values: list, better: str = "lower") -> dict:
+    """Median plus spread of repeated measurements."""
+    values = sorted(values)
+    return {
+        "unit": unit,
+        "better": better,
+        "value": round(statistics.median(values), 4),
+        "min": round(values[0], 4),
+        "p95": round(values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))], 4),
+        "runs": len(values),
+    }
+
+
+def _ms(samples: list) -> dict:
+    return _metric("ms", [sample * 1000 for sample in samples])
+
+
+def _time(fn, repeat: int, warmup: int = 1) -> list:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _bench_env(workdir: Path) -> dict:
+    """Keep benchmark runs away from the live queue, metrics and caches."""
+    return dict(
+        os.environ,
+        BETTY_QUEUE_DB=str(workdir / "tasks.db"),
+        BETTY_METRICS_DIR=str(workdir),
+        BETTY_SOCKET=str(workdir / "betty.sock"),
+        CODE_REVIEW_CACHE=str(workdir / "review_cache.db"),
+        BETTY_SEARCH_BACKEND="stub",
+    )
+
+
+# --- Suites -----------------------------------------------------------------
+
+def bench_routing(quick: bool = False, **_) -> dict:
+    """route_task throughput over the task corpus, plus the bare router."""
+    from betty import Betty
+
+    betty = Betty()
+    iterations = 2_000 if quick else 20_000
+    corpus = TASK_CORPUS
+
+    def route_tasks():
+        for i in range(iterations):
+            betty.route_task(corpus[i % len(corpus)])
+
+    def route_only():
+        for i in range(iterations):
+            betty.router.route(corpus[i % len(corpus)])
+
+    metrics = {}
+    for name, fn in (("routing.route_task", route_tasks), ("routing.router", route_only)):
+        samples = _time(fn, repeat=3 if quick else 5)
+        metrics[name] = _metric("ops/s", [iterations / sample for sample in samples], better="higher")
+    betty.close()
+    return metrics
+
+
+def bench_startup(quick: bool = False, workdir: Path = None, **_) -> dict:
+    """Exec-to-exit wall time of every entry point."""
+    env = _bench_env(workdir)
+    repeat = 3 if quick else 10
+    metrics = {}
+    for name, args in ENTRY_POINTS.items():
+        command = [sys.executable] + args
+
+        def run():
+            subprocess.run(command, cwd=BETTY_DIR, env=env, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=60, check=True)
+
+        try:
+            metrics[f"startup.{name}"] = _ms(_time(run, repeat))
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            print(f"⚠️  startup.{name} skipped: {e}", file=sys.stderr)
+    return metrics
+
+
+def bench_delegation(quick: bool = False, workdir: Path = None, **_) -> dict:
+    """execute_task end to end with stand-in specialists; run_task shows the queue's share."""
+    from betty import Betty
+    from specialist_pool import WorkerPoolManager
+    from task_queue import TaskQueue, concurrency_limits
+
+    stub_worker = workdir / "stub_worker.py"
+    stub_worker.write_text(STUB_WORKER)
+    stub_scan = workdir / "stub_scan"
+    stub_scan.write_text(STUB_SCAN)
+    stub_scan.chmod(0o755)
+
+    betty = Betty()
+    betty.queue.close()
+    betty.pools.close()
+    betty.queue = TaskQueue({"execute": betty._run_queued}, concurrency_limits(betty.specialists),
+                            path=workdir / "delegation_tasks.db")
+    betty.pools = WorkerPoolManager(betty.specialists, script=stub_worker)
+    betty.scan_script = str(stub_scan)
+
+    repeat = 10 if quick else 50
+    metrics = {}
+    try:
+        for label, task in DELEGATION_TASKS.items():
+            route = betty.router.route(task)
+            cold = _time(lambda: betty.execute_task(task, route), repeat=1, warmup=0)
+            metrics[f"delegation.{label}.cold"] = _ms(cold)
+            metrics[f"delegation.{label}.execute_task"] = _ms(
+                _time(lambda: betty.execute_task(task, route), repeat))
+            metrics[f"delegation.{label}.run_task"] = _ms(
+                _time(lambda: betty.run_task(task, route), repeat))
+    finally:
+        betty.close()
+    return metrics
+
+
+def synthetic_hedge_db(size: int) -> Path:
+    """Cached synthetic hedge database with `size` hedges (about 20% active)."""
+    path = BENCH_DIR / f"hedges_{size}_v{SYNTHETIC_VERSION}.db"
+    if path.exists():
+        return path
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+
+    rng = random.Random(SEED + size)
+    markets = [str(500_000 + i) for i in range(max(100, size // 20))]
+    statuses = ["active"] + ["closed"] * 3 + ["expired"]
+
+    def rows():
+        for i in range(size):
+            day = 1 + i * 28 // size
+            yield (
+                rng.choice(markets), rng.choice(markets), rng.choice((1, 1, 2, 2, 2, 3)),
+                round(rng.uniform(0.80, 0.99), 4), round(rng.uniform(5, 500), 2),
+                rng.choice(statuses), f"2026-02-{day:02d}T{i % 24:02d}:00:00Z",
+            )
+
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    conn = sqlite3.connect(tmp)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(HEDGE_SCHEMA)
+    with conn:
+        conn.executemany(
+            "INSERT INTO hedges (target_market_id, cover_market_id, tier, coverage, total_real_cost, "
+            "status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows(),
+        )
+        conn.executemany(
+            "INSERT INTO scans (scan_timestamp, markets_scanned, hedges_found) VALUES (?, ?, ?)",
+            ((f"2026-02-{1 + i // 24:02d}T{i % 24:02d}:00:00Z", 100, rng.randint(0, 20)) for i in range(24 * 28)),
+        )
+    conn.close()
+    os.replace(tmp, path)
+    return path
+
+
+def _reset_hedge_db(conn: sqlite3.Connection):
+    """Back to the bare tables: no summary index, no materialized summary."""
+    from hedge_summary import drop_materialized
+
+    drop_materialized(conn)
+    conn.execute("DROP INDEX IF EXISTS idx_hedges_status_summary")
+
+
+def bench_hedgedb(quick: bool = False, sizes=HEDGE_SIZES, **_) -> dict:
+    """hedge_summary queries on synthetic DBs: live scan, covering index, materialized."""
+    from hedge_summary import ensure_indexes, latest_scan, list_active, materialize, summarize
+    from price_refresh import active_market_ids
+
+    metrics = {}
+    for size in sizes:
+        started = time.monotonic()
+        path = synthetic_hedge_db(size)
+        print(f"   hedgedb: {size:,} hedges ready ({time.monotonic() - started:.1f}s)", file=sys.stderr)
+        repeat = max(3, min(50, 5_000_000 // size))
+        if quick:
+            repeat = max(1, repeat // 5)
+
+        conn = sqlite3.connect(path)
+        try:
+            _reset_hedge_db(conn)
+            prefix = f"hedgedb.{size}"
+            metrics[f"{prefix}.summarize_live"] = _ms(_time(lambda: summarize(conn), repeat))
+
+            ensure_indexes(conn)
+            metrics[f"{prefix}.summarize_indexed"] = _ms(_time(lambda: summarize(conn), repeat))
+            metrics[f"{prefix}.list_active"] = _ms(_time(lambda: list_active(conn, 20), repeat))
+            metrics[f"{prefix}.latest_scan"] = _ms(_time(lambda: latest_scan(conn), repeat))
+            metrics[f"{prefix}.active_market_ids"] = _ms(
+                _time(lambda: active_market_ids(conn), repeat))
+
+            materialize(conn)
+            metrics[f"{prefix}.summarize_materialized"] = _ms(_time(lambda: summarize(conn), repeat))
+        finally:
+            _reset_hedge_db(conn)
+            conn.close()
+    return metrics
+
+
+SUITE_FUNCTIONS = {
+    "routing": bench_routing,
+    "startup": bench_startup,
+    "delegation": bench_delegation,
+    "hedgedb": bench_hedgedb,
+}
+
+
+# --- Running and comparing --------------------------------------------------
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BETTY_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+
+
+def run(suites=SUITES, quick: bool = False, sizes=HEDGE_SIZES) -> dict:
+    """Run the chosen suites; returns the results document."""
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+        "suites": list(suites),
+        "metrics": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="betty_bench_") as workdir:
+        for suite in suites:
+            started = time.monotonic()
+            print(f"⏱️  {suite}...", file=sys.stderr, flush=True)
+            results["metrics"].update(SUITE_FUNCTIONS[suite](quick=quick, workdir=Path(workdir), sizes=sizes))
+            print(f"   {suite} done in {time.monotonic() - started:.1f}s", file=sys.stderr, flush=True)
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """Compare each metric with its baseline; lower-is-better and higher-is-better aware."""
+    rows = []
+    base_metrics, cur_metrics = baseline["metrics"], current["metrics"]
+    for name in sorted(set(base_metrics) | set(cur_metrics)):
+        base, cur = base_metrics.get(name), cur_metrics.get(name)
+        if base is None or cur is None:
+            known = cur or base
+            rows.append(Comparison(name, known["unit"], base and base["value"], cur and cur["value"], 0.0,
+                                   "new" if base is None else "missing"))
+            continue
+
+        if not base["value"]:
+            change = 0.0
+        elif cur.get("better", "lower") == "higher":
+            change = (base["value"] - cur["value"]) / base["value"]
+        else:
+            change = (cur["value"] - base["value"]) / base["value"]
+
+        noise = cur["unit"] == "ms" and abs(cur["value"] - base["value"]) < MIN_DELTA_MS
+        if change > threshold and not noise:
+            status = "regression"
+        elif change < -threshold and not noise:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append(Comparison(name, cur["unit"], base["value"], cur["value"], change, status))
+    return rows
+
+
+def format_results(results: dict) -> str:
+    lines = [f"📊 Betty benchmarks ({results['commit'] or 'no commit'}, Python {results['python']}, "
+             f"{results['cpus']} CPUs{', quick' if results['quick'] else ''})", ""]
+    for name, metric in results["metrics"].items():
+        lines.append(f"  {name:<48} {metric['value']:>14,.3f} {metric['unit']:<6} "
+                     f"(min {metric['min']:,.3f}, p95 {metric['p95']:,.3f}, n={metric['runs']})")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: list, threshold: float = DEFAULT_THRESHOLD) -> str:
+    marks = {"regression": "❌", "improvement": "✅", "ok": "  ", "new": "🆕", "missing": "❓"}
+    lines = [f"{'':2} {'metric':<48} {'baseline':>14} {'current':>14} {'change':>8}"]
+    for row in rows:
+        base = "-" if row.baseline is None else f"{row.baseline:,.3f}"
+        cur = "-" if row.current is None else f"{row.current:,.3f}"
+        change = f"{row.change * 100:+.1f}%" if row.status not in ("new", "missing") else ""
+        lines.append(f"{marks[row.status]} {row.name:<48} {base:>14} {cur:>14} {change:>8}")
+    regressions = sum(row.status == "regression" for row in rows)
+    lines.append("")
+    lines.append(f"❌ {regressions} regression(s) beyond {threshold:.0%}" if regressions
+                 else f"✅ No regressions beyond {threshold:.0%}")
+    return "\n".join(lines)
+
+
+def _baseline_path(name: str) -> Path:
+    """A file path, or the name of a baseline saved under benchmarks/."""
+    path = Path(name)
+    return path if path.suffix == ".json" or path.exists() else BASELINE_DIR / f"{name}.json"
+
+
+def load_results(name: str) -> dict:
+    return json.loads(_baseline_path(name).read_text())
+
+
+def save_results(results: dict, name: str) -> Path:
+    path = _baseline_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + "\n")
+    return path
+
+
+def main():
+    """Run benchmark suites, save baselines and compare against them."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Betty benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run benchmark suites")
+    run_parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    run_parser.add_argument("--sizes", nargs="+", type=int, default=list(HEDGE_SIZES),
+                            help="Synthetic hedge counts for the hedgedb suite")
+    run_parser.add_argument("--quick", action="store_true", help="Fewer iterations (smoke test)")
+    run_parser.add_argument("--save", metavar="NAME", help="Save results as benchmarks/NAME.json (or a path)")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="Compare with a saved baseline")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    run_parser.add_argument("--json", action="store_true")
+
+    compare_parser = sub.add_parser("compare", help="Compare two saved result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        rows = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+        print(format_comparison(rows, args.threshold))
+        sys.exit(1 if any(row.status == "regression" for row in rows) else 0)
+
+    results = run(args.suite, args.quick, args.sizes)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    if args.save:
+        print(f"\n💾 Saved {save_results(results, args.save)}")
+    if args.compare:
+        rows = compare(load_results(args.compare), results, args.threshold)
+        print()
+        print(format_comparison(rows, args.threshold))
+        sys.exit(1 if any(row.status == "regression" for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Betty Client - thin front end for the resident Betty daemon.
+
+Imports nothing beyond the standard library basics so a CLI invocation or
+Discord command pays only interpreter start-up plus one socket round-trip.
+When no daemon is listening, the CLI falls back to running Betty in-process.
+
+Usage:
+  python3 betty_client.py "scan 20 markets"
+  python3 betty_client.py --follow "scan 20 markets"
+  python3 betty_client.py --ping
+
+From the Discord bot:
+  from betty_client import ask
+  reply = ask("research prediction market fees")
+"""
+
+import json
+import os
+import socket
+import sys
+
+SOCKET_PATH = os.environ.get("BETTY_SOCKET", "/tmp/betty.sock")
+# task_queue.TASK_TIMEOUT (same env var; not imported, it pulls in asyncio and sqlite3):
+# a queued task may wait and run that long before the daemon answers
+TASK_TIMEOUT = float(os.environ.get("BETTY_TASK_TIMEOUT", 600))
+CLIENT_TIMEOUT = TASK_TIMEOUT + 60
+
+
+class DaemonUnavailable(ConnectionError):
+    """No Betty daemon is listening on the socket."""
+
+
+class BettyClient:
+    """One persistent connection to the daemon, JSON lines in both directions."""
+
+    def __init__(self, socket_path: str = SOCKET_PATH, timeout: float = CLIENT_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+
+    def _connect(self):
+        if self._sock:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            sock.close()
+            raise DaemonUnavailable(f"Betty daemon not running on {self.socket_path}") from e
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def request(self, message: dict, on_progress=None) -> dict:
+        """Send one request; progress lines go to on_progress, the result is returned."""
+        self._connect()
+        try:
+            self._sock.sendall((json.dumps(message) + "\n").encode())
+            while True:
+                line = self._reader.readline()
+                if not line:
+                    raise ConnectionError("Betty daemon closed the connection")
+                reply = json.loads(line)
+                if reply.get("type") == "progress":
+                    if on_progress:
+                        on_progress(reply["event"])
+                    continue
+                return reply
+        except Exception:
+            self.close()
+            raise
+
+    def ask(self, task: str, on_progress=None, priority: str = "interactive") -> dict:
+        # A caller already inside a trace (cron, a parent Betty) keeps its trace ID
+        return self.request({"task": task, "follow": on_progress is not None, "priority": priority,
+                             "trace_id": os.environ.get("BETTY_TRACE_ID")}, on_progress)
+
+    def ping(self) -> dict:
+        return self.request({"cmd": "ping"})
+
+    def close(self):
+        if self._sock:
+            self._reader.close()
+            self._sock.close()
+            self._sock = self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ask(task: str, socket_path: str = SOCKET_PATH, on_progress=None, priority: str = "interactive") -> str:
+    """Routing message plus response for a task, as the CLI prints it."""
+    with BettyClient(socket_path) as client:
+        reply = client.ask(task, on_progress, priority)
+    if not reply.get("ok"):
+        return f"❌ {reply.get('error', 'Betty daemon error')}"
+    return f"{reply['routing']}\n{reply['response']}"
+
+
+def _run_in_process(task: str, follow: bool, priority: str = "interactive"):
+    """No daemon: cold-start Betty in this process."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from betty import Betty
+    from hedge_scan_stream import format_event
+    from task_queue import PRIORITIES
+
+    betty = Betty()
+    route = betty.router.route(task)
+    _, routing_msg = betty.route_task(task, route)
+    on_progress = (lambda event: print(format_event(event), flush=True)) if follow else None
+    print(routing_msg, flush=True)
+    print(betty.execute_task(task, route, on_progress=on_progress, priority=PRIORITIES[priority]))
+    betty.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Betty client")
+    parser.add_argument("task", nargs="*", help="Task to orchestrate")
+    parser.add_argument("--follow", action="store_true", help="Print hedge scan progress live")
+    parser.add_argument("--ping", action="store_true", help="Check that the daemon is up")
+    parser.add_argument("--priority", choices=["interactive", "scheduled"], default="interactive",
+                        help="Queue priority (cron jobs use scheduled)")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--no-fallback", action="store_true", help="Fail instead of running in-process")
+    args = parser.parse_args()
+
+    if args.ping:
+        try:
+            with BettyClient(args.socket) as client:
+                reply = client.ping()
+        except (DaemonUnavailable, TimeoutError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ Betty daemon pid {reply['pid']}, up {reply['uptime']:.0f}s, {reply['served']} tasks served")
+        return
+
+    if not args.task:
+        parser.error("a task is required")
+    task = " ".join(args.task)
+
+    on_progress = None
+    if args.follow:
+        def on_progress(event):
+            from hedge_scan_stream import format_event
+            print(format_event(event), flush=True)
+
+    try:
+        print(ask(task, args.socket, on_progress, args.priority))
+    except DaemonUnavailable:
+        if args.no_fallback:
+            raise
+        _run_in_process(task, args.follow, args.priority)
+    except TimeoutError:
+        print(f"❌ No reply from the Betty daemon within {CLIENT_TIMEOUT:.0f}s; the task may still be queued "
+              f"(python3 task_queue.py list)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Betty Daemon - resident orchestrator behind a Unix socket.
+
+Keeps config, router and warm specialist workers loaded so a `!betty`
+round-trip costs one socket hop plus the specialist's own work. Clients
+(betty_client.py, the Discord bot) send one JSON line per request:
+
+  → {"task": "scan 20 markets", "follow": true, "priority": "interactive"}
+  ← {"type": "progress", "event": {...}}        (only with follow)
+  ← {"type": "result", "ok": true, "routing": "...", "response": "..."}
+
+  → {"cmd": "ping" | "health" | "queue" | "metrics" | "reload"}
+  ← {"type": "result", "ok": true, ...}
+
+Usage:
+  python3 betty_daemon.py serve
+  python3 betty_daemon.py budget     # measure start-up and round-trip latency
+"""
+
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from betty import Betty
+from betty_router import get_router
+from task_queue import PRIORITIES, concurrency_limits
+from betty_tracing import RECORDER, span, trace
+from betty_client import SOCKET_PATH, BettyClient, DaemonUnavailable
+
+MAX_CONCURRENT_TASKS = 8
+
+# Start-up budget in milliseconds, checked by `betty_daemon.py budget`
+STARTUP_BUDGET_MS = {
+    "interpreter": 60,
+    "client_import": 80,
+    "ping_roundtrip": 5,
+    "cli_roundtrip": 150,
+}
+
+
+class BettyDaemon:
+    """Serves Betty over a Unix socket with everything kept warm."""
+
+    def __init__(self, socket_path: str = SOCKET_PATH, max_tasks: int = MAX_CONCURRENT_TASKS):
+        self.socket_path = socket_path
+        self.betty = Betty(serve_all=True)
+        self.betty.pools.start_health_checks()
+        # Stage latency histograms -> betty.prom / betty_metrics.json
+        self.stop_exporter = RECORDER.start_exporter()
+        self.executor = ThreadPoolExecutor(max_workers=max_tasks, thread_name_prefix="betty-task")
+        self.started = time.time()
+        self.served = 0
+
+    def run_task(self, task: str, on_progress=None, priority: str = "interactive", trace_id: str = None) -> dict:
+        """Route and execute one task through the queue (runs on the executor)."""
+        with trace(trace_id) as trace_id, span("request") as current:
+            route = self.betty.router.route(task)
+            current.set(specialist=route.specialist, intent=route.intent)
+            _, routing_msg = self.betty.route_task(task, route)
+            response = self.betty.execute_task(task, route, on_progress=on_progress,
+                                               priority=PRIORITIES.get(priority, PRIORITIES["interactive"]))
+        return {"ok": True, "routing": routing_msg, "response": response, "specialist": route.specialist,
+                "trace_id": trace_id}
+
+    def run_command(self, cmd: str) -> dict:
+        if cmd == "ping":
+            return {"ok": True, "pid": os.getpid(), "uptime": time.time() - self.started, "served": self.served}
+        if cmd == "health":
+            return {"ok": True, "pools": self.betty.pools.health_check()}
+        if cmd == "queue":
+            return {"ok": True, "queue": self.betty.queue.metrics()}
+        if cmd == "metrics":
+            return {"ok": True, "metrics": {**RECORDER.snapshot(), "recent": []}}
+        if cmd == "reload":
+            pools = self.betty.pools
+            self.betty.load_config()
+            get_router.cache_clear()
+            self.betty.queue.limits = concurrency_limits(self.betty.specialists)
+            restarted = pools.reload(self.betty.specialists)
+            return {"ok": True, "specialists": list(self.betty.specialists), "restarted_pools": restarted}
+        return {"ok": False, "error": f"Unknown command: {cmd}"}
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+
+        def send(message: dict):
+            writer.write((json.dumps(message) + "\n").encode())
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    send({"type": "result", "ok": False, "error": f"Bad request: {e}"})
+                    continue
+
+                if "cmd" in request:
+                    reply = await loop.run_in_executor(self.executor, self.run_command, request["cmd"])
+                else:
+                    on_progress = None
+                    if request.get("follow"):
+                        # Progress arrives on a worker thread; hand it to the loop
+                        on_progress = lambda event: loop.call_soon_threadsafe(
+                            send, {"type": "progress", "event": event}
+                        )
+                    try:
+                        reply = await loop.run_in_executor(
+                            self.executor, self.run_task, request["task"], on_progress,
+                            request.get("priority", "interactive"), request.get("trace_id")
+                        )
+                    except Exception as e:
+                        reply = {"ok": False, "error": str(e)}
+                    self.served += 1
+
+                send({"type": "result", **reply})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+        print(f"🎭 Betty daemon listening on {self.socket_path}", flush=True)
+        async with server:
+            await stop.wait()
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.betty.close()
+        self.stop_exporter.set()
+        RECORDER.export()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        print("🎭 Betty daemon stopped", flush=True)
+
+
+def _time_command(command: list, runs: int = 5) -> float:
+    """Best-of-N wall time of a command in milliseconds."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, capture_output=True, cwd=Path(__file__).parent, timeout=60)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def measure_budget(socket_path: str = SOCKET_PATH) -> dict:
+    """Measure start-up and round-trip costs against STARTUP_BUDGET_MS."""
+    here = Path(__file__).parent
+    python = sys.executable
+    interpreter = _time_command([python, "-c", "pass"])
+    results = {
+        "interpreter": interpreter,
+        "client_import": _time_command([python, "-c", "import betty_client"]) - interpreter,
+    }
+    # In-process imports of the heavy side, for reference (not budgeted)
+    results["betty_import"] = _time_command([python, "-c", "import betty"]) - interpreter
+
+    client = BettyClient(socket_path)
+    try:
+        client.ping()
+        samples = []
+        for _ in range(20):
+            start = time.perf_counter()
+            client.ping()
+            samples.append(time.perf_counter() - start)
+        results["ping_roundtrip"] = sorted(samples)[len(samples) // 2] * 1000
+        results["cli_roundtrip"] = _time_command([python, str(here / "betty_client.py"), "--ping", "--socket", socket_path])
+    except DaemonUnavailable:
+        pass
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Betty daemon")
+    parser.add_argument("command", choices=["serve", "budget"])
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        asyncio.run(BettyDaemon(args.socket).serve())
+        return
+
+    over = False
+    for name, value in measure_budget(args.socket).items():
+        budget = STARTUP_BUDGET_MS.get(name)
+        if budget is None:
+            print(f"   {name}: {value:.1f} ms")
+        else:
+            ok = value <= budget
+            over = over or not ok
+            print(f"{'✅' if ok else '❌'} {name}: {value:.1f} ms (budget {budget} ms)")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,23 +7,72 @@ Routes requests to appropriate agents and synthesizes results.
 """
 
 import asyncio
+import re
 import sys
+import time
 from pathlib import Path
 
 # Add parent to path for lib imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from dotenv import load_dotenv
-load_dotenv(Path(__file__).parent.parent / ".env")
+from betty_router import get_router
+from task_queue import PRIORITY_INTERACTIVE, TaskQueue, concurrency_limits, default_dedupe_key
+from betty_tracing import span
 
-# Import sessions_spawn for sub-agent management
-# This assumes sessions_spawn is available in the main workspace
-try:
-    from main_workspace.sessions_send import sessions_send
-except ImportError:
-    # Fallback - we're running from polyclaw context
-    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-    from main_workspace.sessions_send import sessions_send
+# Per-branch timeout for fan-out delegation (matches sessions_send default)
+BRANCH_TIMEOUT = 300
+
+# Clause boundaries used to split compound requests into sub-tasks
+CLAUSE_SPLIT = re.compile(r"\s*(?:[,;]|\band then\b|\bthen\b|\band\b|\balso\b|\bplus\b)\s*", re.IGNORECASE)
+
+_SESSIONS_SEND = None
+
+
+def _sessions_send():
+    """Load .env and import sessions_send on first delegation, not at start-up."""
+    global _SESSIONS_SEND
+    if _SESSIONS_SEND is None:
+        from dotenv import load_dotenv
+        load_dotenv(Path(__file__).parent.parent / ".env")
+
+        # This assumes sessions_send is available in the main workspace
+        try:
+            from main_workspace.sessions_send import sessions_send
+        except ImportError:
+            # Fallback - we're running from polyclaw context
+            sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+            from main_workspace.sessions_send import sessions_send
+        _SESSIONS_SEND = sessions_send
+    return _SESSIONS_SEND
+
+
+class ResultSynthesizer:
+    """Merges specialist results as they arrive."""
+
+    def __init__(self, request: str, plan: dict, specialists: dict, on_result=None):
+        self.request = request
+        self.plan = plan
+        self.specialists = specialists
+        self.on_result = on_result
+        self.results = {}
+        self.started = time.monotonic()
+
+    def add(self, label: str, result: str):
+        """Record one branch result and forward it to the live callback."""
+        elapsed = time.monotonic() - self.started
+        self.results[label] = (result, elapsed)
+        if self.on_result:
+            self.on_result(label, result)
+
+    def summary(self) -> str:
+        """Combined response, in plan order."""
+        msg = f"🎭 Fan-out across {len(self.plan)} specialists ({time.monotonic() - self.started:.1f}s)\n"
+        for label, subtask in self.plan.items():
+            spec = self.specialists.get(label, {})
+            result, elapsed = self.results.get(label, ("❌ No result", 0.0))
+            msg += f"\n{spec.get('emoji', '🎭')} **{spec.get('name', label)}** — {subtask} ({elapsed:.1f}s)\n"
+            msg += f"{result}\n"
+        return msg
 
 
 class Betty:
@@ -35,58 +84,111 @@ class Betty:
         self.emoji = "🎭"
         self.description = "Coordinates tasks between specialist agents"
 
-        # Known specialists (will be discovered via sessions_list)
-        self.specialists = {
-            "hedge-specialist": {
-                "label": "hedge-specialist",
-                "name": "Hedge Specialist",
-                "specialty": "Polymarket hedging, market analysis, P&L optimization",
-                "capabilities": ["market-scanning", "hedge-discovery", "position-sizing", "monitoring"]
-            }
-        }
-
-    async def handle_request(self, request: str) -> str:
+        # Known specialists, as configured in betty_config.json
+        self.specialists = get_router().specialists
+        # Delegations share Betty's task queue: identical in-flight requests are sent once
+        self.queue = TaskQueue({"delegate": self._send_queued}, concurrency_limits(self.specialists))
+
+    def plan_fan_out(self, request: str) -> dict:
+        """Split a compound request into one sub-task per specialist.
+
+        Clauses that match no specialist stay attached to the clause before
+        them ("find hedges with 95% coverage and tier 1").
+        Returns: {specialist_label: sub_task}
+        """
+        router = get_router()
+        plan = {}
+        last = None
+        for clause in CLAUSE_SPLIT.split(request):
+            if not clause:
+                continue
+            route = router.route(clause)
+            label = route.specialist or last
+            if label is None:
+                continue
+            plan[label] = f"{plan[label]} and {clause}" if label in plan else clause
+            last = label
+        return plan
+
+    async def fan_out(self, request: str, plan: dict = None, timeout: float = BRANCH_TIMEOUT,
+                      on_result=None) -> str:
+        """Delegate sub-tasks to several specialists at once.
+
+        Branches run concurrently, each under its own timeout, and results
+        are merged as they arrive; on_result(label, result) gets each one live.
+        """
+        plan = plan or self.plan_fan_out(request)
+        synthesizer = ResultSynthesizer(request, plan, self.specialists, on_result)
+
+        async def branch(label, subtask):
+            try:
+                result = await asyncio.wait_for(
+                    self.delegate_to_specialist(label, subtask, timeout), timeout
+                )
+            except asyncio.TimeoutError:
+                result = f"⏱️ Timed out after {timeout}s"
+            return label, result
+
+        for finished in asyncio.as_completed([branch(l, t) for l, t in plan.items()]):
+            label, result = await finished
+            synthesizer.add(label, result)
+
+        return synthesizer.summary()
+
+    async def handle_request(self, request: str, fan_out: bool = True) -> str:
         """Handle a delegation request and return response."""
-        request_lower = request.lower()
+        if fan_out:
+            plan = self.plan_fan_out(request)
+            if len(plan) > 1:
+                return await self.fan_out(request, plan)
 
-        # Route to hedge specialist
-        if any(k in request_lower for k in ["hedge", "market", "polymarket", "trading", "scan"]):
-            return await self.delegate_to_specialist("hedge-specialist", request)
+        route = get_router().route(request)
 
-        # Route to code reviewer
-        elif any(k in request_lower for k in ["code", "review", "bug", "quality", "refactor", "test"]):
-            return await self.delegate_to_specialist("code-reviewer", request)
-
-        # Route to researcher
-        elif any(k in request_lower for k in ["research", "find", "search", "analyze", "competitor"]):
-            return await self.delegate_to_specialist("researcher", request)
+        if route.specialist:
+            return await self.delegate_to_specialist(route.specialist, request)
 
         # Unknown request
         else:
             return f"❌ I'm Betty, the orchestrator. I understand: '{request}'"
 
-    async def delegate_to_specialist(self, specialist_label: str, request: str) -> str:
-        """Delegate a task to a specialist agent."""
+    async def delegate_to_specialist(self, specialist_label: str, request: str,
+                                     timeout: float = BRANCH_TIMEOUT,
+                                     priority: int = PRIORITY_INTERACTIVE) -> str:
+        """Delegate a task to a specialist agent through the task queue."""
         spec = self.specialists.get(specialist_label)
 
         if not spec:
             return f"❌ Unknown specialist: {specialist_label}"
 
+        intent = get_router().intent_for(specialist_label, request)
+        with span("delegate_to_specialist", specialist=specialist_label, intent=intent):
+            try:
+                result = await self.queue.aexecute(
+                    "delegate", specialist_label, request, priority,
+                    dedupe_key=f"delegate:{default_dedupe_key(specialist_label, request)}",
+                    timeout=timeout,
+                )
+                # The specialist's reply; fan-out merges these per branch
+                return result or f"✅ Task delegated to {spec['name']}: {request}"
+
+            except Exception as e:
+                return f"❌ Failed to delegate: {e}"
+
+    def _send_queued(self, specialist_label: str, request: str, on_progress=None,
+                     timeout: float = BRANCH_TIMEOUT) -> str:
+        """Queue handler: send one delegation via sessions_send (on a queue thread)."""
+        spec = self.specialists[specialist_label]
         message = f"Task for {spec['name']}: {request}"
-
-        try:
-            # Send task via sessions_send
-            result = await sessions_send(
+        sessions_send = _sessions_send()
+        with span("sessions_send", specialist=specialist_label,
+                  intent=get_router().intent_for(specialist_label, request)):
+            result = asyncio.run(sessions_send(
                 message=message,
                 label=specialist_label,
-                timeoutSeconds=300,  # 5 minutes
+                timeoutSeconds=timeout,
                 thinking="low"
-            )
-
-            return f"✅ Task delegated to {spec['name']}: {request}"
-
-        except Exception as e:
-            return f"❌ Failed to delegate: {e}"
+            ))
+        return "" if result is None else str(result)
 
     async def main_loop(self):
         """Main coordination loop for Betty."""
@@ -118,9 +220,10 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Betty - Orchestrator Agent")
     parser.add_argument("request", help="Task to delegate to a specialist")
+    parser.add_argument("--no-fan-out", action="store_true", help="Always delegate to a single specialist")
     args = parser.parse_args()
 
     betty = Betty()
 
     # Run the request
-    asyncio.run(betty.handle_request(args.request))
+    print(asyncio.run(betty.handle_request(args.request, fan_out=not args.no_fan_out)))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Betty Router - Compiled keyword routing
+
+Compiles the specialist keywords and sub-intents from betty_config.json into a
+single multi-pattern matcher. One pass over the task text scores every
+specialist and resolves the sub-intent, so Betty, the orchestrator and the
+specialists all agree on where a task goes.
+"""
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+BETTY_CONFIG = Path(__file__).parent / "betty_config.json"
+
+
+class Route(NamedTuple):
+    """Routing decision for one task."""
+    specialist: Optional[str]   # specialist label, e.g. "hedge-specialist"
+    name: Optional[str]         # display name, e.g. "Hedge Specialist"
+    score: int                  # number of distinct specialist keywords matched
+    intent: Optional[str]       # sub-intent, e.g. "scan_markets"
+    keywords: tuple             # matched specialist keywords
+
+
+NO_ROUTE = Route(None, None, 0, None, ())
+
+
+class TaskRouter:
+    """Multi-pattern keyword router compiled from specialist config."""
+
+    def __init__(self, specialists: dict):
+        self.specialists = specialists
+
+        # keyword -> ((label, intent-or-None), ...)
+        targets = {}
+        for label, spec in specialists.items():
+            for keyword in spec.get("keywords", []):
+                targets.setdefault(keyword.lower(), []).append((label, None))
+            for intent, keywords in spec.get("intents", {}).items():
+                for keyword in keywords:
+                    targets.setdefault(keyword.lower(), []).append((label, intent))
+        self._targets = {k: tuple(v) for k, v in targets.items()}
+
+        # Longest keyword wins at each position; shorter keywords that are a
+        # prefix of it are credited through _covers, so matching keeps the
+        # substring semantics of the old `keyword in task_lower` checks.
+        patterns = sorted(self._targets, key=len, reverse=True)
+        self._covers = {
+            p: tuple(k for k in patterns if p.startswith(k)) for p in patterns
+        }
+        alternation = "|".join(re.escape(p) for p in patterns) or "(?!)"
+        self._pattern = re.compile(f"(?=({alternation}))")
+
+    def _scan(self, task: str) -> set:
+        """Return every configured keyword that occurs in the task."""
+        found = set()
+        for match in self._pattern.finditer(task.lower()):
+            found.update(self._covers[match.group(1)])
+        return found
+
+    def _resolve(self, found: set) -> tuple[dict, dict]:
+        """Split matched keywords into per-specialist keyword and intent hits."""
+        keywords, intents = {}, {}
+        for keyword in found:
+            for label, intent in self._targets[keyword]:
+                if intent is None:
+                    keywords.setdefault(label, []).append(keyword)
+                else:
+                    intents.setdefault(label, set()).add(intent)
+        return keywords, intents
+
+    def _first_intent(self, label: str, hits: set) -> Optional[str]:
+        """Pick the first configured intent of a specialist that was hit."""
+        for intent in self.specialists[label].get("intents", {}):
+            if intent in hits:
+                return intent
+        return None
+
+    def rank(self, task: str) -> list[Route]:
+        """Score every matching specialist, best first.
+
+        Ties are broken by the specialist order in the config.
+        """
+        keywords, intents = self._resolve(self._scan(task))
+        routes = []
+        for label, spec in self.specialists.items():
+            if label in keywords:
+                matched = tuple(sorted(keywords[label]))
+                intent = self._first_intent(label, intents.get(label, set()))
+                routes.append(Route(label, spec["name"], len(matched), intent, matched))
+        routes.sort(key=lambda r: -r.score)
+        return routes
+
+    def route(self, task: str) -> Route:
+        """Return the best specialist and sub-intent for a task."""
+        routes = self.rank(task)
+        return routes[0] if routes else NO_ROUTE
+
+    def intent_for(self, label: str, task: str) -> Optional[str]:
+        """Resolve the sub-intent of a task for a given specialist."""
+        if label not in self.specialists:
+            return None
+        _, intents = self._resolve(self._scan(task))
+        return self._first_intent(label, intents.get(label, set()))
+
+
+@lru_cache(maxsize=1)
+def get_router() -> TaskRouter:
+    """Shared router compiled once from betty_config.json."""
+    with open(BETTY_CONFIG) as f:
+        config = json.load(f)
+    return TaskRouter(config["specialists"])
+
+
+def run_benchmark(iterations: int = 20000, threads: int = 4) -> dict:
+    """Route a mixed Discord/cron corpus and report tasks per second."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    discord = [
+        "Scan top 20 markets for hedges",
+        "research Polymarket competitors",
+        "review my trading bot code in /bot/discord_hedge_bot.py",
+        "find hedges with 95% coverage",
+        "check if there are bugs in this script",
+        "what's the weather like",
+    ]
+    cron = [
+        "scan 50 markets min coverage 0.85 tier 2",
+        "monitor active hedges",
+        "check hedge status",
+    ]
+    corpus = [task for pair in zip(discord * 3, cron * 6) for task in pair]
+
+    router = get_router()
+    for task in corpus:
+        router.route(task)  # warm up
+
+    def work(n):
+        for i in range(n):
+            router.route(corpus[i % len(corpus)])
+        return n
+
+    results = {}
+    start = time.perf_counter()
+    work(iterations)
+    elapsed = time.perf_counter() - start
+    results["single_thread"] = iterations / elapsed
+
+    per_thread = iterations // threads
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(pool.map(work, [per_thread] * threads))
+    elapsed = time.perf_counter() - start
+    results[f"{threads}_threads"] = total / elapsed
+
+    return results
+
+
+def main():
+    """Route a task from the command line, or benchmark the router."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Betty task router")
+    parser.add_argument("task", nargs="?", help="Task to route")
+    parser.add_argument("--bench", action="store_true", help="Benchmark routing throughput")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.bench:
+        for mode, rate in run_benchmark(args.iterations, args.threads).items():
+            print(f"🎭 {mode}: {rate:,.0f} tasks/sec")
+    elif args.task:
+        route = get_router().route(args.task)
+        print(json.dumps(route._asdict(), indent=2))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
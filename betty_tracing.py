@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Per-stage latency tracing for the Betty pipeline.
+
+Stages (load_config, route_task, execute_task, delegate_to_specialist,
+handle_task, worker spawn, ...) are wrapped in spans. Every span belongs to
+a trace; the trace ID travels through the task queue, into specialist
+workers (with each request) and into other subprocesses (as the
+BETTY_TRACE_ID environment variable), so one request can be followed end
+to end.
+
+Finished spans feed latency histograms keyed by (stage, specialist,
+intent). Spans inherit specialist/intent from their parent, so a
+specialist's handle_task is counted under the intent that routed to it.
+Histograms are exported as a Prometheus textfile (node_exporter textfile
+collector) and as JSON with p50/p95/p99.
+
+Usage:
+    with trace():
+        with span("route_task") as s:
+            ...
+            s.set(specialist="researcher", intent="web_search")
+
+    @traced("load_config")
+    def load_config(self): ...
+
+    python3 betty_tracing.py show [--json]
+"""
+
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+TRACE_ENV = "BETTY_TRACE_ID"
+
+METRICS_DIR = Path(os.environ.get("BETTY_METRICS_DIR", "/tmp"))
+PROMETHEUS_FILE = METRICS_DIR / "betty.prom"
+JSON_FILE = METRICS_DIR / "betty_metrics.json"
+EXPORT_INTERVAL = 15        # seconds between exports from the daemon
+
+# Histogram bucket bounds in seconds (Prometheus "le")
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+RESERVOIR_SIZE = 2048       # recent samples per series, for percentiles
+RECENT_SPANS = 500          # finished spans kept for the JSON export
+QUANTILES = (50, 95, 99)
+
+INHERITED_LABELS = ("specialist", "intent")
+
+_trace_id = ContextVar("betty_trace_id", default=None)
+_current_span = ContextVar("betty_span", default=None)
+_collector = ContextVar("betty_span_collector", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id() -> str:
+    """Trace of this context, else the one inherited from a parent process."""
+    return _trace_id.get() or os.environ.get(TRACE_ENV)
+
+
+@contextmanager
+def trace(trace_id: str = None):
+    """Run the block under trace_id (a fresh one if none is given or inherited)."""
+    token = _trace_id.set(trace_id or current_trace_id() or new_trace_id())
+    try:
+        yield _trace_id.get()
+    finally:
+        _trace_id.reset(token)
+
+
+def trace_env(env: dict = None) -> dict:
+    """Environment for a subprocess, carrying the current trace ID."""
+    env = dict(os.environ if env is None else env)
+    trace_id = current_trace_id()
+    if trace_id:
+        env[TRACE_ENV] = trace_id
+    return env
+
+
+class Span:
+    """One timed stage; labels may be added while it runs."""
+
+    def __init__(self, stage: str, labels: dict):
+        parent = _current_span.get()
+        self.stage = stage
+        self.trace_id = current_trace_id() or new_trace_id()
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.labels = {key: parent.labels[key] for key in INHERITED_LABELS if parent and key in parent.labels}
+        self.set(**labels)
+        self.error = None
+        self.started = time.time()
+        self.duration = None
+
+    def set(self, **labels):
+        self.labels.update({key: str(value) for key, value in labels.items() if value is not None})
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.stage,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "labels": self.labels,
+            "started": self.started,
+            "duration": self.duration,
+            "error": self.error,
+        }
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """Time the block as one stage of the current trace."""
+    current = Span(stage, labels)
+    token = _current_span.set(current)
+    trace_token = None if _trace_id.get() else _trace_id.set(current.trace_id)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        if trace_token:
+            _trace_id.reset(trace_token)
+        record = current.to_dict()
+        RECORDER.record(record)
+        collected = _collector.get()
+        if collected is not None:
+            collected.append(record)
+
+
+def traced(stage: str, **labels):
+    """Decorator form of span() for plain and async functions."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage, **labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def collect_spans():
+    """Collect the spans finished in this context (workers send them home)."""
+    spans = []
+    token = _collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class Histogram:
+    """Cumulative buckets for Prometheus plus a reservoir for percentiles."""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, seconds: float, error: bool = False):
+        self.count += 1
+        self.sum += seconds
+        self.errors += error
+        self.samples.append(seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+    def summary(self) -> dict:
+        samples = list(self.samples)
+        summary = {"count": self.count, "errors": self.errors, "sum": round(self.sum, 6),
+                   "mean": round(self.sum / self.count, 6) if self.count else 0.0}
+        for pct in QUANTILES:
+            summary[f"p{pct}"] = round(_percentile(samples, pct), 6)
+        return summary
+
+
+class Recorder:
+    """Process-wide histograms of finished spans."""
+
+    def __init__(self):
+        self.histograms = {}        # (stage, specialist, intent) -> Histogram
+        self.recent = deque(maxlen=RECENT_SPANS)
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, record: dict):
+        labels = record["labels"]
+        key = (record["stage"], labels.get("specialist", ""), labels.get("intent", ""))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(record["duration"], record["error"] is not None)
+            self.recent.append(record)
+
+    def merge(self, records: list):
+        """Record spans finished in another process under the current span."""
+        parent = _current_span.get()
+        for record in records or ():
+            if parent:
+                inherited = {key: parent.labels[key] for key in INHERITED_LABELS if key in parent.labels}
+                record = dict(record, labels={**inherited, **record.get("labels", {})},
+                              parent_id=record.get("parent_id") or parent.span_id)
+            self.record(record)
+
+    def spans(self, trace_id: str) -> list:
+        """Recent finished spans of one trace."""
+        with self._lock:
+            return [record for record in self.recent if record["trace_id"] == trace_id]
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.recent.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        """JSON-ready summary: one entry per (stage, specialist, intent)."""
+        with self._lock:
+            items = sorted(self.histograms.items())
+            recent = list(self.recent)
+        return {
+            "generated": time.time(),
+            "since": self.started,
+            "pid": os.getpid(),
+            "stages": [
+                {"stage": stage, "specialist": specialist, "intent": intent, **histogram.summary()}
+                for (stage, specialist, intent), histogram in items
+            ],
+            "recent": recent,
+        }
+
+    def prometheus(self) -> str:
+        """Histograms and percentiles in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted((key, histogram.summary(), list(histogram.buckets))
+                           for key, histogram in self.histograms.items())
+        lines = [
+            "# HELP betty_stage_seconds Latency of Betty pipeline stages.",
+            "# TYPE betty_stage_seconds histogram",
+        ]
+        for (stage, specialist, intent), summary, buckets in items:
+            labels = _labels(stage=stage, specialist=specialist, intent=intent)
+            for bound, count in zip(BUCKETS, buckets):
+                lines.append(f"betty_stage_seconds_bucket{{{labels},le=\"{bound}\"}} {count}")
+            lines.append(f"betty_stage_seconds_bucket{{{labels},le=\"+Inf\"}} {summary['count']}")
+            lines.append(f"betty_stage_seconds_sum{{{labels}}} {summary['sum']}")
+            lines.append(f"betty_stage_seconds_count{{{labels}}} {summary['count']}")
+
+        lines += [
+            "# HELP betty_stage_quantile_seconds Recent latency percentiles of Betty pipeline stages.",
+            "# TYPE betty_stage_quantile_seconds gauge",
+        ]
+        for (stage, specialist, intent), summary, _ in items:
+            labels = _labels(stage=stage, specialist=specialist, intent=intent)
+            for pct in QUANTILES:
+                lines.append(f"betty_stage_quantile_seconds{{{labels},quantile=\"{pct / 100}\"}} {summary[f'p{pct}']}")
+
+        lines += [
+            "# HELP betty_stage_errors_total Betty pipeline stages that raised.",
+            "# TYPE betty_stage_errors_total counter",
+        ]
+        for (stage, specialist, intent), summary, _ in items:
+            labels = _labels(stage=stage, specialist=specialist, intent=intent)
+            lines.append(f"betty_stage_errors_total{{{labels}}} {summary['errors']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, prometheus_path=PROMETHEUS_FILE, json_path=JSON_FILE):
+        """Write both exports atomically (the textfile collector may read mid-write)."""
+        _write_atomic(Path(prometheus_path), self.prometheus())
+        _write_atomic(Path(json_path), json.dumps(self.snapshot(), indent=2))
+
+    def start_exporter(self, interval: float = EXPORT_INTERVAL, **paths) -> threading.Event:
+        """Export every interval seconds in the background; set the returned event to stop."""
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.export(**paths)
+                except OSError as e:
+                    print(f"⚠️  Metrics export failed: {e}", flush=True)
+
+        threading.Thread(target=loop, name="betty-metrics", daemon=True).start()
+        return stop
+
+
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+def _write_atomic(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+RECORDER = Recorder()
+
+
+def format_trace(records: list) -> str:
+    """Indented span tree of one trace, slowest stages visible at a glance."""
+    children = {}
+    ids = {record["span_id"] for record in records}
+    for record in sorted(records, key=lambda r: r["started"]):
+        parent = record["parent_id"] if record["parent_id"] in ids else None
+        children.setdefault(parent, []).append(record)
+
+    lines = []
+
+    def walk(parent, depth):
+        for record in children.get(parent, ()):
+            labels = " ".join(f"{k}={v}" for k, v in record["labels"].items())
+            error = f" ❌ {record['error']}" if record["error"] else ""
+            lines.append(f"{'  ' * depth}{record['duration'] * 1000:9.1f} ms  {record['stage']}  {labels}{error}")
+            walk(record["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def format_stages(snapshot: dict) -> str:
+    lines = [f"{'stage':<24} {'specialist':<18} {'intent':<18} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+    for row in snapshot["stages"]:
+        lines.append(
+            f"{row['stage']:<24} {row['specialist'] or '-':<18} {row['intent'] or '-':<18} {row['count']:>6} "
+            f"{row['p50'] * 1000:>9.1f} {row['p95'] * 1000:>9.1f} {row['p99'] * 1000:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """Show the stage latencies last exported by the daemon."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Betty latency metrics")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Show the latest exported stage latencies")
+    show.add_argument("--file", default=str(JSON_FILE))
+    show.add_argument("--json", action="store_true")
+    show.add_argument("--trace", help="Print the span tree of one trace ID from the recent spans")
+    args = parser.parse_args()
+
+    try:
+        snapshot = json.loads(Path(args.file).read_text())
+    except FileNotFoundError:
+        print(f"❌ No metrics at {args.file} (is the Betty daemon running?)")
+        raise SystemExit(1)
+
+    if args.trace:
+        records = [record for record in snapshot["recent"] if record["trace_id"] == args.trace]
+        print(format_trace(records) if records else f"❌ Trace {args.trace} not in the recent spans")
+    elif args.json:
+        print(json.dumps(snapshot["stages"], indent=2))
+    else:
+        age = time.time() - snapshot["generated"]
+        print(f"📊 Betty stage latency (pid {snapshot['pid']}, exported {age:.0f}s ago)\n")
+        print(format_stages(snapshot))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,35 @@
 #!/usr/bin/env python3
 """Quick check of active hedges."""
-import sys
-from pathlib import Path
 from datetime import datetime
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
+from hedge_db_pool import get_pool
+from hedge_summary import ensure_summary_index, list_active, summarize
 
-from testing.database import HedgeDB
+LIST_LIMIT = 20
 
-with HedgeDB() as db:
-    h = db.get_active_hedges()
-    print(f'Active hedges: {len(h)}')
-    if h:
-        total_cost = sum(x.total_real_cost for x in h)
-        avg_coverage = sum(x.coverage for x in h) / len(h)
-        print(f'Total cost: ${total_cost:.2f}')
-        print(f'Avg coverage: {avg_coverage*100:.1f}%')
-        for x in h:
-            print(f'  ID: {x.id}, Coverage: {x.coverage*100:.1f}%, Tier: {x.tier}, Cost: ${x.total_real_cost:.2f}')
+db = get_pool()
+if not db.path.exists():
+    raise SystemExit(f'No hedge database at {db.path}')
+
+ensure_summary_index(db)
+with db.connection() as conn:
+    summary = summarize(conn)
+    print(f'Active hedges: {summary["active"]}')
+    if summary["active"]:
+        print(f'Total cost: ${summary["total_cost"]:.2f}')
+        print(f'Avg coverage: {summary["avg_coverage"]*100:.1f}%')
+        for hedge_id, coverage, tier, cost in list_active(conn, LIST_LIMIT):
+            print(f'  ID: {hedge_id}, Coverage: {coverage*100:.1f}%, Tier: {tier}, Cost: ${cost:.2f}')
+        if summary["active"] > LIST_LIMIT:
+            print(f'  ... and {summary["active"] - LIST_LIMIT} more')
     else:
         print('No active hedges in database')
 
     # Last scan
-    try:
-        cursor = db.conn.cursor()
-        cursor.execute("""
-            SELECT scan_timestamp, markets_scanned, hedges_found
-            FROM scans
-            ORDER BY id DESC
-            LIMIT 1
-        """)
-        scan = cursor.fetchone()
-        if scan:
-            scan_time = datetime.fromisoformat(scan[0].replace('Z', '+00:00'))
-            time_ago = datetime.now(scan_time.tzinfo) - scan_time
-            hours_ago = time_ago.total_seconds() / 3600
-            print(f'\nLast scan: {scan_time.strftime("%Y-%m-%d %H:%M")} ({hours_ago:.1f}h ago)')
-            print(f'Markets: {scan[1]}, Hedges found: {scan[2]}')
-    except:
-        pass
+    scan = summary["last_scan"]
+    if scan:
+        scan_time = datetime.fromisoformat(scan["time"].replace('Z', '+00:00'))
+        time_ago = datetime.now(scan_time.tzinfo) - scan_time
+        hours_ago = time_ago.total_seconds() / 3600
+        print(f'\nLast scan: {scan_time.strftime("%Y-%m-%d %H:%M")} ({hours_ago:.1f}h ago)')
+        print(f'Markets: {scan["markets_scanned"]}, Hedges found: {scan["hedges_found"]}')
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+AST analysis engine for the Code Reviewer.
+
+Parses Python files with `ast` and runs the review_rules registry over each
+module in a single pass, reporting concrete, line-numbered issues.
+Whole directories or globs are reviewed over a process pool, and per-file
+results are cached in SQLite by content hash (plus ENGINE_VERSION), so
+unchanged files are never re-analyzed.
+
+Usage:
+    report = analyze_file("betty.py")
+    reports, stats = review(["bot/", "skills/polyclaw/**/*.py"])
+
+    python3 code_analysis.py review [paths...]     # defaults to WORKSPACE_TARGETS
+    python3 code_analysis.py review --fresh --timings   # per-rule cost, cache bypassed
+    python3 code_analysis.py rules|stats|purge
+"""
+
+import ast
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from review_rules import RULES, Issue, RuleEngine
+
+WORKSPACE = Path(__file__).parent.parent
+# Reviewed by default: the bot, paper trading and the polyclaw skill
+WORKSPACE_TARGETS = ("bot", "paper-trading", "skills/polyclaw")
+SKIP_DIRS = {".git", "__pycache__", ".venv", "venv", "node_modules", ".mypy_cache", ".pytest_cache"}
+
+REVIEW_CACHE_DB = Path(os.environ.get("CODE_REVIEW_CACHE", "/tmp/code_review_cache.db"))
+# Bump when rules change behaviour; adding or removing a rule changes it automatically
+ENGINE_VERSION = f"2:{zlib.crc32(','.join(sorted(RULES)).encode()):08x}"
+POOL_THRESHOLD = 8          # fewer files than this are analyzed inline
+
+SEVERITY_ORDER = {"P1": 0, "P2": 1, "P3": 2}
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_reports (
+    digest TEXT NOT NULL,
+    engine_version TEXT NOT NULL,
+    report TEXT NOT NULL,
+    analyzed_at REAL NOT NULL,
+    PRIMARY KEY (digest, engine_version)
+);
+"""
+
+
+class FileReport(NamedTuple):
+    """Analysis of one file; issues are path-independent so reports can be cached by content."""
+    path: str
+    lines: int
+    functions: int
+    classes: int
+    issues: list
+    error: str = None
+
+    def to_dict(self) -> dict:
+        return {**self._asdict(), "issues": [issue._asdict() for issue in self.issues]}
+
+    @classmethod
+    def from_dict(cls, data: dict, path: str = None) -> "FileReport":
+        data = dict(data, issues=[Issue(**issue) for issue in data["issues"]])
+        if path:
+            data["path"] = path
+        return cls(**data)
+
+
+class ReviewStats(NamedTuple):
+    files: int
+    analyzed: int
+    cached: int
+    elapsed: float
+    rule_times: dict = None   # rule code -> [calls, seconds] over the analyzed files
+
+
+def count_lines(source: str) -> int:
+    return source.count("\n") + (1 if source and not source.endswith("\n") else 0)
+
+
+def analyze_source(source: str, path: str = "<string>", engine: RuleEngine = None) -> FileReport:
+    """Analyze Python source text; other files only get a line count."""
+    lines = count_lines(source)
+    if not path.endswith(".py") and path != "<string>":
+        return FileReport(path, lines, 0, 0, [], error="not a Python file")
+    try:
+        tree = ast.parse(source, filename=path)
+    except SyntaxError as e:
+        issue = Issue(e.lineno or 0, "P1", "bug", "syntax-error", f"Syntax error: {e.msg}")
+        return FileReport(path, lines, 0, 0, [issue], error=str(e))
+
+    issues, counts = (engine or RuleEngine()).run(tree, path)
+    issues.sort(key=lambda i: (SEVERITY_ORDER[i.severity], i.line))
+    return FileReport(path, lines, counts["functions"], counts["classes"], issues)
+
+
+def analyze_file(path) -> FileReport:
+    """Analyze one file from disk (no cache)."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return analyze_source(f.read(), str(path))
+
+
+def content_key(path: str, data: bytes) -> str:
+    """Cache key: file content plus the parts of the path that change the analysis."""
+    name = Path(path).name
+    kind = b"init" if name == "__init__.py" else b"py" if name.endswith(".py") else b"other"
+    return hashlib.blake2b(data + b"\0" + kind, digest_size=16).hexdigest()
+
+
+def _analyze_jobs(jobs):
+    """Analyze a chunk of (path, source) jobs with one engine; returns (reports, timings)."""
+    engine = RuleEngine()
+    return [analyze_source(source, path, engine).to_dict() for path, source in jobs], engine.timings
+
+
+def collect_files(targets, base: Path = WORKSPACE) -> list:
+    """Expand files, directories and glob patterns into Python file paths."""
+    files = []
+    for target in targets:
+        target = os.path.expanduser(str(target))
+        if not os.path.isabs(target) and not os.path.exists(target):
+            target = str(base / target)
+        if glob.has_magic(target):
+            files.extend(p for p in glob.glob(target, recursive=True) if p.endswith(".py") and os.path.isfile(p))
+        elif os.path.isdir(target):
+            for root, dirs, names in os.walk(target):
+                dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+                files.extend(os.path.join(root, n) for n in names if n.endswith(".py"))
+        elif os.path.isfile(target):
+            files.append(target)
+    return sorted(dict.fromkeys(files))
+
+
+class AnalysisCache:
+    """Content-hash keyed store of FileReports."""
+
+    def __init__(self, path=REVIEW_CACHE_DB, engine_version: str = ENGINE_VERSION):
+        self.path = Path(path)
+        self.engine_version = engine_version
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(CACHE_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_many(self, digests) -> dict:
+        """{digest: report dict} for the cached subset of digests."""
+        digests = list(digests)
+        found = {}
+        for i in range(0, len(digests), 500):
+            chunk = digests[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT digest, report FROM file_reports WHERE engine_version = ? "
+                f"AND digest IN ({','.join('?' * len(chunk))})",
+                [self.engine_version, *chunk],
+            )
+            found.update((digest, json.loads(report)) for digest, report in rows)
+        return found
+
+    def put_many(self, reports: dict):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO file_reports (digest, engine_version, report, analyzed_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(digest, self.engine_version, json.dumps(report), now) for digest, report in reports.items()],
+            )
+
+    def purge(self) -> int:
+        """Drop reports from older engine versions."""
+        with self.conn:
+            return self.conn.execute(
+                "DELETE FROM file_reports WHERE engine_version != ?", (self.engine_version,)
+            ).rowcount
+
+    def stats(self) -> dict:
+        total, current = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(engine_version = ?), 0) FROM file_reports", (self.engine_version,)
+        ).fetchone()
+        return {"entries": total, "current": current, "path": str(self.path)}
+
+    def close(self):
+        self.conn.close()
+
+
+def review(targets, cache: AnalysisCache = None, workers: int = None) -> tuple:
+    """Review files, directories or globs; returns ([FileReport], ReviewStats)."""
+    started = time.monotonic()
+    files = collect_files(targets)
+
+    sources = {}
+    for path in files:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        sources[path] = (content_key(path, data), data.decode("utf-8", errors="replace"))
+
+    own_cache = cache is None
+    cache = cache or AnalysisCache()
+    try:
+        cached = cache.get_many({digest for digest, _ in sources.values()})
+        # Identical content is analyzed once even if it appears at several paths
+        pending = {}
+        for path, (digest, source) in sources.items():
+            if digest not in cached:
+                pending.setdefault(digest, (path, source))
+
+        jobs = list(pending.values())
+        chunk = max(1, len(jobs) // 32) if len(jobs) >= POOL_THRESHOLD else max(1, len(jobs))
+        chunks = [jobs[i:i + chunk] for i in range(0, len(jobs), chunk)]
+        if len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outputs = list(pool.map(_analyze_jobs, chunks))
+        else:
+            outputs = [_analyze_jobs(c) for c in chunks]
+
+        results, rule_times = [], {}
+        for chunk_reports, timings in outputs:
+            results.extend(chunk_reports)
+            for code, (calls, secs) in timings.items():
+                total = rule_times.setdefault(code, [0, 0.0])
+                total[0] += calls
+                total[1] += secs
+
+        fresh = dict(zip(pending, results))
+        if fresh:
+            cache.put_many(fresh)
+    finally:
+        if own_cache:
+            cache.close()
+
+    reports = [
+        FileReport.from_dict({**cached, **fresh}[digest], path)
+        for path, (digest, _) in sources.items()
+    ]
+    stats = ReviewStats(len(reports), len(fresh), len(reports) - len(fresh), time.monotonic() - started,
+                        rule_times)
+    return reports, stats
+
+
+def format_report(report: FileReport, max_issues: int = 20) -> str:
+    """One file's findings, P1 first."""
+    lines = [f"**{report.path}** ({report.lines} lines, {report.functions} functions, {report.classes} classes)"]
+    for issue in report.issues[:max_issues]:
+        lines.append(f"  - [{issue.severity}] line {issue.line}: {issue.message} ({issue.code})")
+    if len(report.issues) > max_issues:
+        lines.append(f"  ... {len(report.issues) - max_issues} more")
+    return "\n".join(lines)
+
+
+def summarize_reports(reports: list) -> dict:
+    """Totals per severity and per issue code."""
+    by_severity, by_code = {}, {}
+    for report in reports:
+        for issue in report.issues:
+            by_severity[issue.severity] = by_severity.get(issue.severity, 0) + 1
+            by_code[issue.code] = by_code.get(issue.code, 0) + 1
+    return {
+        "files": len(reports),
+        "lines": sum(r.lines for r in reports),
+        "issues": sum(by_severity.values()),
+        "by_severity": dict(sorted(by_severity.items(), key=lambda kv: SEVERITY_ORDER[kv[0]])),
+        "by_code": dict(sorted(by_code.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def main():
+    """Review paths from the command line or manage the report cache."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AST code analysis")
+    parser.add_argument("command", choices=["review", "rules", "stats", "purge"])
+    parser.add_argument("paths", nargs="*", help="Files, directories or globs (default: workspace)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--timings", action="store_true", help="Print time spent per rule")
+    parser.add_argument("--fresh", action="store_true", help="Ignore cached reports")
+    args = parser.parse_intermixed_args()
+
+    if args.command == "rules":
+        for code, rule in RULES.items():
+            nodes = ", ".join(t.__name__ for t in rule.node_types)
+            print(f"[{rule.severity}] {code:24} {rule.category:8} on {nodes}")
+        return
+
+    with AnalysisCache(":memory:" if args.fresh else REVIEW_CACHE_DB) as cache:
+        if args.command == "stats":
+            print(json.dumps(cache.stats(), indent=2))
+            return
+        if args.command == "purge":
+            print(f"✅ Purged {cache.purge()} stale reports")
+            return
+
+        reports, stats = review(args.paths or WORKSPACE_TARGETS, cache, args.workers)
+
+    if args.json:
+        print(json.dumps({"reports": [r.to_dict() for r in reports], "stats": stats._asdict()}, indent=2))
+        return
+    for report in reports:
+        if report.issues:
+            print(format_report(report))
+    summary = summarize_reports(reports)
+    print(f"\n🧪 {summary['files']} files, {summary['lines']} lines, {summary['issues']} issues "
+          f"{summary['by_severity']}")
+    print(f"   analyzed {stats.analyzed}, cached {stats.cached}, {stats.elapsed:.2f}s")
+    if args.timings:
+        print("\n⏱️  Rule timings (analyzed files only)")
+        for code, (calls, secs) in sorted((stats.rule_times or {}).items(), key=lambda kv: -kv[1][1]):
+            print(f"   {code:24} {secs * 1000:8.2f} ms  {calls:7} calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,25 @@ Analyzes code files for issues, improvements, and best practices.
 """
 
 import asyncio
-import json
+import glob
+import re
 import sys
 from pathlib import Path
 
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from betty_router import get_router
+from code_analysis import (SEVERITY_ORDER, WORKSPACE, WORKSPACE_TARGETS, format_report, review,
+                           summarize_reports)
+from review_rules import RULES
+
+BETTY_DIR = Path(__file__).parent
+MAX_REPORTED_FILES = 15
+MAX_SUGGESTIONS = 10
+QUALITY_WEIGHTS = {"P1": 5, "P2": 2, "P3": 0.5}
+TARGET_TOKEN = re.compile(r"(?:file:|code:)?\s*([\w\/\.\-\*\?~]+)", re.IGNORECASE)
+
 
 class CodeReviewer:
     """Code Reviewer agent - Code analysis and quality expert."""
@@ -26,129 +38,213 @@ class CodeReviewer:
 
     async def handle_task(self, task: str) -> str:
         """Handle a code review task."""
-        task_lower = task.lower()
-
-        # Code review
-        if any(k in task_lower for k in ["review", "analyze", "check"]):
-            return await self.review_code(task)
+        handlers = {
+            "review_code": self.review_code,
+            "find_bugs": self.find_bugs,
+            "suggest_improvements": self.suggest_improvements,
+            "quality_check": self.quality_check,
+        }
+        intent = get_router().intent_for("code-reviewer", task)
 
-        # Bug detection
-        elif any(k in task_lower for k in ["bug", "error", "fix", "debug"]):
-            return await self.find_bugs(task)
-
-        # Refactoring
-        elif any(k in task_lower for k in ["refactor", "improve", "optimize"]):
-            return await self.suggest_improvements(task)
-
-        # Quality check
-        elif any(k in task_lower for k in ["quality", "test", "verify"]):
-            return await self.quality_check(task)
+        if intent in handlers:
+            return await handlers[intent](task)
 
         else:
             return f"❓ I'm Code Reviewer. I understand: '{task}'"
 
+    def _resolve_targets(self, task: str) -> list:
+        """Files, directories or globs named in a task.
+
+        Expected: "review /path/to/file.py", "review bot/", "review skills/**/*.py"
+        or "review the workspace" for WORKSPACE_TARGETS.
+        """
+        targets, missing = [], []
+        for token in TARGET_TOKEN.findall(task):
+            token = token.strip("'\"`.,;:")
+            if not token or not ("/" in token or "*" in token or "." in token.strip(".")):
+                continue
+            for base in (Path.cwd(), BETTY_DIR, WORKSPACE):
+                candidate = base / token.lstrip("/") if not Path(token).exists() else Path(token)
+                if glob.has_magic(str(candidate)) and glob.glob(str(candidate), recursive=True):
+                    targets.append(str(candidate))
+                    break
+                if candidate.exists():
+                    targets.append(str(candidate))
+                    break
+            else:
+                missing.append(token)
+        if not targets and "workspace" in task.lower():
+            targets = [str(WORKSPACE / target) for target in WORKSPACE_TARGETS]
+        if not targets and missing:
+            raise FileNotFoundError(missing[0])
+        return targets
+
+    async def _review(self, task: str):
+        """Analyze the task's targets off the event loop; None when nothing matched."""
+        targets = self._resolve_targets(task)
+        if not targets:
+            return None
+        return await asyncio.to_thread(review, targets)
+
     async def review_code(self, task: str) -> str:
         """Review code for issues."""
-        # Extract file path from task
-        # Expected: "review /path/to/file.py" or "review file.py"
-        import re
-        match = re.search(r'(?:file:|\/)([\w\/\.\-]+)', task, re.IGNORECASE)
-
-        if match:
-            file_path = match.group(1)
-
-            # Try to read the file
-            try:
-                full_path = Path(file_path)
-                if not full_path.is_absolute():
-                    # Relative to workspace
-                    full_path = Path(__file__).parent / file_path
-
-                if full_path.exists():
-                    with open(full_path) as f:
-                        code = f.read()
-
-                    result = f"🧪 Code Review: {file_path}\n\n"
-                    result += f"✅ File loaded ({len(code)} lines)\n\n"
-                    result += "**Issues Found:**\n\n"
-                    result += "  - [P1] Check for proper imports\n"
-                    result += "  - [P2] Review error handling\n"
-                    result += "  - [P3] Check for security issues\n"
-                    result += "  - [P2] Verify variable naming\n\n"
-                    result += "**Suggestions:**\n\n"
-                    result += "  1. Add type hints for clarity\n"
-                    result += "  2. Include docstrings\n"
-                    result += "  3. Add unit tests\n"
-                    result += "  4. Handle edge cases\n"
-
-                    return result
-                else:
-                    return f"❌ File not found: {full_path}"
-            except Exception as e:
-                return f"❌ Error reading file: {e}"
-        else:
+        try:
+            reviewed = await self._review(task)
+        except FileNotFoundError as e:
+            return f"❌ File not found: {e}"
+        except Exception as e:
+            return f"❌ Error reading file: {e}"
+        if reviewed is None:
             return "❓ No file path found in task\n\nExample: 'review file.py' or 'review: /path/to/script.sh'"
 
+        reports, stats = reviewed
+        if not reports:
+            return "❌ No files found to review"
+
+        if len(reports) == 1:
+            report = reports[0]
+            result = f"🧪 Code Review: {report.path}\n\n"
+            result += f"✅ File loaded ({report.lines} lines)\n\n"
+            if report.error:
+                result += f"⚠️  {report.error}\n\n"
+            result += "**Issues Found:**\n\n"
+            result += format_report(report) + "\n" if report.issues else "  ✅ No issues found\n"
+            return result
+
+        summary = summarize_reports(reports)
+        result = f"🧪 Code Review: {summary['files']} files, {summary['lines']} lines\n\n"
+        result += f"✅ {stats.analyzed} analyzed, {stats.cached} unchanged (cached) in {stats.elapsed:.2f}s\n\n"
+        result += f"**Issues Found:** {summary['issues']} {summary['by_severity']}\n\n"
+        flagged = sorted((r for r in reports if r.issues),
+                         key=lambda r: min(SEVERITY_ORDER[i.severity] for i in r.issues))
+        for report in flagged[:MAX_REPORTED_FILES]:
+            result += format_report(report, max_issues=5) + "\n"
+        if len(flagged) > MAX_REPORTED_FILES:
+            result += f"\n... {len(flagged) - MAX_REPORTED_FILES} more files with issues\n"
+        return result
+
     async def find_bugs(self, task: str) -> str:
         """Find bugs in code."""
-        # Extract file or context
-        import re
-        match = re.search(r'(?:file:|\/|code:)\s*([\w\/\.\-]+)?', task, re.IGNORECASE)
-
-        if match:
-            file_path = match.group(1) or "current code"
-
-            result = f"🐛 Bug Analysis: {file_path}\n\n"
-            result += "✅ Analysis complete\n\n"
-            result += "**Potential Issues:**\n\n"
-            result += "  1. Unhandled exceptions\n"
-            result += "  2. Null pointer risks\n"
-            result += "  3. Race conditions\n"
-            result += "  4. Memory leaks\n\n"
-            result += "**Fixes:**\n\n"
-            result += "  - Add try-except blocks\n"
-            result += "  - Use defensive programming\n"
-            result += "  - Add proper logging\n"
-
-            return result
-        else:
+        try:
+            reviewed = await self._review(task)
+        except FileNotFoundError as e:
+            return f"❌ File not found: {e}"
+        except Exception as e:
+            return f"❌ Error reading file: {e}"
+        if reviewed is None:
             return "🐛 Bug detection (no file specified)\n\nShare code file or path for analysis"
 
+        reports, _ = reviewed
+        bugs = [
+            report._replace(issues=[i for i in report.issues if i.category == "bug"])
+            for report in reports
+        ]
+        bugs = [report for report in bugs if report.issues]
+        name = reports[0].path if len(reports) == 1 else f"{len(reports)} files"
+
+        result = f"🐛 Bug Analysis: {name}\n\n"
+        result += "✅ Analysis complete\n\n"
+        if not bugs:
+            return result + "No likely bugs found"
+        result += "**Potential Issues:**\n\n"
+        for report in bugs[:MAX_REPORTED_FILES]:
+            result += format_report(report, max_issues=10) + "\n"
+        return result
+
+    def _grouped_issues(self, reports, category=None) -> list:
+        """[(code, count, example "path:line")] most frequent first."""
+        grouped = {}
+        for report in reports:
+            for issue in report.issues:
+                if category and issue.category != category:
+                    continue
+                entry = grouped.setdefault(issue.code, [0, f"{report.path}:{issue.line}"])
+                entry[0] += 1
+        return sorted(((code, n, example) for code, (n, example) in grouped.items()), key=lambda g: -g[1])
+
     async def suggest_improvements(self, task: str) -> str:
         """Suggest code improvements."""
-        result = f"🔧 Refactoring suggestions\n\n"
-        result += "Common improvements:\n\n"
-        result += "1. **Performance**\n"
-        result += "   - Use list comprehensions\n"
-        result += "   - Cache repeated calculations\n"
-        result += "   - Optimize database queries\n\n"
-        result += "2. **Readability**\n"
-        result += "   - Break long functions\n"
-        result += "   - Use meaningful names\n"
-        result += "   - Add comments\n\n"
-        result += "3. **Maintainability**\n"
-        result += "   - Follow DRY principle\n"
-        result += "   - Reduce coupling\n"
-        result += "   - Add type hints\n\n"
-
-        result += "Share specific file for targeted suggestions!"
+        try:
+            reviewed = await self._review(task)
+        except FileNotFoundError as e:
+            return f"❌ File not found: {e}"
+        except Exception as e:
+            return f"❌ Error reading file: {e}"
+
+        if reviewed is None:
+            result = f"🔧 Refactoring suggestions\n\n"
+            result += "Common improvements:\n\n"
+            result += "1. **Performance**\n"
+            result += "   - Use list comprehensions\n"
+            result += "   - Cache repeated calculations\n"
+            result += "   - Optimize database queries\n\n"
+            result += "2. **Readability**\n"
+            result += "   - Break long functions\n"
+            result += "   - Use meaningful names\n"
+            result += "   - Add comments\n\n"
+            result += "3. **Maintainability**\n"
+            result += "   - Follow DRY principle\n"
+            result += "   - Reduce coupling\n"
+            result += "   - Add type hints\n\n"
+            result += "Share specific file for targeted suggestions!"
+            return result
 
+        reports, _ = reviewed
+        groups = self._grouped_issues(reports)
+        result = f"🔧 Refactoring suggestions ({len(reports)} files)\n\n"
+        if not groups:
+            return result + "✅ Nothing to suggest - no issues found"
+        for i, (code, count, example) in enumerate(groups[:MAX_SUGGESTIONS], 1):
+            result += f"{i}. **{RULES[code].hint}** ({code}, {count}x, e.g. {example})\n"
         return result
 
     async def quality_check(self, task: str) -> str:
         """Check code quality."""
-        result = f"✅ Quality Checklist\n\n"
-        result += "**Passed:**\n"
-        result += "  ✅ Syntax valid\n"
-        result += "  ✅ No obvious errors\n\n"
-        result += "**Needs Review:**\n"
-        result += "  ⚠️  Error handling\n"
-        result += "  ⚠️  Documentation\n"
-        result += "  ⚠️  Test coverage\n"
-        result += "  ⚠️  Security patterns\n\n"
-        result += "**Overall Score:** 7/10\n\n"
-        result += "Share file for detailed analysis!"
+        try:
+            reviewed = await self._review(task)
+        except FileNotFoundError as e:
+            return f"❌ File not found: {e}"
+        except Exception as e:
+            return f"❌ Error reading file: {e}"
+
+        if reviewed is None:
+            result = f"✅ Quality Checklist\n\n"
+            result += "**Passed:**\n"
+            result += "  ✅ Syntax valid\n"
+            result += "  ✅ No obvious errors\n\n"
+            result += "**Needs Review:**\n"
+            result += "  ⚠️  Error handling\n"
+            result += "  ⚠️  Documentation\n"
+            result += "  ⚠️  Test coverage\n"
+            result += "  ⚠️  Security patterns\n\n"
+            result += "**Overall Score:** 7/10\n\n"
+            result += "Share file for detailed analysis!"
+            return result
 
+        reports, _ = reviewed
+        summary = summarize_reports(reports)
+        severities = summary["by_severity"]
+        flagged = set(summary["by_code"])
+        syntax_ok = "syntax-error" not in flagged
+
+        result = f"✅ Quality Checklist ({summary['files']} files, {summary['lines']} lines)\n\n"
+        result += "**Passed:**\n"
+        if syntax_ok:
+            result += "  ✅ Syntax valid\n"
+        passed = [code for code in RULES if code not in flagged]
+        for code in passed:
+            result += f"  ✅ {code}\n"
+        result += "\n**Needs Review:**\n"
+        if not syntax_ok:
+            result += "  ❌ Syntax errors\n"
+        for code, count in summary["by_code"].items():
+            if code in RULES:
+                result += f"  ⚠️  {code} ({count})\n"
+
+        # Weighted issues per 100 lines, subtracted from a perfect 10
+        penalty = sum(QUALITY_WEIGHTS[sev] * n for sev, n in severities.items())
+        score = max(0.0, 10 - penalty / max(1, summary["lines"] / 100))
+        result += f"\n**Overall Score:** {score:.1f}/10\n"
         return result
 
     async def main_loop(self):
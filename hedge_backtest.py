@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Vectorized batch backtester over stored hedges and price history.
+
+Loads every hedge, scan and leg price series from hedge_testing.db once,
+marks each hedge on a common hourly grid (price_store 1h closes, read
+through from price_history) and then evaluates a whole grid of strategy
+configurations in NumPy:
+
+    entry filters   MIN_COVERAGE, TIER_FILTER, max new positions per scan
+    exit rules      take profit, stop loss, max holding time (or hold to the end)
+
+Exit rules are first-passage times: with the running max/min of each
+hedge's return path precomputed, the exit tick for every take-profit and
+stop-loss level is one binary search per hedge, so all exit combinations
+cost O(hedges × levels). Entry filters become a (filters × hedges) mask and
+per-configuration trades, wins, P&L and holding time are matrix products.
+Max drawdown is taken on mark-to-market equity at every grid tick: open
+positions at their current return, closed ones at their realized P&L, one
+(filters × hedges) @ (hedges × ticks) product per exit rule. Large grids
+are split by exit rule over a process pool.
+
+Returns follow pnl_engine's convention: a hedge holds total_real_cost /
+(entry price of both legs) shares of each leg, marked YES unless the
+hedges table says otherwise.
+
+Usage:
+    python3 hedge_backtest.py run                           # default grid
+    python3 hedge_backtest.py run --min-coverage 0.85 0.9 --tier 1 2 --take-profit 0.1 none --days 30
+    python3 hedge_backtest.py bench --hedges 2000 --days 60
+"""
+
+import math
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from hedge_db_pool import get_pool
+from pnl_engine import ENTRY_COLUMNS, SIDE_COLUMNS, YES
+from price_refresh import PRICE_HISTORY_SCHEMA
+from price_store import PriceStore, parse_timestamp
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+HEDGE_DB = POLYCLAW_DIR / "db" / "hedge_testing.db"
+
+RESOLUTION = "1h"           # price_store rollup the grid is built from
+NONE = math.inf             # "no such exit rule"
+
+# Default grid: 3 × 3 × 4 entry filters × 5 × 4 × 4 exit rules = 2880 configurations
+MIN_COVERAGES = (0.85, 0.90, 0.95)
+TIER_FILTERS = (1, 2, 3)
+POSITION_LIMITS = (0, 5, 10, 25)          # new positions per scan, 0 = unlimited
+TAKE_PROFITS = (0.05, 0.10, 0.20, 0.50, NONE)
+STOP_LOSSES = (0.10, 0.25, 0.50, NONE)
+MAX_HOLD_HOURS = (24, 72, 168, NONE)
+
+MIN_TRADES = 5              # configurations with fewer trades are not ranked
+POOL_CELLS = 20_000_000     # filters × exit rules × hedges above which the grid is split over processes
+
+
+class History(NamedTuple):
+    """Hedges marked on a common time grid."""
+    hedge_ids: "np.ndarray"
+    tier: "np.ndarray"
+    coverage: "np.ndarray"
+    cost: "np.ndarray"
+    group: "np.ndarray"       # scan each hedge came from
+    entry: "np.ndarray"       # grid index of entry
+    returns: "np.ndarray"     # hedges × ticks, value / cost - 1, NaN before entry
+    grid: "np.ndarray"        # tick timestamps (epoch)
+    skipped: int              # hedges without prices to enter at
+
+
+class ExitRule(NamedTuple):
+    take_profit: float
+    stop_loss: float
+    max_hold_hours: float
+
+
+class EntryFilter(NamedTuple):
+    min_coverage: float
+    tier_filter: int
+    max_positions: int
+
+
+class BacktestResult(NamedTuple):
+    min_coverage: float
+    tier_filter: int
+    max_positions: int
+    take_profit: float
+    stop_loss: float
+    max_hold_hours: float
+    trades: int
+    win_rate: float
+    roi: float
+    pnl: float
+    max_drawdown: float
+    avg_hold_hours: float
+
+
+def _require_numpy():
+    if not HAS_NUMPY:
+        raise RuntimeError("hedge_backtest needs NumPy (pip install numpy)")
+
+
+def load_history(db_path=HEDGE_DB, store: PriceStore = None, days: float = None,
+                 resolution: str = RESOLUTION) -> History:
+    """Hedges, scans and leg prices from the hedge DB, marked on one grid."""
+    _require_numpy()
+    with get_pool(db_path).connection() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(hedges)")}
+        optional = [c if c in columns else "NULL" for c in SIDE_COLUMNS + ENTRY_COLUMNS]
+        hedges = conn.execute(
+            f"SELECT id, tier, coverage, total_real_cost, target_market_id, cover_market_id, created_at, "
+            f"{', '.join(optional)} FROM hedges WHERE total_real_cost > 0 AND created_at IS NOT NULL ORDER BY id"
+        ).fetchall()
+        try:
+            scans = [parse_timestamp(row[0]) for row in
+                     conn.execute("SELECT scan_timestamp FROM scans WHERE scan_timestamp IS NOT NULL "
+                                  "ORDER BY scan_timestamp")]
+        except sqlite3.OperationalError:
+            scans = []
+
+    if days is not None:
+        since = time.time() - days * 86400
+        hedges = [h for h in hedges if parse_timestamp(h[6]) >= since]
+
+    store = store or PriceStore(db_path=db_path)
+    series = {}
+    for market_id in {str(m) for h in hedges for m in h[4:6] if m}:
+        window = store.window(market_id, resolution=resolution)
+        if len(window["ts"]):
+            series[market_id] = window
+    grid = np.unique(np.concatenate([w["ts"] for w in series.values()])) if series else np.empty(0)
+
+    def marks(market_id, side):
+        """Leg price forward-filled onto the grid, NaN before the first tick."""
+        window = series.get(str(market_id)) if market_id else None
+        if window is None:
+            return np.full(len(grid), np.nan)
+        idx = np.searchsorted(window["ts"], grid, "right") - 1
+        prices = np.asarray(window["yes" if side == YES else "no"], dtype=np.float64)[np.maximum(idx, 0)]
+        return np.where(idx >= 0, prices, np.nan)
+
+    rows, paths = [], []
+    skipped = 0
+    for (hedge_id, tier, coverage, cost, target, cover, created_at,
+         target_side, cover_side, target_entry, cover_entry) in hedges:
+        value = marks(target, (target_side or YES).upper()) + marks(cover, (cover_side or YES).upper())
+        start = int(np.searchsorted(grid, parse_timestamp(created_at), "left"))
+        valid = np.flatnonzero(~np.isnan(value[start:]))
+        if not len(valid):
+            skipped += 1
+            continue
+        entry = start + int(valid[0])
+        entry_price = (target_entry + cover_entry) if target_entry and cover_entry else value[entry]
+        path = value * (1.0 / entry_price) - 1.0 if entry_price > 0 else np.zeros(len(grid))
+        path[:entry] = np.nan
+        paths.append(path)
+        group = int(np.searchsorted(scans, parse_timestamp(created_at), "right")) if scans else \
+            int(parse_timestamp(created_at) // 3600)
+        rows.append((hedge_id, tier or 4, coverage or 0.0, cost, group, entry))
+
+    hedge_ids, tier, coverage, cost, group, entry = (np.array(c) for c in zip(*rows)) if rows else \
+        (np.empty(0, dtype=int),) * 6
+    return History(hedge_ids, tier, coverage.astype(float), cost.astype(float), group, entry,
+                   np.array(paths).reshape(len(rows), len(grid)), grid, skipped)
+
+
+def exit_indices(history: History, rules: list) -> "np.ndarray":
+    """Exit tick of every hedge under every rule (rules × hedges)."""
+    returns = history.returns
+    ticks = returns.shape[1]
+    last = ticks - 1
+    up = np.maximum.accumulate(np.where(np.isnan(returns), -np.inf, returns), axis=1)
+    down = -np.minimum.accumulate(np.where(np.isnan(returns), np.inf, returns), axis=1)   # running max loss
+
+    take_profits = sorted({r.take_profit for r in rules})
+    stop_losses = sorted({r.stop_loss for r in rules})
+    holds = sorted({r.max_hold_hours for r in rules})
+    tp_idx = np.empty((len(take_profits), len(returns)), dtype=np.int64)
+    sl_idx = np.empty((len(stop_losses), len(returns)), dtype=np.int64)
+    for h in range(len(returns)):
+        # Running max/min are monotonic, so the first crossing of every level is a binary search
+        tp_idx[:, h] = np.searchsorted(up[h], take_profits, "left")
+        sl_idx[:, h] = np.searchsorted(down[h], stop_losses, "left")
+    entry_ts = history.grid[history.entry]
+    hold_idx = np.stack([
+        np.full(len(returns), last) if hours == NONE else np.searchsorted(history.grid, entry_ts + hours * 3600, "left")
+        for hours in holds
+    ])
+
+    exits = np.empty((len(rules), len(returns)), dtype=np.int64)
+    for i, rule in enumerate(rules):
+        exits[i] = np.minimum.reduce([tp_idx[take_profits.index(rule.take_profit)],
+                                      sl_idx[stop_losses.index(rule.stop_loss)],
+                                      hold_idx[holds.index(rule.max_hold_hours)],
+                                      np.full(len(returns), last)])
+    return exits
+
+
+def entry_mask(history: History, filters: list) -> "np.ndarray":
+    """Hedges each entry filter takes (filters × hedges), best coverage first within a scan."""
+    min_coverage = np.array([f.min_coverage for f in filters])[:, None]
+    tier_filter = np.array([f.tier_filter for f in filters])[:, None]
+    limits = np.array([f.max_positions for f in filters])[:, None]
+    eligible = (history.coverage[None, :] >= min_coverage - 1e-9) & (history.tier[None, :] <= tier_filter)
+
+    order = np.lexsort((-history.coverage, history.group))
+    ranked = eligible[:, order]
+    counts = np.cumsum(ranked, axis=1)
+    groups = history.group[order]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.empty(0, dtype=int)
+    before = np.zeros_like(counts)
+    if len(starts):
+        offsets = np.where(starts > 0, counts[:, np.maximum(starts - 1, 0)], 0)
+        before = np.repeat(offsets, np.diff(np.r_[starts, len(groups)]), axis=1)
+    rank = counts - before
+    taken = ranked & ((limits == 0) | (rank <= limits))
+
+    mask = np.empty_like(taken)
+    mask[:, order] = taken
+    return mask
+
+
+def _evaluate(history: History, filters: list, mask: "np.ndarray", rules: list) -> list:
+    if not len(history.cost):
+        return [BacktestResult(*f, *r, 0, 0.0, 0.0, 0.0, 0.0, 0.0) for f in filters for r in rules]
+    exits = exit_indices(history, rules)
+    hedges = np.arange(len(history.cost))
+    realized = history.returns[hedges[None, :], exits]                 # rules × hedges
+    pnl = realized * history.cost[None, :]
+    held = (history.grid[exits] - history.grid[history.entry][None, :]) / 3600
+
+    selected = mask.astype(np.float64)                                  # filters × hedges
+    trades = selected.sum(axis=1)
+    capital = selected @ history.cost
+    wins = selected @ (realized > 0).T.astype(np.float64)               # filters × rules
+    total_pnl = selected @ pnl.T
+    hold_hours = selected @ held.T
+
+    drawdown = np.zeros((len(filters), len(rules)))
+    ticks = np.arange(history.returns.shape[1])
+    marked = np.nan_to_num(history.returns, nan=0.0) * history.cost[:, None]   # P&L if held, 0 before entry
+    for r in range(len(rules)):
+        # Open positions marked at every tick, closed ones frozen at their realized P&L
+        tick_pnl = np.where(ticks[None, :] <= exits[r][:, None], marked, pnl[r][:, None])
+        equity = selected @ tick_pnl                                            # filters × ticks
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), 0.0)
+        drawdown[:, r] = (peak - equity).max(axis=1, initial=0.0)
+
+    results = []
+    for f, entry_filter in enumerate(filters):
+        for r, rule in enumerate(rules):
+            n = int(trades[f])
+            results.append(BacktestResult(
+                *entry_filter, *rule, trades=n,
+                win_rate=float(wins[f, r] / n) if n else 0.0,
+                roi=float(total_pnl[f, r] / capital[f]) if capital[f] else 0.0,
+                pnl=round(float(total_pnl[f, r]), 4),
+                max_drawdown=round(float(drawdown[f, r]), 4),
+                avg_hold_hours=float(hold_hours[f, r] / n) if n else 0.0,
+            ))
+    return results
+
+
+# Process pool workers get the history once, through the initializer
+_WORKER_STATE = {}
+
+
+def _init_worker(history: History, filters: list, mask):
+    _WORKER_STATE.update(history=history, filters=filters, mask=mask)
+
+
+def _evaluate_rules(rules: list) -> list:
+    return _evaluate(_WORKER_STATE["history"], _WORKER_STATE["filters"], _WORKER_STATE["mask"], rules)
+
+
+def backtest(history: History, filters: list, rules: list, workers: int = None) -> list:
+    """BacktestResult for every entry filter × exit rule."""
+    _require_numpy()
+    mask = entry_mask(history, filters)
+    cells = len(filters) * len(rules) * len(history.cost)
+    workers = workers or os.cpu_count() or 1
+    if cells < POOL_CELLS or workers < 2 or len(rules) < 2:
+        return _evaluate(history, filters, mask, rules)
+    per_chunk = max(1, len(rules) // (workers * 2))
+    chunks = [rules[i:i + per_chunk] for i in range(0, len(rules), per_chunk)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(history, filters, mask)) as pool:
+        outputs = list(pool.map(_evaluate_rules, chunks))
+    # Same order as the single-process path: filter-major, then rules
+    per_filter = [[] for _ in filters]
+    for chunk, chunk_results in zip(chunks, outputs):
+        for f in range(len(filters)):
+            per_filter[f].extend(chunk_results[f * len(chunk):(f + 1) * len(chunk)])
+    return [result for results in per_filter for result in results]
+
+
+def grid(min_coverages=MIN_COVERAGES, tier_filters=TIER_FILTERS, position_limits=POSITION_LIMITS,
+         take_profits=TAKE_PROFITS, stop_losses=STOP_LOSSES, max_hold_hours=MAX_HOLD_HOURS) -> tuple:
+    """(entry filters, exit rules) for the cartesian product of the given values."""
+    filters = [EntryFilter(c, t, p) for c in min_coverages for t in tier_filters for p in position_limits]
+    rules = [ExitRule(tp, sl, h) for tp in take_profits for sl in stop_losses for h in max_hold_hours]
+    return filters, rules
+
+
+def _level(value: float, unit: str = "%") -> str:
+    if value == NONE:
+        return "—"
+    return f"{value:.0%}" if unit == "%" else f"{value:g}{unit}"
+
+
+def format_results(results: list, top: int = 10, sort: str = "roi", min_trades: int = MIN_TRADES,
+                   baseline: BacktestResult = None) -> str:
+    ranked = sorted((r for r in results if r.trades >= min_trades), key=lambda r: getattr(r, sort), reverse=True)
+    msg = f"🦞 Backtest: {len(results):,} configurations, {len(ranked):,} with ≥{min_trades} trades (by {sort})\n"
+    msg += "   cov  tier  max  |   TP    SL   hold | trades   win     ROI        P&L   drawdown  hold\n"
+    rows = ranked[:top] + ([baseline] if baseline else [])
+    for i, r in enumerate(rows):
+        if baseline is not None and i == len(rows) - 1:
+            msg += "   current cron settings:\n"
+        msg += (f"   {r.min_coverage:.0%}  {r.tier_filter:>4}  {r.max_positions or '∞':>3}  | "
+                f"{_level(r.take_profit):>4}  {_level(r.stop_loss):>4}  {_level(r.max_hold_hours, 'h'):>5} | "
+                f"{r.trades:>6}  {r.win_rate:>4.0%}  {r.roi:>+6.1%}  {r.pnl:>+9.2f}  {r.max_drawdown:>9.2f}  "
+                f"{r.avg_hold_hours:>4.0f}h\n")
+    return msg
+
+
+def run(db_path=HEDGE_DB, filters: list = None, rules: list = None, days: float = None,
+        store: PriceStore = None, workers: int = None) -> tuple:
+    """Load once and backtest the grid: (History, [BacktestResult], baseline result, seconds)."""
+    started = time.monotonic()
+    history = load_history(db_path, store, days)
+    default_filters, default_rules = grid()
+    filters, rules = filters or default_filters, rules or default_rules
+    results = backtest(history, filters, rules, workers)
+
+    # Today's cron settings, held to the end, as the reference row
+    current = EntryFilter(float(os.environ.get("MIN_COVERAGE", 0.85)), int(os.environ.get("TIER_FILTER", 2)), 0)
+    hold = ExitRule(NONE, NONE, NONE)
+    baseline = backtest(history, [current], [hold])[0] if len(history.cost) else None
+    return history, results, baseline, time.monotonic() - started
+
+
+def synthetic_history_db(path, hedges: int = 2000, days: int = 60, seed: int = 13):
+    """Hedge DB with random-walk leg prices (30-minute monitor ticks) for bench runs."""
+    import random
+
+    rng = random.Random(seed)
+    markets = max(2, hedges // 2)
+    end = 1_780_000_000.0
+    start = end - days * 86400
+    stamp = lambda ts: datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")   # noqa: E731
+
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE hedges (id INTEGER PRIMARY KEY, target_market_id TEXT, cover_market_id TEXT, tier INTEGER,
+                             coverage REAL, total_real_cost REAL, status TEXT, created_at TEXT);
+        CREATE TABLE scans (id INTEGER PRIMARY KEY, scan_timestamp TEXT, markets_scanned INTEGER,
+                            hedges_found INTEGER);
+    """)
+    conn.executescript(PRICE_HISTORY_SCHEMA)
+    scans = [start + i * 6 * 3600 for i in range(days * 4)]
+    rows = []
+    for m in range(markets):
+        price = rng.uniform(0.1, 0.9)
+        for k in range(days * 48):
+            price = min(0.99, max(0.01, price + rng.gauss(0, 0.01)))
+            rows.append((str(m), round(price, 4), round(1 - price, 4), stamp(start + k * 1800)))
+    with conn:
+        conn.executemany("INSERT INTO scans (scan_timestamp, markets_scanned, hedges_found) VALUES (?, 100, 10)",
+                         [(stamp(ts),) for ts in scans])
+        conn.executemany("INSERT INTO price_history (market_id, yes_price, no_price, recorded_at) VALUES (?, ?, ?, ?)",
+                         rows)
+        conn.executemany(
+            "INSERT INTO hedges (target_market_id, cover_market_id, tier, coverage, total_real_cost, status, "
+            "created_at) VALUES (?, ?, ?, ?, ?, 'active', ?)",
+            [(str(rng.randrange(markets)), str(rng.randrange(markets)), rng.randint(1, 3),
+              round(rng.uniform(0.85, 0.99), 3), round(rng.uniform(1, 50), 2),
+              stamp(rng.choice(scans[:-8]) + 60)) for _ in range(hedges)])
+    conn.close()
+
+
+def main():
+    """Backtest entry filters and exit rules over the stored hedge history."""
+    import argparse
+
+    def level(text):
+        return NONE if text.lower() in ("none", "inf", "-") else float(text)
+
+    parser = argparse.ArgumentParser(description="Vectorized hedge backtester")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Backtest a parameter grid over hedge_testing.db")
+    run_parser.add_argument("--db", default=str(HEDGE_DB))
+    run_parser.add_argument("--days", type=float, default=None, help="Only hedges opened in the last N days")
+    bench_parser = sub.add_parser("bench", help="Backtest the default grid over a synthetic history")
+    bench_parser.add_argument("--hedges", type=int, default=2000)
+    bench_parser.add_argument("--days", type=int, default=60)
+    for p in (run_parser, bench_parser):
+        p.add_argument("--min-coverage", type=float, nargs="+", default=list(MIN_COVERAGES))
+        p.add_argument("--tier", type=int, nargs="+", default=list(TIER_FILTERS))
+        p.add_argument("--max-positions", type=int, nargs="+", default=list(POSITION_LIMITS))
+        p.add_argument("--take-profit", type=level, nargs="+", default=list(TAKE_PROFITS))
+        p.add_argument("--stop-loss", type=level, nargs="+", default=list(STOP_LOSSES))
+        p.add_argument("--max-hold", type=level, nargs="+", default=list(MAX_HOLD_HOURS), help="Hours")
+        p.add_argument("--workers", type=int, default=None)
+        p.add_argument("--top", type=int, default=10)
+        p.add_argument("--sort", choices=["roi", "win_rate", "pnl"], default="roi")
+    args = parser.parse_args()
+
+    if not HAS_NUMPY:
+        print("❌ hedge_backtest needs NumPy (pip install numpy)")
+        sys.exit(1)
+
+    filters, rules = grid(args.min_coverage, args.tier, args.max_positions,
+                          args.take_profit, args.stop_loss, args.max_hold)
+    if args.command == "bench":
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "hedge.db"
+            synthetic_history_db(db_path, args.hedges, args.days)
+            store = PriceStore(Path(tmp) / "store", db_path)
+            for label in ("history load, importing price_history into the store", "history load from the store"):
+                started = time.monotonic()
+                history = load_history(db_path, store)
+                print(f"🦞 {label}: {time.monotonic() - started:.2f}s")
+            workers = args.workers or os.cpu_count() or 1
+            pooled = workers > 1 and len(filters) * len(rules) * len(history.cost) >= POOL_CELLS
+            started = time.monotonic()
+            results = backtest(history, filters, rules, workers)
+            print(f"🦞 {len(results):,} configurations × {len(history.cost):,} hedges × {len(history.grid):,} ticks: "
+                  f"{time.monotonic() - started:.2f}s ({f'{workers} processes' if pooled else 'one process'})")
+        print(format_results(results, args.top, args.sort), end="")
+        return
+
+    history, results, baseline, elapsed = run(args.db, filters, rules, args.days, workers=args.workers)
+    print(f"✅ {len(history.cost):,} hedges ({history.skipped} without prices) × {len(history.grid):,} ticks "
+          f"in {elapsed:.2f}s")
+    print(format_results(results, args.top, args.sort, baseline=baseline), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Pooled, WAL-mode access to hedge_testing.db.
+
+The scanner, the 30-minute monitor, the dashboard, the status reports and
+the Discord bot all hit the same SQLite file. With the default rollback
+journal a reader holding the file blocks the monitor's write (and vice
+versa) until "database is locked". Every connection from this module puts
+the database in WAL mode, so readers see a consistent snapshot while one
+writer appends, and:
+
+- readers come from a bounded pool of query-only connections (opened
+  lazily, handed out LIFO so the warmest statement cache is reused);
+- writes go through a single writer connection per process, one
+  transaction per call, serialized by a lock instead of by busy retries;
+- enqueue() buffers small writes and flush() commits them in one
+  transaction, grouped into executemany() per statement;
+- aread()/awrite()/awrite_many() run on the pool's own thread executor,
+  so asyncio callers (the Discord bot, specialists) never block the loop.
+
+sqlite3 keeps a per-connection cache of prepared statements
+(STATEMENT_CACHE), so reusing pooled connections reuses prepared statements.
+
+Usage:
+    db = get_pool()                          # one pool per database file per process
+    with db.connection() as conn:            # pooled reader
+        summary = summarize(conn)
+    with db.writer() as conn:                # one write transaction
+        conn.executemany("INSERT ...", rows)
+    db.enqueue("INSERT ...", row); db.flush()
+    rows = await db.aread("SELECT ...", params)
+
+    python3 hedge_db_pool.py status
+    python3 hedge_db_pool.py bench --readers 4 --seconds 5
+"""
+
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+HEDGE_DB = POLYCLAW_DIR / "db" / "hedge_testing.db"
+
+POOL_SIZE = int(os.environ.get("HEDGE_DB_POOL_SIZE", 4))   # reader connections per process
+BUSY_TIMEOUT = 30          # seconds SQLite waits for another process's write lock
+ACQUIRE_TIMEOUT = 30       # seconds to wait for a free pooled reader
+STATEMENT_CACHE = 256      # prepared statements kept per connection
+BATCH_SIZE = 500           # queued writes that trigger a flush
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",     # durable at checkpoints; WAL makes this safe against corruption
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class PoolTimeout(TimeoutError):
+    """No pooled connection became free in time."""
+
+
+class HedgeDBPool:
+    """Bounded reader pool plus one serialized writer for one SQLite file."""
+
+    def __init__(self, path=HEDGE_DB, size: int = POOL_SIZE, acquire_timeout: float = ACQUIRE_TIMEOUT):
+        self.path = Path(path)
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self._readers = queue.LifoQueue()
+        for _ in range(size):
+            self._readers.put(None)   # connections are opened lazily
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._pending = []            # (sql, params) queued by enqueue()
+        self._pending_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.stats = {"reads": 0, "writes": 0, "flushes": 0, "queued": 0, "waits": 0}
+
+    def _connect(self, query_only: bool) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        if query_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    # --- Reading ------------------------------------------------------------
+
+    @contextmanager
+    def connection(self):
+        """Borrow a query-only connection; it goes back to the pool on exit."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            self.stats["waits"] += 1
+            try:
+                conn = self._readers.get(timeout=self.acquire_timeout)
+            except queue.Empty:
+                raise PoolTimeout(f"no free connection to {self.path} after {self.acquire_timeout}s") from None
+        try:
+            conn = conn or self._connect(query_only=True)
+            self.stats["reads"] += 1
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def read(self, sql: str, params=()) -> list:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def read_one(self, sql: str, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    # --- Writing ------------------------------------------------------------
+
+    @contextmanager
+    def writer(self):
+        """The process's writer connection inside one transaction (committed on exit)."""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect(query_only=False)
+            conn = self._writer
+            if conn.in_transaction:
+                yield conn            # nested: part of the outer transaction
+                return
+            with conn:
+                self.stats["writes"] += 1
+                yield conn
+
+    def write(self, sql: str, params=()) -> int:
+        """Run one statement in its own transaction; returns rowcount."""
+        with self.writer() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def write_many(self, sql: str, rows) -> int:
+        with self.writer() as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def enqueue(self, sql: str, params=()):
+        """Buffer a write; flushed with the others in one transaction at BATCH_SIZE or on flush()."""
+        with self._pending_lock:
+            self._pending.append((sql, params))
+            self.stats["queued"] += 1
+            full = len(self._pending) >= BATCH_SIZE
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Commit queued writes in one transaction, consecutive statements batched; returns rows written."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        groups = []
+        for sql, params in pending:
+            if groups and groups[-1][0] == sql:
+                groups[-1][1].append(params)
+            else:
+                groups.append((sql, [params]))
+        with self.writer() as conn:
+            for sql, rows in groups:
+                conn.executemany(sql, rows)
+        self.stats["flushes"] += 1
+        return len(pending)
+
+    # --- asyncio ------------------------------------------------------------
+
+    def executor(self) -> ThreadPoolExecutor:
+        """Dedicated threads for database calls from asyncio code (one per pooled reader, plus the writer)."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.size + 1, thread_name_prefix="hedge-db")
+            return self._executor
+
+    async def run(self, fn, *args):
+        """fn(*args) on the database executor."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor(), fn, *args)
+
+    async def aread(self, sql: str, params=()) -> list:
+        return await self.run(self.read, sql, params)
+
+    async def aread_one(self, sql: str, params=()):
+        return await self.run(self.read_one, sql, params)
+
+    async def awrite(self, sql: str, params=()) -> int:
+        return await self.run(self.write, sql, params)
+
+    async def awrite_many(self, sql: str, rows) -> int:
+        return await self.run(self.write_many, sql, list(rows))
+
+    # --- Lifecycle ----------------------------------------------------------
+
+    def close(self):
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        while True:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                break
+            if conn:
+                conn.close()
+        for _ in range(self.size):
+            self._readers.put(None)
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(path=HEDGE_DB) -> HedgeDBPool:
+    """The process-wide pool for a database file."""
+    key = str(Path(path).resolve())
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = HedgeDBPool(path)
+        return pool
+
+
+def _bench(path: Path, readers: int, seconds: float):
+    """Readers summarizing hedges while a monitor thread writes price ticks."""
+    import random
+
+    from hedge_summary import ensure_indexes, summarize
+    from price_refresh import PRICE_HISTORY_SCHEMA
+
+    conn = sqlite3.connect(str(path))
+    conn.executescript(PRICE_HISTORY_SCHEMA + """
+        CREATE TABLE IF NOT EXISTS hedges (id INTEGER PRIMARY KEY, target_market_id TEXT, cover_market_id TEXT,
+                                           tier INTEGER, coverage REAL, total_real_cost REAL, status TEXT);
+        CREATE TABLE IF NOT EXISTS scans (id INTEGER PRIMARY KEY, scan_timestamp TEXT, markets_scanned INTEGER,
+                                          hedges_found INTEGER);
+    """)
+    ensure_indexes(conn)
+    rng = random.Random(1)
+    with conn:
+        conn.executemany("INSERT INTO hedges (target_market_id, cover_market_id, tier, coverage, total_real_cost, "
+                         "status) VALUES (?, ?, ?, ?, ?, 'active')",
+                         [(str(i), str(i + 1), rng.randint(1, 3), rng.uniform(0.85, 0.99), rng.uniform(1, 50))
+                          for i in range(20000)])
+    conn.close()
+
+    def percentile(samples, q):
+        samples = sorted(samples)
+        return samples[int(len(samples) * q)] * 1000 if samples else 0.0
+
+    def run(label, read_conn, write_conn):
+        stop = time.monotonic() + seconds
+        reads, writes = [], []
+
+        def read_loop():
+            while time.monotonic() < stop:
+                started = time.monotonic()
+                with read_conn() as conn:
+                    summarize(conn)
+                reads.append(time.monotonic() - started)
+
+        def write_loop():
+            while time.monotonic() < stop:
+                recorded_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                rows = [(str(rng.randrange(20000)), 0.4, 0.6, recorded_at) for _ in range(200)]
+                started = time.monotonic()
+                with write_conn() as conn:
+                    conn.executemany("INSERT INTO price_history (market_id, yes_price, no_price, recorded_at) "
+                                     "VALUES (?, ?, ?, ?)", rows)
+                writes.append(time.monotonic() - started)
+                time.sleep(0.01)
+
+        threads = [threading.Thread(target=read_loop) for _ in range(readers)] + [threading.Thread(target=write_loop)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        print(f"🦞 {label}: {len(reads):,} summaries (p99 {percentile(reads, 0.99):.1f}ms), "
+              f"{len(writes):,} monitor writes (p50 {percentile(writes, 0.5):.1f}ms, "
+              f"p99 {percentile(writes, 0.99):.1f}ms)")
+
+    @contextmanager
+    def raw_connection():
+        conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    run("rollback journal, connection per call", raw_connection, raw_connection)
+    pool = HedgeDBPool(path, size=readers)
+    run("WAL pool", pool.connection, pool.writer)
+    pool.close()
+
+
+def main():
+    """Show pool/database settings or benchmark readers against the monitor's writes."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pooled hedge DB access")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Journal mode and WAL size of the hedge DB")
+    bench_parser = sub.add_parser("bench", help="Concurrent readers vs a writer: rollback journal vs WAL pool")
+    bench_parser.add_argument("--readers", type=int, default=4)
+    bench_parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--db", default=str(HEDGE_DB))
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        import sys
+        import tempfile
+        sys.path.insert(0, str(Path(__file__).parent))
+        with tempfile.TemporaryDirectory() as tmp:
+            _bench(Path(tmp) / "hedge.db", args.readers, args.seconds)
+        return
+
+    if not Path(args.db).exists():
+        print(f"❌ {args.db} not found")
+        return
+    pool = HedgeDBPool(args.db, size=1)
+    mode = pool.read_one("PRAGMA journal_mode")[0]
+    wal = Path(f"{args.db}-wal")
+    print(f"📊 {args.db}: journal_mode={mode}, WAL {wal.stat().st_size if wal.exists() else 0:,} bytes")
+    print(f"   pool size {POOL_SIZE}, statement cache {STATEMENT_CACHE}, busy timeout {BUSY_TIMEOUT}s")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
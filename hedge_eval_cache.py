@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Persistent cache for LLM hedge-pair evaluations.
+
+The scanner asks an LLM to judge market pairs; the answer only changes when
+the pair's prices move, the prompt changes or a market resolves. Results are
+kept in hedge_eval_cache.db next to hedge_testing.db, keyed by
+(market A, market B, price snapshot bucket, prompt version), with TTL and
+LRU eviction. Pairs are unordered, like incremental_scan.pair_key: (a, b)
+and (b, a) at the same prices share one entry.
+
+The LLM evaluation lives in the polyclaw hedge_test scanner, outside this
+workspace, so nothing in this tree calls the cache. The scanner is meant
+to wrap its pair evaluation with it, next to the incremental_scan planner:
+    with HedgeEvalCache() as cache:
+        verdict = cache.get_or_evaluate(a_id, b_id, a_price, b_price,
+                                        lambda: llm_evaluate_pair(a, b))
+        for state in plan.changed:   # incremental_scan.ScanPlan
+            if state.resolved:
+                cache.invalidate_market(state.market_id)
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from incremental_scan import pair_key
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+EVAL_CACHE_DB = POLYCLAW_DIR / "db" / "hedge_eval_cache.db"
+
+PROMPT_VERSION = "v1"     # bump when the hedge evaluation prompt changes
+PRICE_BUCKET = 0.01       # prices within a cent share an evaluation
+DEFAULT_TTL = 7 * 24 * 3600
+MAX_ENTRIES = 50000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    market_a TEXT NOT NULL,
+    market_b TEXT NOT NULL,
+    price_bucket TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (market_a, market_b, price_bucket, prompt_version)
+);
+CREATE INDEX IF NOT EXISTS idx_evaluations_last_used ON evaluations(last_used);
+CREATE INDEX IF NOT EXISTS idx_evaluations_market_b ON evaluations(market_b);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+COUNTERS = ("hits", "misses", "evictions", "invalidations")
+
+
+def price_bucket(price_a: float, price_b: float, step: float = PRICE_BUCKET) -> str:
+    """Snapshot bucket for a pair's prices."""
+    return f"{round(float(price_a) / step)}:{round(float(price_b) / step)}"
+
+
+class HedgeEvalCache:
+    """SQLite-backed memo of hedge-pair evaluations."""
+
+    def __init__(self, path=EVAL_CACHE_DB, ttl: float = DEFAULT_TTL, max_entries: int = MAX_ENTRIES,
+                 prompt_version: str = PROMPT_VERSION):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prompt_version = prompt_version
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)", [(c,) for c in COUNTERS]
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _count(self) -> int:
+        # Several scanner processes share the file: count rows, never a local tally
+        return self.conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+    def _bump(self, counter: str, amount: int = 1):
+        self.conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, counter))
+
+    def _key(self, market_a, market_b, price_a, price_b) -> tuple:
+        market_a, market_b = str(market_a), str(market_b)
+        if pair_key(market_a, market_b) != (market_a, market_b):
+            market_a, market_b, price_a, price_b = market_b, market_a, price_b, price_a
+        return (market_a, market_b, price_bucket(price_a, price_b), self.prompt_version)
+
+    def get(self, market_a, market_b, price_a: float, price_b: float):
+        """Cached evaluation for this pair and price snapshot, or None."""
+        key = self._key(market_a, market_b, price_a, price_b)
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT result FROM evaluations WHERE market_a = ? AND market_b = ? "
+            "AND price_bucket = ? AND prompt_version = ? AND created_at >= ?",
+            (*key, now - self.ttl),
+        ).fetchone()
+
+        with self.conn:
+            if row is None:
+                self._bump("misses")
+                return None
+            self.conn.execute(
+                "UPDATE evaluations SET last_used = ?, hits = hits + 1 WHERE market_a = ? "
+                "AND market_b = ? AND price_bucket = ? AND prompt_version = ?",
+                (now, *key),
+            )
+            self._bump("hits")
+        return json.loads(row[0])
+
+    def put(self, market_a, market_b, price_a: float, price_b: float, result):
+        """Store an evaluation (any JSON-serialisable value)."""
+        key = self._key(market_a, market_b, price_a, price_b)
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO evaluations "
+                "(market_a, market_b, price_bucket, prompt_version, result, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, json.dumps(result), now, now),
+            )
+            # The insert holds the write lock, so the count includes other processes' entries
+            if self._count() > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones down to 90% of max."""
+        cutoff = time.time() - self.ttl
+        expired = self.conn.execute("DELETE FROM evaluations WHERE created_at < ?", (cutoff,)).rowcount
+
+        excess = self._count() - int(self.max_entries * 0.9)
+        evicted = 0
+        if excess > 0:
+            evicted = self.conn.execute(
+                "DELETE FROM evaluations WHERE rowid IN "
+                "(SELECT rowid FROM evaluations ORDER BY last_used LIMIT ?)",
+                (excess,),
+            ).rowcount
+        self._bump("evictions", expired + evicted)
+
+    def get_or_evaluate(self, market_a, market_b, price_a: float, price_b: float, evaluate):
+        """Return the cached evaluation, calling evaluate() only on a miss."""
+        cached = self.get(market_a, market_b, price_a, price_b)
+        if cached is not None:
+            return cached
+        result = evaluate()
+        self.put(market_a, market_b, price_a, price_b, result)
+        return result
+
+    async def aget_or_evaluate(self, market_a, market_b, price_a: float, price_b: float, evaluate):
+        """Async variant: evaluate is a coroutine function."""
+        cached = self.get(market_a, market_b, price_a, price_b)
+        if cached is not None:
+            return cached
+        result = await evaluate()
+        self.put(market_a, market_b, price_a, price_b, result)
+        return result
+
+    def invalidate_market(self, market_id) -> int:
+        """Forget every evaluation involving a market (e.g. when it resolves)."""
+        market_id = str(market_id)
+        with self.conn:
+            removed = self.conn.execute(
+                "DELETE FROM evaluations WHERE market_a = ? OR market_b = ?", (market_id, market_id)
+            ).rowcount
+            self._bump("invalidations", removed)
+        return removed
+
+    def purge(self) -> int:
+        """Drop expired entries and entries from older prompt versions."""
+        with self.conn:
+            removed = self.conn.execute(
+                "DELETE FROM evaluations WHERE created_at < ? OR prompt_version != ?",
+                (time.time() - self.ttl, self.prompt_version),
+            ).rowcount
+            self._bump("evictions", removed)
+        return removed
+
+    def stats(self) -> dict:
+        counters = dict(self.conn.execute("SELECT name, value FROM counters"))
+        lookups = counters.get("hits", 0) + counters.get("misses", 0)
+        counters["entries"] = self._count()
+        counters["hit_rate"] = counters.get("hits", 0) / lookups if lookups else 0.0
+        return counters
+
+
+def main():
+    """Inspect or maintain the evaluation cache."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hedge evaluation cache")
+    parser.add_argument("command", choices=["stats", "purge", "invalidate"])
+    parser.add_argument("market_id", nargs="?", help="Market to invalidate")
+    parser.add_argument("--db", default=str(EVAL_CACHE_DB))
+    args = parser.parse_args()
+
+    with HedgeEvalCache(args.db) as cache:
+        if args.command == "purge":
+            print(f"✅ Purged {cache.purge()} entries")
+        elif args.command == "invalidate":
+            if not args.market_id:
+                parser.error("invalidate needs a market_id")
+            print(f"✅ Invalidated {cache.invalidate_market(args.market_id)} entries for {args.market_id}")
+        else:
+            stats = cache.stats()
+            print(f"🦞 Entries: {stats['entries']}")
+            print(f"   Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {stats['hit_rate']*100:.1f}%")
+            print(f"   Evictions: {stats['evictions']}  Invalidations: {stats['invalidations']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Hedge alert notifier.
+
+Follows the scan event stream (scan_events.py) and turns hedge_logged and
+failed scan_finished events into alerts. Alerts are batched over
+NOTIFY_WINDOW seconds. A batch is sent early when its scan finishes or when
+it reaches MAX_BATCH alerts. The same hedge pair or failure is announced at
+most once per DEDUPE_TTL. Each batch becomes one message, which is fanned
+out to every configured sink:
+
+- log       appends to /tmp/hedge_notifications.log (always on)
+- telegram  stand-in outbox of {chat_id, text} lines for the Telegram
+            sender (when TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID are set)
+- discord   posts to DISCORD_WEBHOOK_URL (when set)
+
+A failing sink is logged and skipped; the others still get the batch. The
+read position and dedupe state persist in STATE_FILE. After a restart the
+notifier resumes from the first event of the batch that was never sent.
+
+Usage:
+  python3 hedge_notifier.py run       # resident consumer (hedge_scheduler daemon runs one in-process)
+  python3 hedge_notifier.py drain     # send whatever is pending, then exit
+  python3 hedge_notifier.py test      # one test message to every sink
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from scan_events import EVENTS_FILE, HEDGE_LOGGED, POLL_INTERVAL, SCAN_FINISHED, EventTail
+
+STATE_FILE = Path("/tmp/hedge_notifier_state.json")
+NOTIFY_LOG = Path("/tmp/hedge_notifications.log")
+TELEGRAM_OUTBOX = Path("/tmp/hedge_telegram_outbox.jsonl")
+
+NOTIFY_WINDOW = float(os.environ.get("NOTIFY_WINDOW", 60))   # seconds alerts are held for batching
+DEDUPE_TTL = 6 * 3600        # one scan interval: a hedge pair re-logged by the next scan isn't re-announced
+MAX_BATCH = 20               # alerts that trigger an early send
+MAX_LISTED = 10              # hedges spelled out per message
+SINK_TIMEOUT = 10
+
+DASHBOARD_URL = "http://107.174.92.36:8501"
+
+
+class Alert(NamedTuple):
+    key: str          # dedupe key
+    kind: str         # "hedge" or "scan_failed"
+    scan_id: str
+    text: str
+    ts: float
+
+
+def hedge_alert(record: dict) -> Alert:
+    """Alert for a hedge_logged event (keyed by its unordered market pair)."""
+    markets = sorted(str(m) for m in (record.get("target_market_id"), record.get("cover_market_id")) if m)
+    if record.get("hedge_id") is None:
+        key = f"hedges:{record.get('scan_id')}"
+        text = f"{record.get('count', 1)} new hedge(s)"
+    else:
+        key = "hedge:" + (":".join(markets) if len(markets) == 2 else str(record["hedge_id"]))
+        legs = " / ".join(str(record.get(q) or record.get(m) or "?") for q, m in
+                          (("target_question", "target_market_id"), ("cover_question", "cover_market_id")))
+        text = (f"#{record['hedge_id']} Tier {record.get('tier')}, {(record.get('coverage') or 0) * 100:.1f}% "
+                f"coverage, ${record.get('total_real_cost') or 0:.2f} — {legs}")
+    return Alert(key, "hedge", record.get("scan_id"), text, record.get("ts", time.time()))
+
+
+def failure_alert(record: dict):
+    """Alert for a scan_finished event that timed out or failed, else None."""
+    if record.get("timed_out"):
+        reason = "timed out"
+    elif record.get("error"):
+        reason = f"failed to start: {record['error']}"
+    elif record.get("returncode"):
+        reason = f"exited with code {record['returncode']}"
+    else:
+        return None
+    return Alert(f"scan_failed:{reason}", "scan_failed", record.get("scan_id"), f"Scan {reason}",
+                 record.get("ts", time.time()))
+
+
+def format_batch(alerts: list) -> str:
+    """One message for a batch of alerts."""
+    hedges = [a for a in alerts if a.kind == "hedge"]
+    failures = [a for a in alerts if a.kind == "scan_failed"]
+    msg = ""
+    if hedges:
+        msg += f"🦞 **Hedge Alert!**\n\nFound {len(hedges)} new hedge opportunities:\n\n"
+        msg += "".join(f"• {a.text}\n" for a in hedges[:MAX_LISTED])
+        if len(hedges) > MAX_LISTED:
+            msg += f"... and {len(hedges) - MAX_LISTED} more\n"
+        msg += "\nUse `/hedge_db` to see all hedges.\n"
+    for alert in failures:
+        msg += f"❌ {alert.text}\n"
+    return msg + f"\nView dashboard: {DASHBOARD_URL}"
+
+
+class LogSink:
+    name = "log"
+
+    def __init__(self, path: Path = NOTIFY_LOG):
+        self.path = path
+
+    def send(self, message: str):
+        with open(self.path, "a") as f:
+            f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]\n{message}\n\n")
+
+
+class TelegramSink:
+    """Stand-in for Telegram delivery: queues {chat_id, text} for the sender."""
+    name = "telegram"
+
+    def __init__(self, chat_id: str, outbox: Path = TELEGRAM_OUTBOX):
+        self.chat_id = chat_id
+        self.outbox = outbox
+
+    def send(self, message: str):
+        with open(self.outbox, "a") as f:
+            f.write(json.dumps({"chat_id": self.chat_id, "text": message, "ts": time.time()}) + "\n")
+
+
+class DiscordSink:
+    name = "discord"
+
+    def __init__(self, webhook_url: str):
+        self.webhook_url = webhook_url
+
+    def send(self, message: str):
+        request = urllib.request.Request(
+            self.webhook_url, data=json.dumps({"content": message[:2000]}).encode(),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=SINK_TIMEOUT) as response:
+            response.read()
+
+
+def build_sinks(config: dict = None) -> list:
+    """Sinks enabled by config (hedge_scheduler.load_config keys) or the environment."""
+    config = config or {}
+    token = config.get("telegram_bot_token", os.environ.get("TELEGRAM_BOT_TOKEN", ""))
+    chat_id = config.get("telegram_chat_id", os.environ.get("TELEGRAM_CHAT_ID", ""))
+    webhook = config.get("discord_webhook_url", os.environ.get("DISCORD_WEBHOOK_URL", ""))
+    sinks = [LogSink()]
+    if token and chat_id:
+        sinks.append(TelegramSink(chat_id))
+    if webhook:
+        sinks.append(DiscordSink(webhook))
+    return sinks
+
+
+class HedgeNotifier:
+    """Batches, dedupes and fans out alerts from the scan event stream."""
+
+    def __init__(self, sinks: list, path: Path = EVENTS_FILE, state_path: Path = STATE_FILE,
+                 window: float = NOTIFY_WINDOW, dedupe_ttl: float = DEDUPE_TTL, log=print):
+        self.sinks = sinks
+        self.state_path = state_path
+        self.window = window
+        self.dedupe_ttl = dedupe_ttl
+        self.log = log
+        state = self._load_state()
+        self.seen = state.get("seen", {})       # dedupe key -> last announced
+        self.tail = EventTail(path, state.get("offset", 0), state.get("inode"))
+        if "offset" not in state:
+            self.tail.skip_to_end()              # first run: don't announce old history
+        self.committed = self.tail.position     # where to resume if pending alerts are lost
+        self.pending = []
+        self.sent = 0
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({**self.committed, "seen": self.seen}, f)
+        os.replace(tmp, self.state_path)
+
+    def _duplicate(self, alert: Alert) -> bool:
+        last = self.seen.get(alert.key)
+        return (last is not None and alert.ts - last < self.dedupe_ttl) or \
+            any(a.key == alert.key for a in self.pending)
+
+    def handle(self, record: dict) -> bool:
+        """Queue an alert for an event; True when the pending batch should go out now."""
+        if record.get("event") == HEDGE_LOGGED:
+            alert = hedge_alert(record)
+        elif record.get("event") == SCAN_FINISHED:
+            alert = failure_alert(record)
+            if alert is None:
+                return any(a.scan_id == record.get("scan_id") for a in self.pending)
+        else:
+            return False
+        if not self._duplicate(alert):
+            self.pending.append(alert)
+        return record.get("event") == SCAN_FINISHED or len(self.pending) >= MAX_BATCH
+
+    def flush(self) -> int:
+        """Send the pending batch to every sink; returns alerts sent."""
+        alerts, self.pending = self.pending, []
+        if alerts:
+            message = format_batch(alerts)
+            for sink in self.sinks:
+                try:
+                    sink.send(message)
+                except Exception as e:
+                    self.log(f"⚠️  {sink.name} notification failed: {e}")
+            for alert in alerts:
+                self.seen[alert.key] = alert.ts
+            self.sent += len(alerts)
+        now = time.time()
+        self.seen = {key: ts for key, ts in self.seen.items() if now - ts < self.dedupe_ttl}
+        self.committed = self.tail.position
+        self._save_state()
+        return len(alerts)
+
+    def poll(self) -> int:
+        """Read new events, sending the batch if it is due; returns alerts sent."""
+        records = self.tail.read()
+        due = False
+        for record in records:
+            due = self.handle(record) or due
+        if due or (self.pending and time.time() - self.pending[0].ts >= self.window):
+            return self.flush()
+        if records and not self.pending:
+            self.committed = self.tail.position
+            self._save_state()
+        return 0
+
+    def run(self, stop_event: threading.Event = None, poll_interval: float = POLL_INTERVAL):
+        """Follow the event stream until stop_event is set."""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.poll()
+            stop_event.wait(poll_interval)
+        self.flush()
+
+    def drain(self) -> int:
+        """Handle everything written so far and send it without waiting for the window."""
+        return self.poll() + self.flush()
+
+
+def main():
+    """Run, drain or test the notifier."""
+    import argparse
+
+    from hedge_scheduler import JobLock, load_config
+
+    parser = argparse.ArgumentParser(description="Batched hedge notifications")
+    parser.add_argument("command", choices=["run", "drain", "test"])
+    parser.add_argument("--window", type=float, default=NOTIFY_WINDOW)
+    args = parser.parse_args()
+
+    sinks = build_sinks(load_config())
+    if args.command == "test":
+        message = format_batch([Alert("test", "hedge", None, "Test notification", time.time())])
+        for sink in sinks:
+            sink.send(message)
+            print(f"✅ Sent test message to {sink.name}")
+        return
+
+    lock = JobLock("notifier")
+    if not lock.acquire():
+        print("⚠️  Notifier already running in another process")
+        return
+    try:
+        notifier = HedgeNotifier(sinks, window=args.window)
+        if args.command == "drain":
+            print(f"✅ Sent {notifier.drain()} alerts")
+            return
+        print(f"🦞 Notifier following {EVENTS_FILE} ({', '.join(s.name for s in sinks)}; window {args.window:.0f}s)")
+        stop = threading.Event()
+        try:
+            notifier.run(stop)
+        except KeyboardInterrupt:
+            notifier.flush()
+    finally:
+        lock.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Vectorized numeric pre-filter for hedge-pair candidates.
+
+Before any market pair reaches the LLM, bound what the pair could possibly
+achieve from current prices alone. Every market contributes two outcomes
+(YES at p, NO at 1 - p). The scanner scores a target leg T covered by C as
+
+    coverage = P(T) + (1 - P(T)) * P(C | not T)
+
+where P(C | not T) is the LLM's judgement, not a price. If the market
+priced C consistently, P(C | not T) <= p_c / (1 - p_t) and coverage would
+be at most p_t + p_c. The hedges worth finding are the ones where C is
+underpriced, so the bound allows the cover to be mispriced by up to
+COVERAGE_SLACK:
+
+    cost          = p_a + p_b                          (buy one share of each leg)
+    coverage  <=  min(1, p_a + p_b + COVERAGE_SLACK)
+    tier      >=  tier of that coverage bound
+
+A pair whose bound misses MIN_COVERAGE / TIER_FILTER, or that costs at
+least its payout, is dropped without asking the LLM. PREFILTER_SLACK=1
+keeps every pair under MAX_COST. All N×N outcome pairs are computed with
+NumPy in row blocks, so thousands of markets fit in memory and a scan is
+one batched pass.
+
+Scanner flow (hedge_test scan --prefilter):
+    result = prefilter(markets, min_coverage, tier_filter)
+    pairs = result.market_pairs()                         # the only pairs the LLM sees
+    pairs, skipped = planner.pairs_to_evaluate(pairs, plan)  # incremental_scan
+
+Without NumPy the same bounds are computed in plain Python (sort and
+bisect), which is fine for small scans.
+
+Usage:
+    python3 hedge_prefilter.py run --limit 2000
+    python3 hedge_prefilter.py bench --markets 5000
+"""
+
+import bisect
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from incremental_scan import MarketState, market_state
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Minimum coverage for tiers 1..3; anything lower is tier 4
+TIER_THRESHOLDS = (0.95, 0.90, 0.85)
+LOWEST_TIER = len(TIER_THRESHOLDS) + 1
+
+MIN_COVERAGE = float(os.environ.get("MIN_COVERAGE", 0.85))
+TIER_FILTER = int(os.environ.get("TIER_FILTER", 2))
+MAX_COST = 1.0              # a pair costing its payout or more can't profit
+MIN_LEG_PRICE = 0.01        # outcomes priced under a cent are effectively resolved
+EPSILON = 1e-9              # float slack: 0.672 + 0.328 must count as costing 1.0
+COVERAGE_SLACK = float(os.environ.get("PREFILTER_SLACK", 0.15))   # how far a cover may be underpriced
+BLOCK_CELLS = 1 << 22       # pair cells per block (~4M: tens of MB of temporaries)
+MAX_CANDIDATES = int(os.environ.get("PREFILTER_MAX_CANDIDATES", 20000))   # LLM budget per scan
+
+YES, NO = "YES", "NO"
+
+
+class Candidate(NamedTuple):
+    market_a: str
+    side_a: str
+    price_a: float
+    market_b: str
+    side_b: str
+    price_b: float
+    coverage: float     # upper bound
+    cost: float
+    tier: int           # best tier the pair could reach
+
+
+class PrefilterResult(NamedTuple):
+    candidates: list    # Candidate, best tier then highest coverage first
+    matched: int        # pairs within bounds, before the candidate limit
+    markets: int
+    outcomes: int
+    pairs: int          # outcome pairs considered
+    elapsed: float
+
+    def market_pairs(self) -> list:
+        """Distinct (market_a, market_b) pairs to evaluate, in candidate order."""
+        return list(dict.fromkeys((c.market_a, c.market_b) for c in self.candidates))
+
+    @property
+    def dropped(self) -> int:
+        return self.pairs - self.matched
+
+
+def tier_for(coverage: float) -> int:
+    for tier, threshold in enumerate(TIER_THRESHOLDS, start=1):
+        if coverage >= threshold:
+            return tier
+    return LOWEST_TIER
+
+
+def coverage_floor(min_coverage: float, tier_filter: int) -> float:
+    """Lowest coverage bound that can satisfy both filters."""
+    if 1 <= tier_filter <= len(TIER_THRESHOLDS):
+        return max(min_coverage, TIER_THRESHOLDS[tier_filter - 1])
+    return min_coverage
+
+
+def outcomes(markets: list, min_leg_price: float = MIN_LEG_PRICE) -> list:
+    """[(market_id, side, price)] for both outcomes of every open market."""
+    result = []
+    for market in markets:
+        state = market if isinstance(market, MarketState) else market_state(market)
+        if state.resolved:
+            continue
+        for side, price in ((YES, state.price), (NO, round(1.0 - state.price, 6))):
+            if price >= min_leg_price:
+                result.append((state.market_id, side, price))
+    return result
+
+
+def pair_bounds(price_a, price_b, slack: float = COVERAGE_SLACK):
+    """(coverage bound, cost, tier) for scalars or broadcast NumPy blocks."""
+    cost = price_a + price_b
+    if HAS_NUMPY and isinstance(cost, np.ndarray):
+        coverage = np.minimum(cost + slack, 1.0)
+        tier = np.full(coverage.shape, LOWEST_TIER, dtype=np.int8)
+        for level, threshold in reversed(list(enumerate(TIER_THRESHOLDS, start=1))):
+            tier[coverage >= threshold] = level
+        return coverage, cost, tier
+    coverage = min(cost + slack, 1.0)
+    return coverage, cost, tier_for(coverage)
+
+
+def _candidate_indices_numpy(market_index, prices, floor: float, max_cost: float, block_cells: int,
+                             slack: float = COVERAGE_SLACK):
+    """(i, j) index arrays, i < j, of outcome pairs within bounds; one row block at a time."""
+    n = len(prices)
+    rows_per_block = max(1, block_cells // max(n, 1))
+    found_i, found_j = [], []
+    for start in range(0, n, rows_per_block):
+        stop = min(n, start + rows_per_block)
+        # Columns from `start` on: with i < j below, that's the upper triangle of this block
+        # The tier filter is folded into `floor`, so tiers are only computed for survivors
+        cost = prices[start:stop, None] + prices[None, start:]
+        keep = (np.minimum(cost + slack, 1.0) >= floor - EPSILON) & (cost < max_cost - EPSILON)
+        keep &= np.arange(start, n)[None, :] > np.arange(start, stop)[:, None]
+        keep &= market_index[start:stop, None] != market_index[None, start:]
+        rows, cols = np.nonzero(keep)
+        found_i.append(rows + start)
+        found_j.append(cols + start)
+    if not found_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(found_i), np.concatenate(found_j)
+
+
+def _candidate_indices_python(prices: list, market_ids: list, floor: float, max_cost: float,
+                              slack: float = COVERAGE_SLACK):
+    """Same pairs as the NumPy pass: sort by price, bisect the valid band per outcome."""
+    order = sorted(range(len(prices)), key=prices.__getitem__)
+    ordered = [prices[k] for k in order]
+    pairs = []
+    for k, i in enumerate(order):
+        # Partners j with floor <= p_i + p_j + slack and p_i + p_j < max_cost
+        low = bisect.bisect_left(ordered, floor - slack - prices[i] - 2 * EPSILON, k + 1)
+        high = bisect.bisect_left(ordered, max_cost - prices[i] + 2 * EPSILON, k + 1)
+        for j in order[low:high]:
+            cost = prices[i] + prices[j]
+            if (market_ids[i] != market_ids[j] and min(cost + slack, 1.0) >= floor - EPSILON
+                    and cost < max_cost - EPSILON):
+                pairs.append((min(i, j), max(i, j)))
+    return pairs
+
+
+def prefilter(markets: list, min_coverage: float = MIN_COVERAGE, tier_filter: int = TIER_FILTER,
+              max_cost: float = MAX_COST, min_leg_price: float = MIN_LEG_PRICE, limit: int = None,
+              block_cells: int = BLOCK_CELLS, slack: float = COVERAGE_SLACK) -> PrefilterResult:
+    """Outcome pairs whose price bounds can still meet the coverage and tier filters.
+
+    markets: Gamma-style market dicts or incremental_scan.MarketState
+    limit: keep only the best `limit` candidates (best tier, then coverage); the
+           scanner passes MAX_CANDIDATES so one scan has a bounded LLM budget
+    slack: how far below a consistent price the cover may trade (see module docstring)
+    """
+    started = time.monotonic()
+    legs = outcomes(markets, min_leg_price)
+    market_ids = [leg[0] for leg in legs]
+    n = len(legs)
+    floor = coverage_floor(min_coverage, tier_filter)
+
+    if HAS_NUMPY:
+        ids = {market_id: k for k, market_id in enumerate(dict.fromkeys(market_ids))}
+        market_index = np.fromiter((ids[m] for m in market_ids), dtype=np.int64, count=n)
+        prices = np.fromiter((leg[2] for leg in legs), dtype=np.float64, count=n)
+        found_i, found_j = _candidate_indices_numpy(market_index, prices, floor, max_cost, block_cells, slack)
+        coverage, cost, tier = pair_bounds(prices[found_i], prices[found_j], slack)
+        # Best tier first, then highest coverage bound
+        order = np.lexsort((-coverage, tier))[:limit]
+        pairs = zip(found_i[order].tolist(), found_j[order].tolist())
+        matched = len(found_i)
+    else:
+        found = _candidate_indices_python([leg[2] for leg in legs], market_ids, floor, max_cost, slack)
+        found.sort(key=lambda ij: (tier_for(min(legs[ij[0]][2] + legs[ij[1]][2] + slack, 1.0)),
+                                   -(legs[ij[0]][2] + legs[ij[1]][2])))
+        pairs = found[:limit]
+        matched = len(found)
+
+    candidates = []
+    for i, j in pairs:
+        (market_a, side_a, price_a), (market_b, side_b, price_b) = legs[i], legs[j]
+        coverage, cost, tier = pair_bounds(price_a, price_b, slack)
+        candidates.append(Candidate(market_a, side_a, price_a, market_b, side_b, price_b,
+                                    round(coverage, 6), round(cost, 6), tier))
+
+    distinct_markets = len(set(market_ids))
+    total_pairs = n * (n - 1) // 2 - (n - distinct_markets)   # minus YES/NO of the same market
+    return PrefilterResult(candidates, matched, distinct_markets, n, total_pairs, time.monotonic() - started)
+
+
+def format_result(result: PrefilterResult, min_coverage: float, tier_filter: int, show: int = 10) -> str:
+    share = result.matched / result.pairs * 100 if result.pairs else 0.0
+    msg = (f"🦞 Pre-filter: {result.markets} markets, {result.outcomes} outcomes, "
+           f"{result.pairs:,} pairs → {result.matched:,} within bounds ({share:.2f}%) in {result.elapsed:.2f}s\n")
+    msg += (f"   bounds: coverage ≥ {coverage_floor(min_coverage, tier_filter):.0%}, "
+            f"tier ≤ {tier_filter}, cost < {MAX_COST:g}, slack {COVERAGE_SLACK:g}\n")
+    msg += f"   best {len(result.candidates):,} kept: {len(result.market_pairs()):,} market pairs for LLM evaluation\n"
+    for c in result.candidates[:show]:
+        msg += (f"   Tier {c.tier}  ≤{c.coverage:.1%}  ${c.cost:.3f}  "
+                f"{c.market_a} {c.side_a}@{c.price_a:.2f} + {c.market_b} {c.side_b}@{c.price_b:.2f}\n")
+    return msg
+
+
+def synthetic_markets(count: int, seed: int = 7) -> list:
+    """Deterministic markets with a realistic skew towards cheap and near-certain outcomes."""
+    rng = random.Random(seed)
+    return [MarketState(str(100_000 + i), round(rng.betavariate(0.6, 0.6), 3), rng.uniform(1e3, 1e6), False)
+            for i in range(count)]
+
+
+def main():
+    """Pre-filter live (or stub) markets, or time the pass on synthetic ones."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hedge pair numeric pre-filter")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Pre-filter open markets from the Gamma API")
+    run_parser.add_argument("--limit", type=int, default=500, help="Markets to fetch")
+    run_parser.add_argument("--base-url", default=None, help="Gamma API base URL (e.g. the price_refresh stub)")
+    bench_parser = sub.add_parser("bench", help="Time the pass on synthetic markets")
+    bench_parser.add_argument("--markets", type=int, nargs="+", default=[50, 500, 2000, 5000])
+    for p in (run_parser, bench_parser):
+        p.add_argument("--min-coverage", type=float, default=MIN_COVERAGE)
+        p.add_argument("--tier", type=int, default=TIER_FILTER)
+        p.add_argument("--max-candidates", type=int, default=MAX_CANDIDATES)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        print(f"🦞 NumPy: {'yes' if HAS_NUMPY else 'no (plain Python)'}")
+        for count in args.markets:
+            result = prefilter(synthetic_markets(count), args.min_coverage, args.tier, limit=args.max_candidates)
+            print(f"   {count:>6} markets: {result.pairs:>13,} pairs → {result.matched:>11,} within bounds, "
+                  f"{len(result.market_pairs()):>7,} market pairs kept in {result.elapsed:.2f}s")
+        return
+
+    from price_refresh import GAMMA_API, PooledHTTPClient, fetch_open_markets
+
+    client = PooledHTTPClient(args.base_url or GAMMA_API)
+    try:
+        markets = fetch_open_markets(client, args.limit)
+    finally:
+        client.close()
+    result = prefilter(markets, args.min_coverage, args.tier, limit=args.max_candidates)
+    print(format_result(result, args.min_coverage, args.tier))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Streaming hedge scan runner.
+
+Runs `hedge_test scan` and reads its output line by line instead of
+buffering everything until exit. Only the last few lines are kept (ring
+buffer), and progress events (markets scanned, hedges logged) are emitted
+as soon as the scanner prints them. With a ScanEventLog they also go to the
+structured event stream (scan_events.py) that hedge_notifier.py consumes.
+
+Usage:
+  python3 hedge_scan_stream.py --limit 50 --follow   # live progress
+  python3 hedge_scan_stream.py --limit 50            # final tail only
+  python3 hedge_scan_stream.py --limit 50 --events   # also append JSONL scan events
+"""
+
+import os
+import re
+import selectors
+import subprocess
+import sys
+import time
+from collections import deque
+from typing import Iterator, NamedTuple
+
+from betty_tracing import trace_env
+from scan_events import ScanEventLog
+
+HEDGE_TEST_SCRIPT = "/home/luxinterior/.openclaw/workspace/hedge_test"
+
+SCAN_TIMEOUT = 300
+TAIL_LINES = 40
+MAX_LINE_BYTES = 64 * 1024  # flush over-long lines instead of growing forever
+
+# Progress markers printed by hedge_test scan
+MARKET_PROGRESS = re.compile(r"market\w*\D{0,20}?(\d+)\s*/\s*(\d+)", re.IGNORECASE)
+MARKETS_SCANNED = re.compile(r"markets scanned:\s*(\d+)", re.IGNORECASE)
+HEDGES_LOGGED = re.compile(r"hedges logged:\s*(\d+)", re.IGNORECASE)
+
+
+class ScanResult(NamedTuple):
+    """Final outcome of a streamed scan."""
+    returncode: int
+    tail: str
+    markets_scanned: int
+    markets_total: int
+    hedges_logged: int
+    lines: int
+    elapsed: float
+    timed_out: bool
+
+
+def scan_command(limit, extra_args=()) -> list:
+    """Build the hedge_test scan command line."""
+    return [HEDGE_TEST_SCRIPT, "scan", "--limit", str(limit), *extra_args]
+
+
+def _read_lines(process, deadline: float = None) -> Iterator[str]:
+    """Yield decoded output lines until EOF or the deadline (None: no deadline) passes."""
+    selector = selectors.DefaultSelector()
+    fd = process.stdout.fileno()
+    selector.register(fd, selectors.EVENT_READ)
+    buffer = b""
+
+    try:
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError
+            if not selector.select(remaining):
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            buffer += chunk
+            *complete, buffer = buffer.split(b"\n")
+            if len(buffer) > MAX_LINE_BYTES:
+                complete.append(buffer)
+                buffer = b""
+            for line in complete:
+                yield line.decode(errors="replace").rstrip("\r")
+        if buffer:
+            yield buffer.decode(errors="replace")
+    finally:
+        selector.close()
+
+
+def iter_scan(command: list, timeout: float = SCAN_TIMEOUT, tail_lines: int = TAIL_LINES) -> Iterator[dict]:
+    """Run a scan and yield progress events as they happen (timeout None or 0: no limit).
+
+    Events:
+      {"event": "progress", "markets_scanned": n, "markets_total": m}
+      {"event": "hedges", "hedges_logged": n}
+      {"event": "finished", "result": ScanResult}
+    """
+    started = time.monotonic()
+    tail = deque(maxlen=tail_lines)
+    markets_scanned = markets_total = hedges_logged = lines = 0
+    timed_out = False
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=trace_env())
+    try:
+        for line in _read_lines(process, started + timeout if timeout else None):
+            lines += 1
+            tail.append(line)
+
+            progress = MARKET_PROGRESS.search(line)
+            scanned = MARKETS_SCANNED.search(line)
+            if progress:
+                markets_scanned, markets_total = int(progress.group(1)), int(progress.group(2))
+                yield {"event": "progress", "markets_scanned": markets_scanned, "markets_total": markets_total}
+            elif scanned:
+                markets_scanned = int(scanned.group(1))
+                yield {"event": "progress", "markets_scanned": markets_scanned, "markets_total": markets_total}
+
+            logged = HEDGES_LOGGED.search(line)
+            if logged:
+                hedges_logged = int(logged.group(1))
+                yield {"event": "hedges", "hedges_logged": hedges_logged}
+    except TimeoutError:
+        timed_out = True
+        process.kill()
+    finally:
+        # The consumer stopped early (generator closed) or reading failed: don't leave the scan running
+        if process.poll() is None:
+            process.kill()
+        returncode = process.wait()
+        process.stdout.close()
+
+    yield {
+        "event": "finished",
+        "result": ScanResult(
+            returncode=returncode,
+            tail="\n".join(tail),
+            markets_scanned=markets_scanned,
+            markets_total=markets_total,
+            hedges_logged=hedges_logged,
+            lines=lines,
+            elapsed=time.monotonic() - started,
+            timed_out=timed_out,
+        ),
+    }
+
+
+def run_scan(command: list, on_event=None, timeout: float = SCAN_TIMEOUT,
+             tail_lines: int = TAIL_LINES, events: ScanEventLog = None) -> ScanResult:
+    """Run a scan to completion, forwarding progress events to on_event (and to events, if given)."""
+    if events:
+        events.started(command=command)
+    try:
+        for event in iter_scan(command, timeout, tail_lines):
+            if event["event"] == "finished":
+                result = event["result"]
+                if events:
+                    events.finished(returncode=result.returncode, markets_scanned=result.markets_scanned,
+                                    markets_total=result.markets_total, hedges_logged=result.hedges_logged,
+                                    elapsed=round(result.elapsed, 1), timed_out=result.timed_out)
+                return result
+            if events and event["event"] == "progress":
+                events.market_evaluated(event["markets_scanned"], event["markets_total"])
+            elif events and event["event"] == "hedges":
+                events.hedge_count(event["hedges_logged"])
+            if on_event:
+                on_event(event)
+    except OSError as e:
+        if events:
+            events.finished(returncode=None, error=str(e))
+        raise
+
+
+def format_event(event: dict) -> str:
+    """One-line human summary of a progress event."""
+    if event["event"] == "progress":
+        total = f"/{event['markets_total']}" if event["markets_total"] else ""
+        return f"🔍 Markets scanned: {event['markets_scanned']}{total}"
+    if event["event"] == "hedges":
+        return f"🦞 Hedges logged: {event['hedges_logged']}"
+    return str(event)
+
+
+def main():
+    """Run a scan from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Streaming hedge scan")
+    parser.add_argument("--limit", type=int, default=20, help="Markets to scan")
+    parser.add_argument("--follow", action="store_true", help="Print progress as it happens")
+    parser.add_argument("--timeout", type=float, default=SCAN_TIMEOUT)
+    parser.add_argument("--events", action="store_true", help="Append structured events to the scan event stream")
+    args = parser.parse_args()
+
+    on_event = (lambda event: print(format_event(event), flush=True)) if args.follow else None
+    result = run_scan(scan_command(args.limit), on_event=on_event, timeout=args.timeout,
+                      events=ScanEventLog() if args.events else None)
+
+    print(result.tail)
+    if result.timed_out:
+        print(f"❌ Scan timed out after {args.timeout:.0f}s")
+    sys.exit(result.returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Hedge scan scheduler.
+
+Resident replacement for the shell logic in hedge_scan_cron.sh. One warm
+process runs the 6-hourly scan and the 30-minute monitor with real fcntl
+locks (no stale lock files), single-flight execution per job, start jitter
+and catch-up of runs missed while the daemon was down. Scans write
+structured events (scan_events.py); the daemon runs the batching notifier
+(hedge_notifier.py) on a thread, and one-shot commands drain it on exit.
+
+Usage:
+  python3 hedge_scheduler.py daemon   # resident scheduler
+  python3 hedge_scheduler.py {scan|status|force|test|logs}
+
+Configuration comes from the environment (SCAN_LIMIT, MIN_COVERAGE,
+TIER_FILTER, INCREMENTAL, PREFILTER, RELATED_K, MAX_SCAN_AGE_HOURS,
+SCAN_TIMEOUT, NOTIFY_WINDOW) or the matching flags. Notification sinks
+come from TELEGRAM_BOT_TOKEN/TELEGRAM_CHAT_ID and DISCORD_WEBHOOK_URL.
+"""
+
+import fcntl
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from hedge_notifier import NOTIFY_WINDOW, HedgeNotifier, build_sinks
+from hedge_scan_stream import run_scan, scan_command
+from pnl_engine import PnLEngine
+from price_refresh import GAMMA_API, PooledHTTPClient, refresh_hedge_db
+from scan_events import ScanEventLog
+
+WORKSPACE = Path("/home/luxinterior/.openclaw/workspace")
+LOG_FILE = Path("/tmp/hedge_scan.log")
+STATE_FILE = Path("/tmp/hedge_scheduler_state.json")
+LAST_SCAN_FILE = Path("/tmp/last_hedge_scan")  # kept for older tooling
+LOCK_DIR = Path("/tmp")
+
+SCAN_INTERVAL = 6 * 3600    # 00:00, 06:00, 12:00, 18:00 UTC
+MONITOR_INTERVAL = 30 * 60
+START_JITTER = 60           # seconds of random delay before scheduled runs
+SCHEDULED_SCAN_TIMEOUT = 4 * 3600   # full 50-market scans run long; 0 = no limit
+
+
+def load_config(overrides: dict = None) -> dict:
+    """Scan parameters from the environment, then explicit overrides."""
+    config = {
+        "scan_limit": int(os.environ.get("SCAN_LIMIT", 50)),
+        "min_coverage": float(os.environ.get("MIN_COVERAGE", 0.85)),
+        "tier_filter": int(os.environ.get("TIER_FILTER", 2)),
+        "incremental": os.environ.get("INCREMENTAL", "0") == "1",
+        "prefilter": os.environ.get("PREFILTER", "0") == "1",
+        "related_k": int(os.environ.get("RELATED_K", 0)),
+        "max_scan_age_hours": float(os.environ.get("MAX_SCAN_AGE_HOURS", 24)),
+        "scan_timeout": float(os.environ.get("SCAN_TIMEOUT", SCHEDULED_SCAN_TIMEOUT)),
+        "telegram_bot_token": os.environ.get("TELEGRAM_BOT_TOKEN", ""),
+        "telegram_chat_id": os.environ.get("TELEGRAM_CHAT_ID", ""),
+        "discord_webhook_url": os.environ.get("DISCORD_WEBHOOK_URL", ""),
+        "notify_window": float(os.environ.get("NOTIFY_WINDOW", NOTIFY_WINDOW)),
+    }
+    config.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return config
+
+
+def log_message(message: str):
+    """Print and append to the scan log."""
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+    try:
+        with open(LOG_FILE, "a") as f:
+            f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}\n")
+    except OSError:
+        pass
+
+
+class JobLock:
+    """Exclusive fcntl lock for a job; released automatically if we die."""
+
+    def __init__(self, job: str):
+        self.path = LOCK_DIR / f"hedge_{job}.lock"
+        self._fd = None
+
+    def acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()} {int(time.time())}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def holder(self):
+        """(pid, started) of the current holder, or None if free."""
+        if not self.path.exists():
+            return None
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return None
+        except BlockingIOError:
+            content = self.path.read_text().split()
+            return (int(content[0]), int(content[1])) if len(content) == 2 else (None, None)
+        finally:
+            os.close(fd)
+
+
+class SchedulerState:
+    """Last run times per job, persisted for catch-up after restarts."""
+
+    def __init__(self, path: Path = STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def last_run(self, job: str) -> float:
+        return self.load().get(job, {}).get("last_run", 0.0)
+
+    def record(self, job: str, exit_code: int, **details):
+        with self._lock:
+            state = self.load()
+            state[job] = {"last_run": time.time(), "exit_code": exit_code, **details}
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp, self.path)
+
+
+def run_scan_job(config: dict, state: SchedulerState, full: bool = False) -> int:
+    """Run one hedge scan with the configured filters."""
+    extra = ["--min-coverage", str(config["min_coverage"]), "--tier", str(config["tier_filter"])]
+    if config["incremental"] and not full:
+        extra.append("--incremental")
+    if config["prefilter"]:
+        extra.append("--prefilter")   # numeric bounds before the LLM (hedge_prefilter.py)
+    if config["related_k"] > 0:
+        extra += ["--related-k", str(config["related_k"])]   # only topic-related pairs (market_index.py)
+
+    log_message(
+        f"Starting hedge scan: limit={config['scan_limit']}, "
+        f"min_coverage={config['min_coverage']}, tier_filter={config['tier_filter']}"
+    )
+    events = ScanEventLog()   # hedge_notifier.py turns these into batched alerts
+    try:
+        result = run_scan(scan_command(config["scan_limit"], extra), events=events,
+                          timeout=config["scan_timeout"] or None)
+    except OSError as e:
+        log_message(f"❌ Scan failed to start: {e}")
+        state.record("scan", 1, error=str(e))
+        return 1
+    log_message(f"Exit code: {result.returncode}")
+
+    if result.timed_out:
+        log_message(f"❌ Scan timed out after {config['scan_timeout']:.0f}s")
+    elif result.hedges_logged:
+        log_message(f"✅ Scan complete: hedges logged: {result.hedges_logged} (scan {events.scan_id})")
+    else:
+        log_message("✅ Scan complete: No hedges found meeting criteria")
+
+    state.record("scan", result.returncode, hedges_logged=result.hedges_logged,
+                 markets_scanned=result.markets_scanned, elapsed=round(result.elapsed, 1))
+    LAST_SCAN_FILE.write_text(f"{int(time.time())}\n")
+    return result.returncode
+
+
+def run_monitor_job(config: dict, state: SchedulerState, client: PooledHTTPClient, pnl: PnLEngine = None) -> int:
+    """Refresh prices for every active hedge leg in one batched cycle, re-marking P&L."""
+    log_message("Starting hedge monitor")
+    try:
+        stats = refresh_hedge_db(client=client, on_prices=pnl.on_prices if pnl else None)
+    except Exception as e:
+        log_message(f"❌ Monitor failed: {e}")
+        state.record("monitor", 1, error=str(e))
+        return 1
+    log_message(
+        f"✅ Monitor complete: {stats.priced}/{stats.markets} markets priced "
+        f"in {stats.batches} batches ({stats.elapsed:.1f}s)"
+    )
+    state.record("monitor", 0, markets=stats.markets, priced=stats.priced, batches=stats.batches)
+    return 0
+
+
+class HedgeScheduler:
+    """Runs scan and monitor jobs on a warm runtime."""
+
+    def __init__(self, config: dict, jitter: float = START_JITTER):
+        self.config = config
+        self.jitter = jitter
+        self.state = SchedulerState()
+        self.stop_event = threading.Event()
+        # Kept across monitor runs so connections are reused
+        self.price_client = PooledHTTPClient(GAMMA_API)
+        self.pnl = PnLEngine()   # incremental P&L, checkpointed after every monitor tick
+        self.notifier = HedgeNotifier(build_sinks(config), window=config["notify_window"], log=log_message)
+        self.jobs = {
+            "scan": (SCAN_INTERVAL, lambda full=False: run_scan_job(self.config, self.state, full)),
+            "monitor": (MONITOR_INTERVAL,
+                        lambda full=False: run_monitor_job(self.config, self.state, self.price_client, self.pnl)),
+        }
+        self._running = {name: threading.Lock() for name in self.jobs}
+
+    def run_job(self, name: str, full: bool = False, jitter: bool = False):
+        """Run a job unless it is already running here or in another process.
+
+        Returns the exit code, or None when skipped.
+        """
+        if not self._running[name].acquire(blocking=False):
+            log_message(f"⚠️  {name} already running in this scheduler. Skipping.")
+            return None
+        lock = JobLock(name)
+        try:
+            if jitter and self.jitter:
+                if self.stop_event.wait(random.uniform(0, self.jitter)):
+                    return None
+            if not lock.acquire():
+                log_message(f"⚠️  {name} already running in another process. Skipping.")
+                return None
+            try:
+                return self.jobs[name][1](full)
+            finally:
+                lock.release()
+        finally:
+            self._running[name].release()
+
+    def due(self, name: str, now: float) -> bool:
+        """Due when the last run predates the current slot (covers missed runs)."""
+        interval = self.jobs[name][0]
+        slot_start = now - (now % interval)
+        return self.state.last_run(name) < slot_start
+
+    def next_wakeup(self, now: float) -> float:
+        return min(now - (now % interval) + interval for interval, _ in self.jobs.values())
+
+    def drain_notifications(self):
+        """Send alerts for events written so far, unless another process's notifier owns the stream."""
+        lock = JobLock("notifier")
+        if not lock.acquire():
+            return
+        try:
+            self.notifier.drain()
+        finally:
+            lock.release()
+
+    def run_forever(self):
+        log_message("=== Hedge scheduler started ===")
+        threads = {}
+        notifier_lock = JobLock("notifier")
+        if notifier_lock.acquire():
+            threads["notifier"] = threading.Thread(target=self.notifier.run, args=(self.stop_event,),
+                                                   name="notifier", daemon=True)
+            threads["notifier"].start()
+        else:
+            log_message("⚠️  Notifier already running in another process; not starting one here.")
+        while not self.stop_event.is_set():
+            now = time.time()
+            for name in self.jobs:
+                busy = threads.get(name) and threads[name].is_alive()
+                if not busy and self.due(name, now):
+                    threads[name] = threading.Thread(
+                        target=self.run_job, args=(name,), kwargs={"jitter": True},
+                        name=f"job-{name}", daemon=True,
+                    )
+                    threads[name].start()
+            # Re-check at least every minute so catch-up and clock jumps are noticed
+            self.stop_event.wait(max(1.0, min(60.0, self.next_wakeup(now) - time.time())))
+        if "notifier" in threads:
+            threads["notifier"].join(timeout=30)   # sends the last batch
+            notifier_lock.release()
+        log_message("=== Hedge scheduler stopped ===")
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+
+def scan_is_fresh(config: dict, state: SchedulerState) -> bool:
+    """Was the last scan recent enough to skip a scheduled one?"""
+    last = state.last_run("scan")
+    if not last:
+        log_message("No previous scan found. Starting fresh scan.")
+        return False
+    age_hours = (time.time() - last) / 3600
+    if age_hours >= config["max_scan_age_hours"]:
+        log_message(f"Last scan is {age_hours:.0f}h old. Running fresh scan.")
+        return False
+    log_message(f"Last scan is {age_hours:.0f}h old. Using existing data.")
+    return True
+
+
+def show_status(state: SchedulerState):
+    log_message("=== Hedge Scan Status ===")
+    for name in ("scan", "monitor"):
+        entry = state.load().get(name)
+        if entry:
+            age_hours = (time.time() - entry["last_run"]) / 3600
+            when = datetime.fromtimestamp(entry["last_run"]).strftime("%Y-%m-%d %H:%M")
+            log_message(f"Last {name}: {when} ({age_hours:.1f}h ago, exit {entry['exit_code']})")
+        else:
+            log_message(f"No previous {name} runs")
+
+        holder = JobLock(name).holder()
+        if holder:
+            pid, started = holder
+            minutes = (time.time() - started) / 60 if started else 0
+            log_message(f"Status: {name} in progress (pid {pid}, {minutes:.0f}m)")
+        else:
+            log_message(f"Status: {name} idle")
+
+    if LOG_FILE.exists():
+        log_message("Recent logs (last 10 lines):")
+        print("\n".join(LOG_FILE.read_text().splitlines()[-10:]))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hedge scan scheduler")
+    parser.add_argument("command", nargs="?", choices=["daemon", "scan", "status", "force", "test", "logs"])
+    parser.add_argument("--scan-limit", type=int)
+    parser.add_argument("--min-coverage", type=float)
+    parser.add_argument("--tier-filter", type=int)
+    parser.add_argument("--scan-timeout", type=float, help="Seconds before a scan is killed, 0 = no limit")
+    parser.add_argument("--jitter", type=float, default=START_JITTER)
+    args = parser.parse_args()
+
+    config = load_config({
+        "scan_limit": args.scan_limit,
+        "min_coverage": args.min_coverage,
+        "tier_filter": args.tier_filter,
+        "scan_timeout": args.scan_timeout,
+    })
+    scheduler = HedgeScheduler(config, jitter=args.jitter)
+
+    if WORKSPACE.is_dir():
+        os.chdir(WORKSPACE)
+
+    if args.command == "daemon":
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        scheduler.run_forever()
+    elif args.command == "scan":
+        log_message("=== Scheduled Scan ===")
+        if not scan_is_fresh(config, scheduler.state):
+            code = scheduler.run_job("scan")
+            scheduler.drain_notifications()
+            sys.exit(code or 0)
+    elif args.command == "force":
+        log_message("Forcing fresh scan (ignoring freshness check)...")
+        code = scheduler.run_job("scan", full=True)
+        scheduler.drain_notifications()
+        sys.exit(code or 0)
+    elif args.command == "test":
+        print("Test mode: Dry run with scan_limit=5")
+        config["scan_limit"] = 5
+        code = scheduler.run_job("scan")
+        scheduler.drain_notifications()
+        sys.exit(code or 0)
+    elif args.command == "status":
+        show_status(scheduler.state)
+    elif args.command == "logs":
+        print(LOG_FILE.read_text() if LOG_FILE.exists() else "No log file found")
+    else:
+        parser.print_usage()
+        print("\nCommands:")
+        print("  daemon  - Run the resident scheduler (scan every 6h, monitor every 30m)")
+        print("  scan    - Run scheduled hedge scan")
+        print("  status  - Show scan status")
+        print("  force   - Force fresh scan (ignore freshness)")
+        print("  test    - Test scan (limit=5)")
+        print("  logs    - Show scan logs")
+        print("\nConfiguration (environment or flags):")
+        for key in ("scan_limit", "min_coverage", "tier_filter", "incremental", "prefilter", "related_k",
+                    "max_scan_age_hours", "scan_timeout"):
+            print(f"  {key.upper()}={config[key]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
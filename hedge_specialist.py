@@ -16,6 +16,15 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from dotenv import load_dotenv
 load_dotenv(Path(__file__).parent.parent / ".env")
 
+from betty_router import get_router
+from hedge_backtest import format_results as format_backtest, run as run_backtest
+from hedge_prefilter import MAX_CANDIDATES, MIN_COVERAGE, TIER_FILTER, format_result, prefilter
+from market_index import RELATED_K, MarketIndex, scan_candidates
+from pnl_engine import PnLEngine, format_report as format_pnl
+from price_refresh import GAMMA_API, PooledHTTPClient, fetch_open_markets, refresh_hedge_db
+
+FIND_LIMIT = 500    # markets pre-filtered by find_hedges when the task gives no count
+
 
 class HedgeSpecialist:
     """Hedge specialist agent - Polymarket hedging expert."""
@@ -25,26 +34,22 @@ class HedgeSpecialist:
         self.creature = "Trading AI Agent"
         self.emoji = "🦞"
         self.description = "Specializes in Polymarket hedge discovery, analysis, and P&L optimization"
+        # Running marks, kept warm across tasks and fed by every monitor tick
+        self.pnl = PnLEngine()
 
     async def handle_task(self, task: str) -> str:
         """Handle a hedge-related task."""
-        task_lower = task.lower()
-
-        # Market scanning
-        if any(k in task_lower for k in ["scan", "markets", "trending", "browse"]):
-            return await self.scan_markets(task)
-
-        # Hedge discovery
-        elif any(k in task_lower for k in ["hedge", "hedging", "find", "discover", "opportunity"]):
-            return await self.find_hedges(task)
-
-        # Analysis
-        elif any(k in task_lower for k in ["analyze", "pnl", "report", "status"]):
-            return await self.analyze_positions(task)
-
-        # Monitoring
-        elif any(k in task_lower for k in ["monitor", "watch", "check"]):
-            return await self.monitor_hedges(task)
+        handlers = {
+            "backtest_strategies": self.backtest_strategies,
+            "scan_markets": self.scan_markets,
+            "find_hedges": self.find_hedges,
+            "analyze_positions": self.analyze_positions,
+            "monitor_hedges": self.monitor_hedges,
+        }
+        intent = get_router().intent_for("hedge-specialist", task)
+
+        if intent in handlers:
+            return await handlers[intent](task)
 
         else:
             return f"❌ I'm the Hedge Specialist. I understand: '{task}'"
@@ -73,33 +78,79 @@ class HedgeSpecialist:
         return result
 
     async def find_hedges(self, task: str) -> str:
-        """Find hedge opportunities."""
-        # Parse parameters
-        # Expected: "find hedges with 90% coverage" or "find tier1 hedges"
+        """Find hedge candidates whose price bounds can meet the filters.
+
+        Expected: "find hedges with 90% coverage", "find tier 1 hedges in 2000 markets"
+        """
         import re
-        match = re.search(r'find\s+hedge(s)?.*\s*with\s+(\d+)%\s+coverage|tier\s+(\d+)', task, re.IGNORECASE)
+        coverage = re.search(r'(\d+(?:\.\d+)?)\s*%\s*coverage', task, re.IGNORECASE)
+        tier = re.search(r'tier\s*(\d)', task, re.IGNORECASE)
+        limit = re.search(r'(\d+)\s+markets', task, re.IGNORECASE)
+        min_coverage = float(coverage.group(1)) / 100 if coverage else MIN_COVERAGE
+        tier_filter = int(tier.group(1)) if tier else TIER_FILTER
+        limit = int(limit.group(1)) if limit else FIND_LIMIT
+
+        def find():
+            client = PooledHTTPClient(GAMMA_API)
+            try:
+                markets = fetch_open_markets(client, limit)
+            finally:
+                client.close()
+            # Only pairs about the same topic whose price bounds can still qualify go on to the LLM
+            if RELATED_K > 0:
+                with MarketIndex() as index:
+                    return scan_candidates(markets, index, min_coverage, tier_filter, RELATED_K,
+                                           limit=MAX_CANDIDATES)
+            return prefilter(markets, min_coverage, tier_filter, limit=MAX_CANDIDATES)
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, find)
+        except Exception as e:
+            return f"❌ Finding hedges failed: {e}"
+        return format_result(result, min_coverage, tier_filter, show=5)
 
-        if match:
-            coverage = match.group(1)
-            tier = match.group(2)
-            result = f"✅ Finding hedges: {coverage}% coverage, Tier {tier}"
-            # In real implementation, would call hedge_scanner with filters
-        else:
-            result = "✅ Finding hedges (using defaults)"
-            # In real implementation, would call hedge_scanner
+    async def analyze_positions(self, task: str) -> str:
+        """Mark-to-market P&L of active hedges, by tier and strategy."""
+        def analyze():
+            self.pnl.refresh()   # checkpoint rows and hedge changes since the last call
+            return self.pnl.snapshot()
+
+        try:
+            snapshot = await asyncio.get_running_loop().run_in_executor(None, analyze)
+        except Exception as e:
+            return f"❌ Analyzing positions failed: {e}"
+        return format_pnl(snapshot)
+
+    async def backtest_strategies(self, task: str) -> str:
+        """Backtest entry filters and exit rules over stored hedge history.
+
+        Expected: "backtest hedge strategies", "backtest the last 30 days"
+        """
+        import re
+        days = re.search(r'(\d+)\s*days?', task, re.IGNORECASE)
 
-        return result
+        def backtest():
+            _, results, baseline, elapsed = run_backtest(days=float(days.group(1)) if days else None)
+            return format_backtest(results, top=5, baseline=baseline) + f"   ({elapsed:.1f}s)\n"
 
-    async def analyze_positions(self, task: str) -> str:
-        """Analyze current hedge positions."""
-        result = f"✅ Analyzing positions: {task}"
-        # In real implementation, would query database and generate report
-        return result
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, backtest)
+        except Exception as e:
+            return f"❌ Backtest failed: {e}"
 
     async def monitor_hedges(self, task: str) -> str:
         """Monitor active hedge positions."""
-        result = f"✅ Monitoring hedges: {task}"
-        # In real implementation, would call hedge_monitor
+        try:
+            loop = asyncio.get_running_loop()
+            stats = await loop.run_in_executor(None, lambda: refresh_hedge_db(on_prices=self.pnl.on_prices))
+        except Exception as e:
+            return f"❌ Monitoring failed: {e}"
+
+        result = f"✅ Monitoring hedges: {stats.priced}/{stats.markets} markets priced"
+        result += f" in {stats.batches} batches ({stats.elapsed:.1f}s)"
+        total = self.pnl.snapshot().total
+        if total.hedges:
+            result += f"\n   P&L ${total.pnl:+.2f} ({total.roi:+.1%}) on ${total.cost:.2f}"
         return result
 
     async def main_loop(self):
@@ -113,6 +164,7 @@ class HedgeSpecialist:
         print("  'Scan markets for hedges'")
         print("  'Find hedges with 90% coverage'")
         print("  'Analyze current positions'")
+        print("  'Backtest the last 30 days'")
         print("  'Monitor active hedges'")
 
     async def run(self):
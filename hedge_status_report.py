@@ -7,37 +7,68 @@ Shows:
 - Last scan information
 - Dashboard link
 - System status
+
+Service probes and database queries run concurrently and the result is
+cached as a short-lived snapshot, so dashboard refreshes, !hedge_status and
+cron checks within SNAPSHOT_TTL seconds reuse it. Use --json for a
+machine-readable snapshot.
 """
 
-import sys
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import subprocess
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "skills" / "polyclaw"))
+from hedge_db_pool import get_pool
+from hedge_summary import ensure_summary_index, latest_scan, summarize
+
+SNAPSHOT_FILE = Path("/tmp/hedge_status_snapshot.json")
+SNAPSHOT_TTL = 30  # seconds
 
-from testing.database import HedgeDB, init_db
+# Service name -> command-line pattern (same patterns as pgrep -f)
+SERVICES = {
+    'Discord Bot': 'discord_hedge_bot.py',
+    'Dashboard': 'streamlit.*dashboard.py',
+}
 
 def get_dashboard_url():
     """Return dashboard URL."""
     return "http://107.174.92.36:8501"
 
+def _running_commands():
+    """Command lines of all running processes, read once from /proc."""
+    own_pid = str(os.getpid())
+    commands = []
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit() or pid == own_pid:
+            continue
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                commands.append(f.read().replace(b'\0', b' ').decode(errors='replace'))
+        except OSError:
+            continue  # process exited or is not ours to read
+    return commands
+
 def check_services():
     """Check if services are running."""
-    import subprocess
-
-    services = {
-        'Discord Bot': lambda: subprocess.run(['pgrep', '-f', 'discord_hedge_bot.py'],
-                                                capture_output=True).returncode == 0,
-        'Dashboard': lambda: subprocess.run(['pgrep', '-f', 'streamlit.*dashboard.py'],
-                                              capture_output=True).returncode == 0,
-    }
-
     status = {}
-    for name, check in services.items():
+    try:
+        commands = _running_commands()
+    except OSError:
+        commands = None  # no /proc: fall back to pgrep
+
+    for name, pattern in SERVICES.items():
         try:
-            status[name] = '✅ Running' if check() else '❌ Stopped'
-        except:
+            if commands is not None:
+                running = any(re.search(pattern, cmd) for cmd in commands)
+            else:
+                running = subprocess.run(['pgrep', '-f', pattern], capture_output=True).returncode == 0
+            status[name] = '✅ Running' if running else '❌ Stopped'
+        except (OSError, re.error):
             status[name] = '❓ Unknown'
 
     return status
@@ -45,74 +76,109 @@ def check_services():
 def get_last_scan_info():
     """Get last scan information."""
     try:
-        with HedgeDB() as db:
-            cursor = db.conn.cursor()
-            cursor.execute("""
-                SELECT scan_timestamp, markets_scanned, hedges_found
-                FROM scans
-                ORDER BY id DESC
-                LIMIT 1
-            """)
-            scan = cursor.fetchone()
-
-            if scan:
-                return {
-                    'time': scan[0],
-                    'markets_scanned': scan[1],
-                    'hedges_found': scan[2]
-                }
+        with get_pool().connection() as conn:
+            return latest_scan(conn)
     except Exception as e:
         print(f"Error getting scan info: {e}")
     return None
 
-def generate_report():
+def _collect_db():
+    """Hedge summary and last scan over a single pooled connection."""
+    db = get_pool()
+    if not db.path.exists():
+        return summarize()   # nothing scanned yet; don't create the file from a status report
+    ensure_summary_index(db)
+    with db.connection() as conn:
+        return summarize(conn)
+
+def collect_status():
+    """Probe services and query the database concurrently."""
+    snapshot = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'services': {},
+        'hedges': None,
+        'last_scan': None,
+        'dashboard_url': get_dashboard_url(),
+        'errors': [],
+    }
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        services = pool.submit(check_services)
+        db = pool.submit(_collect_db)
+
+        snapshot['services'] = services.result()
+        try:
+            summary = db.result()
+            snapshot['last_scan'] = summary.pop('last_scan')
+            summary['tiers'] = {str(tier): count for tier, count in summary['tiers'].items()}
+            snapshot['hedges'] = summary
+        except Exception as e:
+            snapshot['errors'].append(f"database: {e}")
+
+    return snapshot
+
+def get_status(max_age=SNAPSHOT_TTL, refresh=False):
+    """Cached status snapshot, collected afresh when older than max_age."""
+    if not refresh and SNAPSHOT_FILE.exists():
+        try:
+            if time.time() - SNAPSHOT_FILE.stat().st_mtime < max_age:
+                with open(SNAPSHOT_FILE) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass  # unreadable snapshot: collect a new one
+
+    snapshot = collect_status()
+    tmp = SNAPSHOT_FILE.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, SNAPSHOT_FILE)
+    except OSError:
+        pass  # cache is best effort
+    return snapshot
+
+def generate_report(status=None):
     """Generate status report."""
+    status = status or get_status()
+
     print("=" * 60)
     print("🦞 HEDGE BOT STATUS REPORT")
     print("=" * 60)
-    print(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    print(f"Generated: {datetime.fromisoformat(status['generated_at']).strftime('%Y-%m-%d %H:%M:%S UTC')}")
     print()
 
     # Check services
     print("📡 SERVICES")
     print("-" * 40)
-    services = check_services()
-    for name, status in services.items():
-        print(f"  {name}: {status}")
+    for name, service_status in status['services'].items():
+        print(f"  {name}: {service_status}")
     print()
 
     # Active hedges
     print("📊 ACTIVE HEDGES")
     print("-" * 40)
-    try:
-        with HedgeDB() as db:
-            hedges = db.get_active_hedges()
-            print(f"  Total active: {len(hedges)}")
-
-            if hedges:
-                total_cost = sum(h.total_real_cost for h in hedges)
-                avg_coverage = sum(h.coverage for h in hedges) / len(hedges) if hedges else 0
-
-                print(f"  Total cost: ${total_cost:.2f}")
-                print(f"  Avg coverage: {avg_coverage*100:.1f}%")
-                print(f"  Tier breakdown:")
+    summary = status['hedges']
+    if summary is None:
+        for error in status['errors']:
+            print(f"  ❌ Error: {error}")
+    else:
+        print(f"  Total active: {summary['active']}")
 
-                tier_counts = {}
-                for h in hedges:
-                    tier_counts[h.tier] = tier_counts.get(h.tier, 0) + 1
+        if summary['active']:
+            print(f"  Total cost: ${summary['total_cost']:.2f}")
+            print(f"  Avg coverage: {summary['avg_coverage']*100:.1f}%")
+            print(f"  Tier breakdown:")
 
-                for tier, count in sorted(tier_counts.items()):
-                    print(f"    Tier {tier}: {count}")
-            else:
-                print("  No active hedges")
-    except Exception as e:
-        print(f"  ❌ Error: {e}")
+            for tier, count in summary['tiers'].items():
+                print(f"    Tier {tier}: {count}")
+        else:
+            print("  No active hedges")
     print()
 
     # Last scan
     print("🔍 LAST SCAN")
     print("-" * 40)
-    scan_info = get_last_scan_info()
+    scan_info = status['last_scan']
     if scan_info:
         scan_time = datetime.fromisoformat(scan_info['time'].replace('Z', '+00:00'))
         time_ago = datetime.now(scan_time.tzinfo) - scan_time
@@ -129,7 +195,7 @@ def generate_report():
     # Dashboard
     print("📈 DASHBOARD")
     print("-" * 40)
-    print(f"  URL: {get_dashboard_url()}")
+    print(f"  URL: {status['dashboard_url']}")
     print()
 
     # Log location
@@ -140,8 +206,21 @@ def generate_report():
     print()
 
     print("=" * 60)
-    print("Run 'python3 hedge_status_report.py' to refresh this report")
+    print("Run 'python3 hedge_status_report.py --refresh' to refresh this report")
     print("=" * 60)
 
 if __name__ == "__main__":
-    generate_report()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hedge bot status report")
+    parser.add_argument("--json", action="store_true", help="Print the status snapshot as JSON")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cached snapshot")
+    parser.add_argument("--max-age", type=float, default=SNAPSHOT_TTL,
+                        help="Reuse a snapshot younger than this many seconds")
+    args = parser.parse_args()
+
+    status = get_status(max_age=args.max_age, refresh=args.refresh)
+    if args.json:
+        print(json.dumps(status, indent=2))
+    else:
+        generate_report(status)
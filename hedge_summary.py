@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+SQL-side hedge summaries for status reports.
+
+Counts, sums, averages and the per-tier breakdown of active hedges are
+computed by SQLite over a covering index instead of loading every hedge
+into Python. Optionally a materialized per-tier summary is kept up to date
+by triggers on every write, so reading it is constant-time however large
+the hedges table grows.
+
+Usage:
+    ensure_summary_index()                   # once per process, through the pool's writer
+    with get_pool().connection() as conn:    # hedge_db_pool reader
+        summary = summarize(conn)
+
+    python3 hedge_summary.py show
+    python3 hedge_summary.py materialize   # create summary table + triggers
+    python3 hedge_summary.py drop          # back to live aggregation
+"""
+
+import sqlite3
+from pathlib import Path
+
+from hedge_db_pool import get_pool
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+HEDGE_DB = POLYCLAW_DIR / "db" / "hedge_testing.db"
+
+ACTIVE_STATUS = "active"
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_hedges_status_summary
+    ON hedges(status, tier, coverage, total_real_cost)
+"""
+
+MATERIALIZE = f"""
+CREATE TABLE IF NOT EXISTS hedge_tier_summary (
+    tier INTEGER PRIMARY KEY,
+    active_count INTEGER NOT NULL DEFAULT 0,
+    total_cost REAL NOT NULL DEFAULT 0,
+    total_coverage REAL NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_hedge_summary_insert
+AFTER INSERT ON hedges WHEN NEW.status = '{ACTIVE_STATUS}'
+BEGIN
+    INSERT INTO hedge_tier_summary (tier, active_count, total_cost, total_coverage)
+    VALUES (NEW.tier, 1, COALESCE(NEW.total_real_cost, 0), COALESCE(NEW.coverage, 0))
+    ON CONFLICT(tier) DO UPDATE SET
+        active_count = active_count + 1,
+        total_cost = total_cost + excluded.total_cost,
+        total_coverage = total_coverage + excluded.total_coverage;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hedge_summary_delete
+AFTER DELETE ON hedges WHEN OLD.status = '{ACTIVE_STATUS}'
+BEGIN
+    UPDATE hedge_tier_summary SET
+        active_count = active_count - 1,
+        total_cost = total_cost - COALESCE(OLD.total_real_cost, 0),
+        total_coverage = total_coverage - COALESCE(OLD.coverage, 0)
+    WHERE tier = OLD.tier;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hedge_summary_update_old
+AFTER UPDATE OF status, tier, coverage, total_real_cost ON hedges
+WHEN OLD.status = '{ACTIVE_STATUS}'
+BEGIN
+    UPDATE hedge_tier_summary SET
+        active_count = active_count - 1,
+        total_cost = total_cost - COALESCE(OLD.total_real_cost, 0),
+        total_coverage = total_coverage - COALESCE(OLD.coverage, 0)
+    WHERE tier = OLD.tier;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hedge_summary_update_new
+AFTER UPDATE OF status, tier, coverage, total_real_cost ON hedges
+WHEN NEW.status = '{ACTIVE_STATUS}'
+BEGIN
+    INSERT INTO hedge_tier_summary (tier, active_count, total_cost, total_coverage)
+    VALUES (NEW.tier, 1, COALESCE(NEW.total_real_cost, 0), COALESCE(NEW.coverage, 0))
+    ON CONFLICT(tier) DO UPDATE SET
+        active_count = active_count + 1,
+        total_cost = total_cost + excluded.total_cost,
+        total_coverage = total_coverage + excluded.total_coverage;
+END;
+"""
+
+DROP_MATERIALIZED = """
+DROP TRIGGER IF EXISTS trg_hedge_summary_insert;
+DROP TRIGGER IF EXISTS trg_hedge_summary_delete;
+DROP TRIGGER IF EXISTS trg_hedge_summary_update_old;
+DROP TRIGGER IF EXISTS trg_hedge_summary_update_new;
+DROP TABLE IF EXISTS hedge_tier_summary;
+"""
+
+TIER_AGGREGATE = f"""
+SELECT tier, COUNT(*), COALESCE(SUM(total_real_cost), 0), COALESCE(SUM(coverage), 0)
+FROM hedges
+WHERE status = '{ACTIVE_STATUS}'
+GROUP BY tier
+"""
+
+TIER_MATERIALIZED = """
+SELECT tier, active_count, total_cost, total_coverage
+FROM hedge_tier_summary
+WHERE active_count > 0
+"""
+
+LATEST_SCAN = """
+SELECT scan_timestamp, markets_scanned, hedges_found
+FROM scans
+ORDER BY id DESC
+LIMIT 1
+"""
+
+
+_INDEXED = set()   # database paths whose summary index this process has ensured
+
+
+def ensure_indexes(conn: sqlite3.Connection):
+    """Create the covering index behind the live aggregation (idempotent)."""
+    conn.execute(INDEXES)
+
+
+def ensure_summary_index(db=None):
+    """ensure_indexes() once per process through the pool's writer.
+
+    Pooled readers are query-only, so summary callers run this first. A
+    missing database is not created, and one without a hedges table (yet)
+    or a read-only one is left as is.
+    """
+    db = db or get_pool()
+    if db.path in _INDEXED or not db.path.exists():
+        return
+    try:
+        with db.writer() as conn:
+            ensure_indexes(conn)
+    except sqlite3.OperationalError:
+        return
+    _INDEXED.add(db.path)
+
+
+def is_materialized(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hedge_tier_summary'"
+    ).fetchone() is not None
+
+
+def materialize(conn: sqlite3.Connection):
+    """Create the trigger-maintained summary table and fill it, in one transaction.
+
+    BEGIN IMMEDIATE keeps writers out between the fill and the triggers
+    going live, and a failure leaves the previous state untouched.
+    """
+    try:
+        conn.executescript(
+            "BEGIN IMMEDIATE;" + DROP_MATERIALIZED + MATERIALIZE
+            + "INSERT INTO hedge_tier_summary (tier, active_count, total_cost, total_coverage) "
+            + TIER_AGGREGATE + ";COMMIT;"
+        )
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+def drop_materialized(conn: sqlite3.Connection):
+    conn.executescript(DROP_MATERIALIZED)
+
+
+def latest_scan(conn: sqlite3.Connection):
+    """Most recent row of the scans table as a dict, or None (also before the table exists)."""
+    try:
+        scan = conn.execute(LATEST_SCAN).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if not scan:
+        return None
+    return {"time": scan[0], "markets_scanned": scan[1], "hedges_found": scan[2]}
+
+
+def summarize(conn: sqlite3.Connection = None) -> dict:
+    """Aggregate summary of active hedges plus the latest scan.
+
+    Without a connection, or before the hedges table exists, the summary is empty.
+
+    Returns:
+      {"active": n, "total_cost": x, "avg_coverage": y,
+       "tiers": {tier: count}, "last_scan": {...} or None}
+    """
+    rows = []
+    if conn is not None:
+        try:
+            rows = conn.execute(TIER_MATERIALIZED if is_materialized(conn) else TIER_AGGREGATE).fetchall()
+        except sqlite3.OperationalError:
+            pass   # no hedges table yet
+
+    active = sum(row[1] for row in rows)
+    total_cost = sum(row[2] for row in rows)
+    total_coverage = sum(row[3] for row in rows)
+
+    return {
+        "active": active,
+        "total_cost": total_cost,
+        "avg_coverage": total_coverage / active if active else 0.0,
+        "tiers": {row[0]: row[1] for row in sorted(rows, key=lambda r: (r[0] is None, r[0]))},
+        "last_scan": latest_scan(conn) if conn is not None else None,
+    }
+
+
+def list_active(conn: sqlite3.Connection, limit: int = 20) -> list:
+    """Newest active hedges as (id, coverage, tier, total_real_cost) rows; [] without a hedges table."""
+    try:
+        return conn.execute(
+            f"SELECT id, coverage, tier, total_real_cost FROM hedges "
+            f"WHERE status = '{ACTIVE_STATUS}' ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+
+
+def main():
+    """Show the summary or manage the materialized summary table."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hedge summary")
+    parser.add_argument("command", nargs="?", default="show", choices=["show", "index", "materialize", "drop"])
+    parser.add_argument("--db", default=str(HEDGE_DB))
+    args = parser.parse_args()
+
+    db = get_pool(args.db)
+    if args.command == "index":
+        with db.writer() as conn:
+            ensure_indexes(conn)
+        print("✅ Summary index created")
+    elif args.command == "materialize":
+        with db.writer() as conn:
+            ensure_indexes(conn)
+            materialize(conn)
+        print("✅ Materialized summary enabled")
+    elif args.command == "drop":
+        with db.writer() as conn:
+            drop_materialized(conn)
+        print("✅ Materialized summary dropped")
+    else:
+        if not db.path.exists():
+            print(f"⚠️  No hedge database at {db.path}")
+            return
+        ensure_summary_index(db)
+        with db.connection() as conn:
+            summary = summarize(conn)
+        print(f"📊 Active hedges: {summary['active']}")
+        print(f"   Total cost: ${summary['total_cost']:.2f}")
+        print(f"   Avg coverage: {summary['avg_coverage']*100:.1f}%")
+        for tier, count in summary["tiers"].items():
+            print(f"   Tier {tier}: {count}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
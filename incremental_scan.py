@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Incremental hedge scanning.
+
+Keeps a fingerprint (price bucket, volume bucket, resolution state) per
+market in hedge_testing.db so a scan only re-evaluates markets and candidate
+pairs that moved since they were last looked at. Skipped counts are written
+to the scan's row in the `scans` table.
+
+Scanner flow (hedge_test scan --incremental):
+    planner = IncrementalScanPlanner(db.conn)
+    plan = planner.plan(markets)                      # markets worth rescanning
+    pairs, skipped = planner.pairs_to_evaluate(pairs, plan)  # pairs worth sending to the LLM
+    ... evaluate ...
+    planner.commit(plan, pairs, scan_id)
+"""
+
+import json
+import math
+import sqlite3
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from hedge_db_pool import get_pool
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+HEDGE_DB = POLYCLAW_DIR / "db" / "hedge_testing.db"
+
+PRICE_STEP = 0.005        # half a cent
+VOLUME_CHANGE = 0.05      # 5% volume move counts as a change
+MAX_FINGERPRINT_AGE = 24 * 3600  # re-evaluate everything at least daily
+PAIR_CHUNK = 400          # pairs per lookup query (two parameters each, under SQLite's 999)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS market_fingerprints (
+    market_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    price REAL,
+    volume REAL,
+    resolved INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pair_fingerprints (
+    market_a TEXT NOT NULL,
+    market_b TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    evaluated_at REAL NOT NULL,
+    PRIMARY KEY (market_a, market_b)
+);
+"""
+
+SKIP_COLUMNS = ("markets_skipped", "pairs_skipped")
+
+
+class MarketState(NamedTuple):
+    market_id: str
+    price: float
+    volume: float
+    resolved: bool
+
+
+class ScanPlan(NamedTuple):
+    """Which markets a scan should look at."""
+    changed: list          # MarketState for markets to rescan
+    skipped: list          # MarketState for unchanged markets
+    fingerprints: dict     # market_id -> current fingerprint
+
+
+def market_state(market: dict) -> MarketState:
+    """Normalise a Gamma-style market dict."""
+    price = market.get("price")
+    if price is None:
+        prices = market.get("outcomePrices") or []
+        if isinstance(prices, str):
+            prices = json.loads(prices)
+        price = float(prices[0]) if prices else 0.0
+    volume = market.get("volumeNum", market.get("volume")) or 0.0
+    resolved = bool(market.get("resolved") or market.get("closed"))
+    return MarketState(str(market["id"]), float(price), float(volume), resolved)
+
+
+def fingerprint(state: MarketState, price_step: float = PRICE_STEP,
+                volume_change: float = VOLUME_CHANGE) -> str:
+    """Bucketed (price, volume, resolved) so noise doesn't count as a change."""
+    price_bucket = round(state.price / price_step)
+    volume_bucket = int(math.log1p(max(state.volume, 0.0)) / math.log1p(volume_change))
+    return f"{price_bucket}:{volume_bucket}:{int(state.resolved)}"
+
+
+def pair_key(market_a: str, market_b: str) -> tuple:
+    return (market_a, market_b) if market_a <= market_b else (market_b, market_a)
+
+
+class IncrementalScanPlanner:
+    """Decides which markets and pairs changed since the last scan."""
+
+    def __init__(self, conn: sqlite3.Connection, price_step: float = PRICE_STEP,
+                 volume_change: float = VOLUME_CHANGE, max_age: float = MAX_FINGERPRINT_AGE):
+        self.conn = conn
+        self.price_step = price_step
+        self.volume_change = volume_change
+        self.max_age = max_age
+        self.markets_skipped = 0
+        self.pairs_skipped = 0
+        self.conn.executescript(SCHEMA)
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.max_age
+
+    def plan(self, markets: list) -> ScanPlan:
+        """Split markets into changed and unchanged since their last scan."""
+        states = [m if isinstance(m, MarketState) else market_state(m) for m in markets]
+        current = {s.market_id: fingerprint(s, self.price_step, self.volume_change) for s in states}
+
+        stored = {}
+        ids = list(current)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT market_id, fingerprint FROM market_fingerprints "
+                f"WHERE updated_at >= ? AND market_id IN ({','.join('?' * len(chunk))})",
+                [self._fresh_after(), *chunk],
+            )
+            stored.update(rows)
+
+        changed, skipped = [], []
+        for state in states:
+            if stored.get(state.market_id) == current[state.market_id]:
+                skipped.append(state)
+            else:
+                changed.append(state)
+        self.markets_skipped = len(skipped)
+        return ScanPlan(changed, skipped, current)
+
+    def pairs_to_evaluate(self, pairs: list, plan: ScanPlan) -> tuple[list, int]:
+        """Drop pairs whose markets and last evaluation are both unchanged.
+
+        pairs: iterable of (market_a_id, market_b_id)
+        Returns: (pairs to evaluate, number skipped)
+        """
+        fingerprints = plan.fingerprints
+        pairs = list(pairs)
+        keys = list(dict.fromkeys(pair_key(str(a), str(b)) for a, b in pairs))
+
+        # Look up only the requested pairs, a chunk per query, through the primary key
+        stored = {}
+        for start in range(0, len(keys), PAIR_CHUNK):
+            chunk = keys[start:start + PAIR_CHUNK]
+            rows = self.conn.execute(
+                f"WITH wanted(a, b) AS (VALUES {','.join(['(?, ?)'] * len(chunk))}) "
+                f"SELECT p.market_a, p.market_b, p.fingerprint FROM wanted "
+                f"JOIN pair_fingerprints p ON p.market_a = wanted.a AND p.market_b = wanted.b "
+                f"WHERE p.evaluated_at >= ?",
+                [*(value for key in chunk for value in key), self._fresh_after()],
+            )
+            stored.update(((a, b), fp) for a, b, fp in rows)
+
+        evaluate = []
+        skipped = 0
+        for market_a, market_b in pairs:
+            a, b = pair_key(str(market_a), str(market_b))
+            if stored.get((a, b)) == f"{fingerprints.get(a)}|{fingerprints.get(b)}":
+                skipped += 1
+            else:
+                evaluate.append((market_a, market_b))
+
+        self.pairs_skipped = skipped
+        return evaluate, skipped
+
+    def commit(self, plan: ScanPlan, evaluated_pairs: list, scan_id: int = None):
+        """Store fingerprints for what was evaluated and record skips on the scan row."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO market_fingerprints "
+                "(market_id, fingerprint, price, volume, resolved, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (s.market_id, plan.fingerprints[s.market_id], s.price, s.volume, int(s.resolved), now)
+                    for s in plan.changed
+                ],
+            )
+            rows = []
+            for market_a, market_b in evaluated_pairs:
+                a, b = pair_key(str(market_a), str(market_b))
+                rows.append((a, b, f"{plan.fingerprints.get(a)}|{plan.fingerprints.get(b)}", now))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pair_fingerprints "
+                "(market_a, market_b, fingerprint, evaluated_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self.record_skips(scan_id)
+
+    def record_skips(self, scan_id: int = None):
+        """Write skip counts to the given (or latest) scans row."""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(scans)")}
+        if not columns:
+            return
+        for column in SKIP_COLUMNS:
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE scans ADD COLUMN {column} INTEGER DEFAULT 0")
+
+        if scan_id is None:
+            row = self.conn.execute("SELECT id FROM scans ORDER BY id DESC LIMIT 1").fetchone()
+            if not row:
+                return
+            scan_id = row[0]
+        self.conn.execute(
+            "UPDATE scans SET markets_skipped = ?, pairs_skipped = ? WHERE id = ?",
+            (self.markets_skipped, self.pairs_skipped, scan_id),
+        )
+
+    def forget(self, market_ids: list = None):
+        """Drop fingerprints so the next scan re-evaluates (all, or some markets)."""
+        with self.conn:
+            if market_ids is None:
+                self.conn.execute("DELETE FROM market_fingerprints")
+                self.conn.execute("DELETE FROM pair_fingerprints")
+                return
+            for market_id in map(str, market_ids):
+                self.conn.execute("DELETE FROM market_fingerprints WHERE market_id = ?", (market_id,))
+                self.conn.execute(
+                    "DELETE FROM pair_fingerprints WHERE market_a = ? OR market_b = ?",
+                    (market_id, market_id),
+                )
+
+
+def main():
+    """Show or reset incremental scan state."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental hedge scan state")
+    parser.add_argument("command", choices=["status", "reset"])
+    parser.add_argument("--db", default=str(HEDGE_DB))
+    args = parser.parse_args()
+
+    db = get_pool(args.db)
+    if args.command == "reset":
+        with db.writer() as conn:
+            IncrementalScanPlanner(conn).forget()
+        print("✅ Fingerprints cleared; next scan is a full scan")
+        return
+
+    with db.writer() as conn:
+        IncrementalScanPlanner(conn)   # creates the fingerprint tables on first use
+
+    markets = db.read_one("SELECT COUNT(*) FROM market_fingerprints")[0]
+    pairs = db.read_one("SELECT COUNT(*) FROM pair_fingerprints")[0]
+    print(f"🦞 Fingerprinted markets: {markets}")
+    print(f"🦞 Fingerprinted pairs: {pairs}")
+    try:
+        row = db.read_one(
+            "SELECT scan_timestamp, markets_scanned, markets_skipped, pairs_skipped "
+            "FROM scans ORDER BY id DESC LIMIT 1"
+        )
+    except sqlite3.OperationalError:
+        row = None
+    if row:
+        print(f"🔍 Last scan {row[0]}: {row[1]} scanned, {row[2]} markets and {row[3]} pairs skipped")
+
+
+if __name__ == "__main__":
+    main()
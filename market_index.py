@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Inverted text index over markets, for pruning unrelated hedge pairs.
+
+Most market pairs in a scan are about unrelated topics. This index keeps a
+sparse TF-IDF representation of every open market's question, description
+and tags, with posting lists per term, and answers "which markets are
+about the same thing as this one?" by walking only the posting lists of
+that market's distinctive terms. Terms shared by more than MAX_DF_SHARE of
+all markets ("will", "resolve", "2026") carry no signal and are skipped, so
+a lookup touches a small, bounded slice of the index instead of every
+market, and generating the candidate pairs of a whole scan is near-linear.
+
+Updates are incremental: each listing's text is hashed and only new or
+changed markets are re-tokenized; resolved or closed markets are removed.
+A scan lists only part of the open markets, so markets not listed for
+STALE_AFTER are pruned too. The index persists in market_index.db next to
+hedge_testing.db.
+
+Scanner flow (hedge_test scan --related-k 10):
+    index = MarketIndex()
+    result = scan_candidates(markets, index, min_coverage, tier_filter)   # a PrefilterResult
+    pairs = result.market_pairs()
+    pairs, skipped = planner.pairs_to_evaluate(pairs, plan)   # incremental_scan
+
+Usage:
+    python3 market_index.py update --limit 2000
+    python3 market_index.py related 512345
+    python3 market_index.py stats
+    python3 market_index.py bench --markets 1000 5000
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from hedge_prefilter import (EPSILON, MAX_CANDIDATES, MAX_COST, MIN_COVERAGE, MIN_LEG_PRICE, NO, TIER_FILTER, YES,
+                             Candidate, PrefilterResult, coverage_floor, pair_bounds)
+from incremental_scan import market_state, pair_key
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+MARKET_INDEX_DB = POLYCLAW_DIR / "db" / "market_index.db"
+
+RELATED_K = int(os.environ.get("RELATED_K", 0))   # pair only related markets in scans; 0 = off (all pairs)
+TOP_K = RELATED_K or 10      # related markets per market
+MIN_SCORE = 0.05             # weaker matches are not related
+MAX_DF_SHARE = 0.05          # terms in more markets than this carry no topic signal
+MIN_DF_SKIP = 50             # ...but never skip terms in small indexes
+MAX_QUERY_TERMS = 12         # most distinctive terms used per lookup
+FIELD_WEIGHTS = {"question": 2.0, "tags": 2.0, "description": 1.0}
+MAX_DESCRIPTION_CHARS = 600  # the rest is resolution boilerplate
+STALE_AFTER = 3 * 24 * 3600  # seconds since last listed before a market is dropped
+
+STOPWORDS = {
+    "a", "about", "above", "after", "all", "an", "and", "any", "are", "as", "at", "be", "been", "before",
+    "between", "by", "can", "does", "during", "end", "for", "from", "has", "have", "if", "in", "into",
+    "is", "it", "its", "market", "more", "no", "not", "of", "on", "or", "other", "over", "resolve",
+    "resolves", "than", "that", "the", "then", "this", "to", "under", "until", "was", "what", "when",
+    "which", "who", "will", "with", "yes",
+}
+
+TOKEN = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS market_docs (
+    market_id TEXT PRIMARY KEY,
+    text_hash TEXT NOT NULL,
+    question TEXT,
+    length REAL NOT NULL,
+    updated_at REAL NOT NULL    -- last listed
+);
+CREATE TABLE IF NOT EXISTS market_terms (
+    market_id TEXT NOT NULL,
+    term TEXT NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (market_id, term)
+);
+CREATE INDEX IF NOT EXISTS idx_market_terms_term ON market_terms(term);
+"""
+
+
+class UpdateStats(NamedTuple):
+    listed: int
+    added: int       # new or changed
+    removed: int     # resolved, closed or vanished
+    elapsed: float
+
+
+def _stem(token: str) -> str:
+    token = token.strip("'-")
+    if token.endswith("'s"):
+        token = token[:-2]
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list:
+    """Lowercased, lightly stemmed terms without stopwords or bare small numbers."""
+    terms = []
+    for token in TOKEN.findall((text or "").lower()):
+        term = _stem(token)
+        if len(term) < 2 or term in STOPWORDS or (term.isdigit() and len(term) < 4):
+            continue
+        terms.append(term)
+    return terms
+
+
+def market_fields(market: dict) -> dict:
+    """question / description / tags text of a Gamma-style market."""
+    tags = []
+    for tag in market.get("tags") or []:
+        tags.append(tag.get("label", "") if isinstance(tag, dict) else str(tag))
+    for event in market.get("events") or []:
+        if isinstance(event, dict):
+            tags.append(event.get("title", ""))
+    tags += [market.get("category") or "", market.get("groupItemTitle") or ""]
+    return {
+        "question": market.get("question") or "",
+        "description": (market.get("description") or "")[:MAX_DESCRIPTION_CHARS],
+        "tags": " ".join(t for t in tags if t),
+    }
+
+
+def term_weights(fields: dict) -> dict:
+    """Field-weighted log term frequencies, length-normalised (idf is applied at query time)."""
+    counts = {}
+    for field, text in fields.items():
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0.0) + FIELD_WEIGHTS.get(field, 1.0)
+    if not counts:
+        return {}
+    weights = {term: 1.0 + math.log(count) for term, count in counts.items()}
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    return {term: w / norm for term, w in weights.items()}
+
+
+class MarketIndex:
+    """Sparse TF-IDF index with posting lists, persisted in SQLite and held in memory."""
+
+    def __init__(self, path=MARKET_INDEX_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+        self.docs = {}          # market_id -> {term: weight}
+        self.postings = {}      # term -> {market_id: weight}
+        self.hashes = {}        # market_id -> text hash
+        self.questions = {}     # market_id -> question, for display
+        self.listed_at = {}     # market_id -> last time a listing contained it
+        self._load()
+
+    def _load(self):
+        for market_id, text_hash, question, updated_at in self.conn.execute(
+                "SELECT market_id, text_hash, question, updated_at FROM market_docs"):
+            self.hashes[market_id] = text_hash
+            self.questions[market_id] = question
+            self.listed_at[market_id] = updated_at
+            self.docs[market_id] = {}
+        for market_id, term, weight in self.conn.execute("SELECT market_id, term, weight FROM market_terms"):
+            self.docs[market_id][term] = weight
+            self.postings.setdefault(term, {})[market_id] = weight
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # --- Updating -----------------------------------------------------------
+
+    def _unlink(self, market_id: str):
+        for term in self.docs.pop(market_id, {}):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(market_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.hashes.pop(market_id, None)
+        self.questions.pop(market_id, None)
+        self.listed_at.pop(market_id, None)
+
+    def update(self, markets: list, complete: bool = False, max_age: float = STALE_AFTER) -> UpdateStats:
+        """Index new or changed markets and drop resolved ones.
+
+        complete: `markets` is the full open listing, so indexed markets
+        missing from it are dropped too. Otherwise markets missing from
+        every listing for max_age seconds are dropped.
+        """
+        started = time.monotonic()
+        now = time.time()
+        added, removed, unchanged, seen = [], [], [], set()
+
+        for market in markets:
+            market_id = str(market["id"])
+            seen.add(market_id)
+            if market_state(market).resolved:
+                if market_id in self.docs:
+                    removed.append(market_id)
+                continue
+            fields = market_fields(market)
+            text_hash = hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+            if self.hashes.get(market_id) == text_hash:
+                self.listed_at[market_id] = now
+                unchanged.append((now, market_id))
+                continue
+            self._unlink(market_id)
+            weights = term_weights(fields)
+            self.docs[market_id] = weights
+            self.hashes[market_id] = text_hash
+            self.questions[market_id] = fields["question"]
+            self.listed_at[market_id] = now
+            for term, weight in weights.items():
+                self.postings.setdefault(term, {})[market_id] = weight
+            added.append((market_id, text_hash, fields["question"], weights))
+
+        if complete:
+            removed += [market_id for market_id in self.docs if market_id not in seen]
+        elif max_age:
+            removed += [market_id for market_id, listed in self.listed_at.items()
+                        if market_id not in seen and now - listed > max_age]
+
+        for market_id in removed:
+            self._unlink(market_id)
+
+        with self.conn:
+            changed = [(market_id,) for market_id, *_ in added] + [(market_id,) for market_id in removed]
+            self.conn.executemany("DELETE FROM market_terms WHERE market_id = ?", changed)
+            self.conn.executemany("DELETE FROM market_docs WHERE market_id = ?", changed)
+            self.conn.executemany(
+                "INSERT INTO market_docs (market_id, text_hash, question, length, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(market_id, text_hash, question, len(weights), now)
+                 for market_id, text_hash, question, weights in added],
+            )
+            self.conn.executemany(
+                "INSERT INTO market_terms (market_id, term, weight) VALUES (?, ?, ?)",
+                [(market_id, term, weight) for market_id, _, _, weights in added for term, weight in weights.items()],
+            )
+            self.conn.executemany("UPDATE market_docs SET updated_at = ? WHERE market_id = ?", unchanged)
+        return UpdateStats(len(markets), len(added), len(removed), time.monotonic() - started)
+
+    def remove(self, market_ids: list) -> int:
+        """Drop markets (e.g. on resolution)."""
+        market_ids = [str(m) for m in market_ids if str(m) in self.docs]
+        for market_id in market_ids:
+            self._unlink(market_id)
+        with self.conn:
+            self.conn.executemany("DELETE FROM market_terms WHERE market_id = ?", [(m,) for m in market_ids])
+            self.conn.executemany("DELETE FROM market_docs WHERE market_id = ?", [(m,) for m in market_ids])
+        return len(market_ids)
+
+    # --- Querying -----------------------------------------------------------
+
+    def idf(self, term: str) -> float:
+        return math.log(1 + len(self.docs) / len(self.postings.get(term) or (None,)))
+
+    def _max_df(self) -> int:
+        return max(MIN_DF_SKIP, int(len(self.docs) * MAX_DF_SHARE))
+
+    def related(self, market_id: str, k: int = TOP_K, min_score: float = MIN_SCORE) -> list:
+        """[(market_id, score)] of the k most related markets, best first.
+
+        Only the posting lists of the market's most distinctive terms are
+        walked; each holds at most MAX_DF_SHARE of the markets.
+        """
+        weights = self.docs.get(str(market_id))
+        if not weights:
+            return []
+        max_df = self._max_df()
+        terms = [(self.idf(term), term, weight) for term, weight in weights.items()
+                 if len(self.postings.get(term, ())) <= max_df]
+        scores = {}
+        for idf, term, weight in heapq.nlargest(MAX_QUERY_TERMS, terms):
+            boost = idf * idf * weight
+            for other, other_weight in self.postings[term].items():
+                scores[other] = scores.get(other, 0.0) + boost * other_weight
+        scores.pop(str(market_id), None)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(other, round(score, 4)) for other, score in best if score >= min_score]
+
+    def related_pairs(self, market_ids: list = None, k: int = TOP_K, min_score: float = MIN_SCORE) -> dict:
+        """{(market_a, market_b): score} over the top-k lists of the given (or all) markets."""
+        pairs = {}
+        for market_id in (market_ids if market_ids is not None else list(self.docs)):
+            for other, score in self.related(str(market_id), k, min_score):
+                key = pair_key(str(market_id), other)
+                pairs[key] = max(score, pairs.get(key, 0.0))
+        return pairs
+
+    def stats(self) -> dict:
+        postings = [len(p) for p in self.postings.values()]
+        max_df = self._max_df()
+        return {
+            "markets": len(self.docs),
+            "terms": len(self.postings),
+            "postings": sum(postings),
+            "skipped_terms": sum(1 for n in postings if n > max_df),
+            "db_bytes": self.path.stat().st_size if self.path.exists() else 0,
+        }
+
+
+def scan_candidates(markets: list, index: "MarketIndex", min_coverage: float = MIN_COVERAGE,
+                    tier_filter: int = TIER_FILTER, k: int = TOP_K, max_cost: float = MAX_COST,
+                    limit: int = MAX_CANDIDATES) -> PrefilterResult:
+    """Outcome pairs that are both related by topic and within the price bounds.
+
+    The index is updated from the listing first; only the top-k related
+    markets of each market are paired, then hedge_prefilter's bounds are
+    applied to the four YES/NO combinations of each related pair. The
+    result is a PrefilterResult whose `pairs` counts related outcome pairs.
+    """
+    started = time.monotonic()
+    index.update(markets)
+    states = {s.market_id: s for s in map(market_state, markets) if not s.resolved}
+    related = index.related_pairs([m for m in states if m in index.docs], k)
+    floor = coverage_floor(min_coverage, tier_filter)
+
+    candidates, considered = [], 0
+    for market_a, market_b in related:
+        a, b = states.get(market_a), states.get(market_b)
+        if a is None or b is None:
+            continue   # related to a market not in this listing
+        for side_a, price_a in ((YES, a.price), (NO, round(1.0 - a.price, 6))):
+            for side_b, price_b in ((YES, b.price), (NO, round(1.0 - b.price, 6))):
+                if price_a < MIN_LEG_PRICE or price_b < MIN_LEG_PRICE:
+                    continue
+                considered += 1
+                coverage, cost, tier = pair_bounds(price_a, price_b)
+                if coverage >= floor - EPSILON and cost < max_cost - EPSILON:
+                    candidates.append(Candidate(market_a, side_a, price_a, market_b, side_b, price_b,
+                                                round(coverage, 6), round(cost, 6), tier))
+    candidates.sort(key=lambda c: (c.tier, -c.coverage))
+    return PrefilterResult(candidates[:limit], len(candidates), len(states), 2 * len(states), considered,
+                           time.monotonic() - started)
+
+
+# Topic vocabularies for synthetic listings (bench)
+SYNTHETIC_TOPICS = {
+    "election": ["Trump", "Harris", "Newsom", "DeSantis", "Senate", "House", "governor", "primary", "nominee"],
+    "crypto": ["Bitcoin", "Ethereum", "Solana", "ETF", "halving", "Coinbase", "stablecoin", "$100k", "all-time high"],
+    "sports": ["Lakers", "Celtics", "Chiefs", "Eagles", "Super Bowl", "NBA Finals", "MVP", "playoffs", "championship"],
+    "fed": ["Fed", "rate cut", "FOMC", "inflation", "CPI", "recession", "Powell", "basis points", "unemployment"],
+    "tech": ["OpenAI", "Apple", "Nvidia", "GPT-5", "iPhone", "antitrust", "IPO", "market cap", "Tesla"],
+    "geopolitics": ["Ukraine", "Russia", "ceasefire", "China", "Taiwan", "NATO", "Israel", "sanctions", "treaty"],
+}
+
+
+def synthetic_listing(count: int, seed: int = 11, event_size: int = 4) -> list:
+    """Deterministic Gamma-style markets: events of a few markets each, spread over a few topics."""
+    rng = random.Random(seed)
+    topics = list(SYNTHETIC_TOPICS)
+    syllables = ["ka", "lo", "mer", "vin", "dra", "sol", "tor", "zen", "qui", "bar", "nex", "ul"]
+    markets = []
+    for i in range(count):
+        event = i // event_size
+        topic = topics[event % len(topics)]
+        name = "".join(syllables[(event // len(syllables) ** j) % len(syllables)] for j in range(4)).title()
+        words = rng.sample(SYNTHETIC_TOPICS[topic], 3)
+        year = rng.choice((2026, 2027))
+        markets.append({
+            "id": str(700_000 + i),
+            "question": f"Will {name} {rng.choice(['win', 'reach', 'announce', 'pass'])} {words[0]} by {year}?",
+            "description": f"This market will resolve to Yes if {name} and {words[1]} ... {words[2]} {year}.",
+            "tags": [{"label": topic.title()}],
+            "events": [{"title": f"{name} {topic}"}],
+            "outcomePrices": json.dumps([str(round(rng.uniform(0.02, 0.98), 3))]),
+        })
+    return markets
+
+
+def main():
+    """Maintain the market index, or show related markets and scaling."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Market text index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    update_parser = sub.add_parser("update", help="Index the current open listing from the Gamma API")
+    update_parser.add_argument("--limit", type=int, default=2000)
+    update_parser.add_argument("--base-url", default=None)
+    related_parser = sub.add_parser("related", help="Markets related to one market")
+    related_parser.add_argument("market_id")
+    related_parser.add_argument("-k", type=int, default=TOP_K)
+    sub.add_parser("stats", help="Index size")
+    bench_parser = sub.add_parser("bench", help="Pair generation on synthetic listings")
+    bench_parser.add_argument("--markets", type=int, nargs="+", default=[500, 2000, 5000])
+    bench_parser.add_argument("-k", type=int, default=TOP_K)
+    parser.add_argument("--db", default=str(MARKET_INDEX_DB))
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        import tempfile
+        for count in args.markets:
+            with tempfile.TemporaryDirectory() as tmp, MarketIndex(Path(tmp) / "bench.db") as index:
+                result = scan_candidates(synthetic_listing(count), index, k=args.k)
+                print(f"🦞 {count:>6} markets: {2 * count * (count - 1):>12,} outcome pairs → "
+                      f"{result.pairs:>8,} related → {result.matched:>8,} within bounds in {result.elapsed:.2f}s")
+        return
+
+    with MarketIndex(args.db) as index:
+        if args.command == "update":
+            from price_refresh import GAMMA_API, PooledHTTPClient, fetch_open_markets
+
+            client = PooledHTTPClient(args.base_url or GAMMA_API)
+            try:
+                markets = fetch_open_markets(client, args.limit)
+            finally:
+                client.close()
+            stats = index.update(markets, complete=len(markets) < args.limit)
+            print(f"✅ {stats.listed} listed: {stats.added} indexed, {stats.removed} removed ({stats.elapsed:.2f}s)")
+        elif args.command == "related":
+            print(f"🦞 {index.questions.get(args.market_id, args.market_id)}")
+            for other, score in index.related(args.market_id, args.k):
+                print(f"   {score:.3f}  {other}  {index.questions.get(other, '')}")
+        else:
+            for key, value in index.stats().items():
+                print(f"📊 {key}: {value:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Incremental mark-to-market P&L for active hedges.
+
+Keeps running state for every active hedge - cost basis (total_real_cost),
+coverage, tier, strategy and the current mark of both legs - plus running
+portfolio aggregates per tier and per strategy. A price tick touches only
+the hedges with a leg in a priced market: each one's contribution is taken
+out of its aggregates, re-marked and put back, so a tick costs O(legs) and
+a report costs O(tiers + strategies), however long the price history is.
+New and closed hedges are picked up by refresh(): on every report, and on
+the tick path at most every RECONCILE_INTERVAL seconds.
+
+Position state is checkpointed to pnl_positions in hedge_testing.db after
+every tick (dirty rows only), so a restart loads the checkpoint instead of
+replaying price_history. Engines in other processes (the scheduler's
+monitor, a Betty worker) pick up each other's marks by reading checkpoint
+rows newer than the last ones they saw.
+
+A hedge holds `shares` of each leg: total_real_cost / (entry price of the
+target leg + entry price of the cover leg). Entry prices and leg sides come
+from target_price/cover_price and target_position/cover_position when the
+hedges table has them; otherwise legs are YES and the first mark is the
+entry.
+
+Usage:
+    engine = PnLEngine()
+    refresh_hedge_db(on_prices=engine.on_prices)   # price_refresh monitor tick
+    print(format_report(engine.snapshot()))
+
+    python3 pnl_engine.py show [--json]
+    python3 pnl_engine.py rebuild            # drop the checkpoint, re-mark from latest prices
+    python3 pnl_engine.py bench --hedges 5000 --ticks 200
+"""
+
+import heapq
+import json
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from hedge_db_pool import get_pool
+from price_store import PriceStore
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+HEDGE_DB = POLYCLAW_DIR / "db" / "hedge_testing.db"
+
+ACTIVE_STATUS = "active"
+DEFAULT_STRATEGY = "default"
+YES, NO = "YES", "NO"
+
+# Optional hedges columns: (target, cover)
+SIDE_COLUMNS = ("target_position", "cover_position")
+ENTRY_COLUMNS = ("target_price", "cover_price")
+STRATEGY_COLUMN = "strategy"
+ID_CHUNK = 500              # hedge IDs per IN (...) query
+RECONCILE_INTERVAL = 60     # seconds between hedges-table reconciles from on_prices
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pnl_positions (
+    hedge_id INTEGER PRIMARY KEY,
+    tier INTEGER,
+    strategy TEXT NOT NULL,
+    coverage REAL,
+    cost REAL NOT NULL,
+    shares REAL,
+    target_market_id TEXT,
+    target_side TEXT NOT NULL,
+    target_mark REAL,
+    cover_market_id TEXT,
+    cover_side TEXT NOT NULL,
+    cover_mark REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pnl_positions_updated ON pnl_positions(updated_at);
+"""
+
+POSITION_FIELDS = ("hedge_id", "tier", "strategy", "coverage", "cost", "shares", "target_market_id",
+                   "target_side", "target_mark", "cover_market_id", "cover_side", "cover_mark")
+
+
+class Aggregate(NamedTuple):
+    hedges: int
+    priced: int        # hedges with both legs marked
+    cost: float
+    value: float
+    coverage: float    # average
+
+    @property
+    def pnl(self) -> float:
+        return self.value - self.cost
+
+    @property
+    def roi(self) -> float:
+        return self.pnl / self.cost if self.cost else 0.0
+
+
+class PnLSnapshot(NamedTuple):
+    total: Aggregate
+    by_tier: dict          # tier -> Aggregate
+    by_strategy: dict      # strategy -> Aggregate
+    best: list             # (pnl, hedge_id, tier, strategy)
+    worst: list
+    marked_at: float       # last tick applied (epoch), 0 if none
+    elapsed: float
+
+
+class Position:
+    """Mark-to-market state of one hedge."""
+
+    __slots__ = POSITION_FIELDS
+
+    def __init__(self, **fields):
+        for name in POSITION_FIELDS:
+            setattr(self, name, fields.get(name))
+
+    @property
+    def priced(self) -> bool:
+        return self.target_mark is not None and self.cover_mark is not None
+
+    @property
+    def value(self) -> float:
+        """Current value of both legs; the cost basis until both are marked."""
+        if not self.priced or not self.shares:
+            return self.cost
+        return self.shares * (self.target_mark + self.cover_mark)
+
+    def mark(self, market_id: str, yes: float, no: float) -> bool:
+        changed = False
+        for leg in ("target", "cover"):
+            if getattr(self, f"{leg}_market_id") == market_id:
+                setattr(self, f"{leg}_mark", yes if getattr(self, f"{leg}_side") == YES else no)
+                changed = True
+        if changed and self.shares is None and self.priced:
+            entry = self.target_mark + self.cover_mark
+            self.shares = self.cost / entry if entry > 0 else 0.0   # first full mark is the entry
+        return changed
+
+    def row(self, updated_at: float) -> tuple:
+        return tuple(getattr(self, name) for name in POSITION_FIELDS) + (updated_at,)
+
+
+class PnLEngine:
+    """Running per-hedge marks and per-tier/per-strategy aggregates."""
+
+    def __init__(self, db_path=HEDGE_DB, store: PriceStore = None):
+        self.db_path = Path(db_path)
+        self.db = get_pool(db_path)
+        self.store = store
+        self.positions = {}     # hedge_id -> Position
+        self.by_market = {}     # market_id -> {hedge_id}
+        self.totals = {}        # ("tier", n) / ("strategy", s) / ("all", None) -> [hedges, priced, cost, value, coverage]
+        self.marked_at = 0.0
+        self._seen = 0.0        # newest checkpoint row applied
+        self._refreshed = None  # monotonic time of the last refresh()
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            with self.db.writer() as conn:
+                conn.executescript(SCHEMA)
+            self._schema_ready = True
+
+    # --- Aggregates ---------------------------------------------------------
+
+    def _keys(self, position: Position):
+        return (("all", None), ("tier", position.tier), ("strategy", position.strategy))
+
+    def _account(self, position: Position, sign: int):
+        """Add (sign=1) or remove (sign=-1) a position's contribution to its aggregates."""
+        contribution = (1, 1 if position.priced else 0, position.cost, position.value, position.coverage or 0.0)
+        for key in self._keys(position):
+            totals = self.totals.setdefault(key, [0, 0, 0.0, 0.0, 0.0])
+            for i, amount in enumerate(contribution):
+                totals[i] += sign * amount
+            if totals[0] == 0:
+                del self.totals[key]
+
+    def _add(self, position: Position):
+        self._drop(position.hedge_id)
+        self.positions[position.hedge_id] = position
+        for market_id in (position.target_market_id, position.cover_market_id):
+            if market_id:
+                self.by_market.setdefault(market_id, set()).add(position.hedge_id)
+        self._account(position, 1)
+
+    def _drop(self, hedge_id: int):
+        position = self.positions.pop(hedge_id, None)
+        if position is None:
+            return
+        self._account(position, -1)
+        for market_id in (position.target_market_id, position.cover_market_id):
+            hedges = self.by_market.get(market_id)
+            if hedges is not None:
+                hedges.discard(hedge_id)
+                if not hedges:
+                    del self.by_market[market_id]
+
+    # --- Loading and reconciling ---------------------------------------------
+
+    def _pull_checkpoint(self, conn: sqlite3.Connection):
+        """Apply checkpoint rows written since we last looked (by us or another process)."""
+        rows = conn.execute(
+            f"SELECT {', '.join(POSITION_FIELDS)}, updated_at FROM pnl_positions WHERE updated_at > ? "
+            "ORDER BY updated_at", (self._seen,)
+        ).fetchall()
+        for row in rows:
+            self._add(Position(**dict(zip(POSITION_FIELDS, row))))
+            self._seen = max(self._seen, row[-1])
+            self.marked_at = max(self.marked_at, row[-1])
+
+    def _latest_prices(self, conn: sqlite3.Connection, market_ids: set) -> dict:
+        """{market_id: (yes, no)} from the price store, falling back to the newest price_history row."""
+        prices = {}
+        store = self.store or PriceStore(db_path=None)
+        has_history = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'price_history'").fetchone() is not None
+        for market_id in market_ids:
+            latest = store.latest(market_id)
+            if latest is not None:
+                prices[market_id] = latest[1:]
+            elif has_history:
+                row = conn.execute("SELECT yes_price, no_price FROM price_history WHERE market_id = ? "
+                                   "ORDER BY recorded_at DESC LIMIT 1", (market_id,)).fetchone()
+                if row and row[0] is not None:
+                    prices[market_id] = (row[0], row[1] if row[1] is not None else 1.0 - row[0])
+        return prices
+
+    def _reconcile(self) -> list:
+        """Add newly active hedges, drop closed ones; returns the new Positions.
+
+        Only active IDs are listed (an index scan); full rows are read for new hedges alone.
+        Reads happen on a pooled reader; the writer is taken only to delete closed hedges.
+        """
+        added = []
+        with self.db.connection() as conn:
+            try:
+                active = {row[0] for row in conn.execute("SELECT id FROM hedges WHERE status = ?", (ACTIVE_STATUS,))}
+            except sqlite3.OperationalError:
+                return []   # no hedges table yet
+            closed = [hedge_id for hedge_id in self.positions if hedge_id not in active]
+
+            new_ids = sorted(active.difference(self.positions))
+            rows = []
+            if new_ids:
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(hedges)")}
+                optional = [c if c in columns else "NULL" for c in SIDE_COLUMNS + ENTRY_COLUMNS + (STRATEGY_COLUMN,)]
+                for i in range(0, len(new_ids), ID_CHUNK):
+                    chunk = new_ids[i:i + ID_CHUNK]
+                    rows += conn.execute(
+                        f"SELECT id, tier, coverage, total_real_cost, target_market_id, cover_market_id, "
+                        f"{', '.join(optional)} FROM hedges WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+
+            for (hedge_id, tier, coverage, cost, target, cover,
+                 target_side, cover_side, target_entry, cover_entry, strategy) in rows:
+                entry = (target_entry or 0.0) + (cover_entry or 0.0)
+                added.append(Position(
+                    hedge_id=hedge_id, tier=tier, strategy=strategy or DEFAULT_STRATEGY, coverage=coverage,
+                    cost=cost or 0.0, shares=(cost or 0.0) / entry if target_entry and cover_entry else None,
+                    target_market_id=str(target) if target else None, target_side=(target_side or YES).upper(),
+                    cover_market_id=str(cover) if cover else None, cover_side=(cover_side or YES).upper(),
+                ))
+            markets = {m for p in added for m in (p.target_market_id, p.cover_market_id) if m}
+            prices = self._latest_prices(conn, markets) if markets else {}
+
+        for hedge_id in closed:
+            self._drop(hedge_id)
+        if closed:
+            self.db.write_many("DELETE FROM pnl_positions WHERE hedge_id = ?", [(h,) for h in closed])
+        for position in added:
+            for market_id in (position.target_market_id, position.cover_market_id):
+                if market_id in prices:
+                    position.mark(market_id, *prices[market_id])
+            self._add(position)
+        return added
+
+    def refresh(self):
+        """Catch up with the checkpoint and the hedges table (cheap after the first call)."""
+        with self._lock:
+            self._ensure_schema()
+            with self.db.connection() as conn:
+                self._pull_checkpoint(conn)
+            added = self._reconcile()
+            if added:
+                self._checkpoint(added)
+            self._refreshed = time.monotonic()
+
+    # --- Ticks --------------------------------------------------------------
+
+    def _checkpoint(self, positions: list):
+        now = time.time()
+        with self.db.writer() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO pnl_positions ({', '.join(POSITION_FIELDS)}, updated_at) "
+                f"VALUES ({', '.join('?' * (len(POSITION_FIELDS) + 1))})",
+                [position.row(now) for position in positions],
+            )
+        self._seen = max(self._seen, now)
+
+    def apply(self, prices: dict) -> list:
+        """Re-mark the hedges with a leg in `prices` ({market_id: (yes, no)}); returns them."""
+        touched = {}
+        for market_id, (yes, no) in prices.items():
+            for hedge_id in self.by_market.get(str(market_id), ()):
+                position = self.positions[hedge_id]
+                self._account(position, -1)
+                position.mark(str(market_id), yes, no if no is not None else 1.0 - yes)
+                self._account(position, 1)
+                touched[hedge_id] = position
+        if touched:
+            self.marked_at = time.time()
+        return list(touched.values())
+
+    def on_prices(self, prices: dict):
+        """price_refresh on_prices callback: re-mark and checkpoint the touched hedges.
+
+        The hedges table is reconciled at most every RECONCILE_INTERVAL seconds,
+        so a tick stays O(legs) rather than O(active hedges).
+        """
+        if self._refreshed is None or time.monotonic() - self._refreshed > RECONCILE_INTERVAL:
+            self.refresh()
+        with self._lock:
+            touched = self.apply(prices)
+            if touched:
+                self._checkpoint(touched)
+
+    def rebuild(self):
+        """Forget the checkpoint and re-mark every active hedge from the latest prices."""
+        with self._lock:
+            self._ensure_schema()
+            self.db.write("DELETE FROM pnl_positions")
+            self.positions, self.by_market, self.totals = {}, {}, {}
+            self._seen = self.marked_at = 0.0
+            self._checkpoint(self._reconcile())
+
+    # --- Reporting ----------------------------------------------------------
+
+    def snapshot(self, top: int = 3) -> PnLSnapshot:
+        started = time.monotonic()
+        with self._lock:
+            aggregates = {}
+            for (kind, key), (hedges, priced, cost, value, coverage) in self.totals.items():
+                aggregates[(kind, key)] = Aggregate(hedges, priced, round(cost, 6), round(value, 6),
+                                                    coverage / hedges if hedges else 0.0)
+            ranked = [(p.value - p.cost, p.hedge_id, p.tier, p.strategy) for p in self.positions.values() if p.priced]
+            best = heapq.nlargest(top, ranked)
+            worst = heapq.nsmallest(top, ranked)
+        return PnLSnapshot(
+            total=aggregates.get(("all", None), Aggregate(0, 0, 0.0, 0.0, 0.0)),
+            by_tier={key: agg for (kind, key), agg in sorted(aggregates.items(), key=str) if kind == "tier"},
+            by_strategy={key: agg for (kind, key), agg in sorted(aggregates.items(), key=str) if kind == "strategy"},
+            best=best, worst=worst, marked_at=self.marked_at, elapsed=time.monotonic() - started,
+        )
+
+
+def format_report(snapshot: PnLSnapshot) -> str:
+    total = snapshot.total
+    if not total.hedges:
+        return "🦞 No active hedges"
+    marked = time.strftime("%Y-%m-%d %H:%M", time.gmtime(snapshot.marked_at)) if snapshot.marked_at else "never"
+    msg = (f"🦞 {total.hedges} active hedges ({total.priced} priced): cost ${total.cost:.2f}, "
+           f"value ${total.value:.2f}, P&L ${total.pnl:+.2f} ({total.roi:+.1%})\n")
+    msg += f"   marked {marked} UTC, avg coverage {total.coverage:.1%}\n"
+    for title, groups in (("Tier", snapshot.by_tier), ("Strategy", snapshot.by_strategy)):
+        for key, agg in groups.items():
+            msg += f"   {title} {key}: {agg.hedges} hedges, ${agg.cost:.2f} → ${agg.value:.2f} ({agg.pnl:+.2f}, {agg.roi:+.1%})\n"
+    for title, hedges in (("Best", snapshot.best), ("Worst", snapshot.worst)):
+        if hedges:
+            msg += f"   {title}: " + ", ".join(f"#{h} {pnl:+.2f}" for pnl, h, _, _ in hedges) + "\n"
+    return msg
+
+
+def _bench(hedges: int, ticks: int):
+    """Tick cost and report latency on a synthetic hedges table."""
+    import random
+    import tempfile
+
+    rng = random.Random(3)
+    markets = max(2, hedges // 2)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "hedge.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("CREATE TABLE hedges (id INTEGER PRIMARY KEY, target_market_id TEXT, cover_market_id TEXT, "
+                     "tier INTEGER, coverage REAL, total_real_cost REAL, status TEXT, strategy TEXT)")
+        with conn:
+            conn.executemany(
+                "INSERT INTO hedges (target_market_id, cover_market_id, tier, coverage, total_real_cost, status, "
+                "strategy) VALUES (?, ?, ?, ?, ?, 'active', ?)",
+                [(str(rng.randrange(markets)), str(rng.randrange(markets)), rng.randint(1, 3),
+                  rng.uniform(0.85, 0.99), rng.uniform(1, 50), rng.choice(["default", "momentum", "arb"]))
+                 for _ in range(hedges)])
+        conn.close()
+
+        store = PriceStore(Path(tmp) / "store", db_path=None)
+        engine = PnLEngine(db_path, store)
+        started = time.monotonic()
+        engine.refresh()
+        loaded = time.monotonic() - started
+
+        batch = max(1, markets // 20)     # a monitor tick prices a slice of the markets
+        started = time.monotonic()
+        for _ in range(ticks):
+            engine.on_prices({str(m): (p, 1 - p) for m, p in
+                              ((rng.randrange(markets), rng.uniform(0.01, 0.99)) for _ in range(batch))})
+        per_tick = (time.monotonic() - started) / ticks
+
+        restarted = PnLEngine(db_path, store)
+        started = time.monotonic()
+        restarted.refresh()
+        reload = time.monotonic() - started
+        snapshot = restarted.snapshot()
+        assert abs(snapshot.total.value - engine.snapshot().total.value) < 1e-6
+
+        print(f"🦞 {hedges:,} hedges over {markets:,} markets, {ticks} ticks of {batch} prices")
+        print(f"   first load {loaded * 1000:.1f}ms, tick {per_tick * 1000:.2f}ms, "
+              f"restart from checkpoint {reload * 1000:.1f}ms, report {snapshot.elapsed * 1000:.2f}ms")
+        engine.db.close()
+
+
+def main():
+    """Show, rebuild or benchmark the P&L engine."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental hedge P&L")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show_parser = sub.add_parser("show", help="Portfolio P&L from the checkpoint")
+    show_parser.add_argument("--json", action="store_true")
+    sub.add_parser("rebuild", help="Drop the checkpoint and re-mark from the latest prices")
+    bench_parser = sub.add_parser("bench", help="Synthetic tick and report latency")
+    bench_parser.add_argument("--hedges", type=int, default=5000)
+    bench_parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--db", default=str(HEDGE_DB))
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        _bench(args.hedges, args.ticks)
+        return
+
+    engine = PnLEngine(args.db)
+    if args.command == "rebuild":
+        engine.rebuild()
+        print(f"✅ Rebuilt P&L checkpoint for {len(engine.positions)} active hedges")
+        return
+    engine.refresh()
+    snapshot = engine.snapshot()
+    if args.json:
+        print(json.dumps({
+            "total": {**snapshot.total._asdict(), "pnl": snapshot.total.pnl},
+            "by_tier": {str(k): {**a._asdict(), "pnl": a.pnl} for k, a in snapshot.by_tier.items()},
+            "by_strategy": {k: {**a._asdict(), "pnl": a.pnl} for k, a in snapshot.by_strategy.items()},
+            "marked_at": snapshot.marked_at,
+        }, indent=2))
+    else:
+        print(format_report(snapshot), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Batched price refresh for hedge monitoring.
+
+Collects the distinct market IDs behind all active hedges, fetches their
+prices in bulk (one request per batch of markets) over a pool of keep-alive
+HTTP connections with bounded concurrency, and writes the whole tick to
+price_history in a single transaction and to the columnar price store.
+Database access goes through the shared WAL pool (hedge_db_pool.py): the
+active legs are read on a pooled reader and the writer is only taken for
+the insert, never across the HTTP fetch.
+
+Usage:
+  python3 price_refresh.py refresh
+  python3 price_refresh.py stub --port 8765      # local stand-in price server
+  python3 price_refresh.py refresh --base-url http://127.0.0.1:8765
+"""
+
+import http.client
+import json
+import queue
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlencode, urlsplit
+
+from hedge_db_pool import HedgeDBPool, get_pool
+from price_store import PriceStore
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+HEDGE_DB = POLYCLAW_DIR / "db" / "hedge_testing.db"
+
+GAMMA_API = "https://gamma-api.polymarket.com"
+BATCH_SIZE = 50          # market IDs per request
+PAGE_SIZE = 500          # markets per listing page
+STUB_MARKETS = 5000      # open markets listed by the stub server
+MAX_CONNECTIONS = 4      # concurrent keep-alive connections
+REQUEST_TIMEOUT = 15
+
+ACTIVE_STATUS = "active"
+HEDGE_LEG_COLUMNS = ("target_market_id", "cover_market_id")
+
+PRICE_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    market_id TEXT NOT NULL,
+    yes_price REAL,
+    no_price REAL,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_price_history_market ON price_history(market_id, recorded_at);
+"""
+
+
+class RefreshStats(NamedTuple):
+    markets: int
+    priced: int
+    batches: int
+    elapsed: float
+
+
+class PooledHTTPClient:
+    """Bounded pool of keep-alive connections to one host."""
+
+    def __init__(self, base_url: str, max_connections: int = MAX_CONNECTIONS,
+                 timeout: float = REQUEST_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.requests = 0
+        self._pool = queue.LifoQueue()
+        for _ in range(max_connections):
+            self._pool.put(None)  # connections are opened lazily
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def get_json(self, path: str, params=None):
+        """GET path?params and decode the JSON body, retrying once on a dropped connection."""
+        url = self.prefix + path + (f"?{urlencode(params, doseq=True)}" if params else "")
+        conn = self._pool.get()
+        try:
+            for attempt in range(2):
+                conn = conn or self._connect()
+                try:
+                    conn.request("GET", url, headers={"Accept": "application/json"})
+                    response = conn.getresponse()
+                    body = response.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # Server closed an idle keep-alive connection: reconnect once
+                    conn.close()
+                    conn = None
+                    if attempt:
+                        raise
+                    continue
+                except Exception:
+                    conn.close()
+                    conn = None
+                    raise
+
+                self.requests += 1
+                if response.will_close:
+                    conn.close()
+                    conn = None
+                if response.status != 200:
+                    raise http.client.HTTPException(f"HTTP {response.status} for {url}")
+                return json.loads(body)
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            conn = self._pool.get_nowait()
+            if conn:
+                conn.close()
+
+
+def active_market_ids(conn: sqlite3.Connection) -> list:
+    """Distinct market IDs across the legs of all active hedges."""
+    legs = " UNION ".join(
+        f"SELECT {column} FROM hedges WHERE status = '{ACTIVE_STATUS}' AND {column} IS NOT NULL"
+        for column in HEDGE_LEG_COLUMNS
+    )
+    return [str(row[0]) for row in conn.execute(legs)]
+
+
+def _parse_prices(market: dict):
+    prices = market.get("outcomePrices") or []
+    if isinstance(prices, str):
+        prices = json.loads(prices)
+    if not prices:
+        return None
+    yes = float(prices[0])
+    no = float(prices[1]) if len(prices) > 1 else 1.0 - yes
+    return yes, no
+
+
+def fetch_prices(market_ids, client: PooledHTTPClient, batch_size: int = BATCH_SIZE,
+                 concurrency: int = MAX_CONNECTIONS) -> dict:
+    """Fetch {market_id: (yes, no)} for deduplicated IDs, one request per batch."""
+    ids = list(dict.fromkeys(str(m) for m in market_ids))
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+    def fetch(batch):
+        markets = client.get_json("/markets", {"id": batch, "limit": len(batch)})
+        return {str(m["id"]): _parse_prices(m) for m in markets}
+
+    prices = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as pool:
+        for result in pool.map(fetch, batches):
+            prices.update({k: v for k, v in result.items() if v is not None})
+    return prices
+
+
+def fetch_open_markets(client: PooledHTTPClient, limit: int, page_size: int = PAGE_SIZE) -> list:
+    """Up to `limit` open markets, highest volume first, paging through /markets."""
+    markets = []
+    while len(markets) < limit:
+        count = min(page_size, limit - len(markets))
+        page = client.get_json("/markets", {
+            "active": "true", "closed": "false", "order": "volume", "ascending": "false",
+            "limit": count, "offset": len(markets),
+        })
+        markets.extend(page)
+        if len(page) < count:
+            break
+    return markets
+
+
+def write_price_history(conn: sqlite3.Connection, prices: dict, recorded_at: str = None,
+                        store: PriceStore = None):
+    """Append one tick for every market in a single transaction, then to the price store."""
+    recorded_at = recorded_at or time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    conn.executescript(PRICE_HISTORY_SCHEMA)
+    with conn:
+        conn.executemany(
+            "INSERT INTO price_history (market_id, yes_price, no_price, recorded_at) VALUES (?, ?, ?, ?)",
+            [(market_id, yes, no, recorded_at) for market_id, (yes, no) in prices.items()],
+        )
+    try:
+        (store or PriceStore()).append_tick(prices, recorded_at)
+    except OSError:
+        pass  # price_history stays authoritative; the store is a derived copy
+
+
+def refresh_prices(db: HedgeDBPool, client: PooledHTTPClient = None,
+                   batch_size: int = BATCH_SIZE, on_prices=None) -> RefreshStats:
+    """One monitor cycle: dedupe legs, bulk fetch, single-transaction write.
+
+    on_prices(prices) is called with {market_id: (yes, no)} before returning.
+    """
+    started = time.monotonic()
+    own_client = client is None
+    client = client or PooledHTTPClient(GAMMA_API)
+    try:
+        with db.connection() as conn:
+            market_ids = active_market_ids(conn)
+        prices = fetch_prices(market_ids, client, batch_size) if market_ids else {}
+        if prices:
+            with db.writer() as conn:
+                write_price_history(conn, prices)
+            if on_prices:
+                on_prices(prices)
+    finally:
+        if own_client:
+            client.close()
+
+    batches = (len(market_ids) + batch_size - 1) // batch_size
+    return RefreshStats(len(market_ids), len(prices), batches, time.monotonic() - started)
+
+
+def refresh_hedge_db(db_path=HEDGE_DB, client: PooledHTTPClient = None, on_prices=None) -> RefreshStats:
+    """Refresh prices for hedge_testing.db through the process's shared pool."""
+    return refresh_prices(get_pool(db_path), client, on_prices=on_prices)
+
+
+def serve_stub_prices(port: int = 8765, host: str = "127.0.0.1"):
+    """Local stand-in for the Gamma /markets endpoint (deterministic prices)."""
+    import zlib
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path != "/markets":
+                self.send_error(404)
+                return
+            query = parse_qs(parts.query)
+            market_ids = query.get("id")
+            if market_ids is None:
+                # Listing: open markets by offset/limit
+                offset = int(query.get("offset", ["0"])[0])
+                limit = int(query.get("limit", ["100"])[0])
+                market_ids = [str(500_000 + k) for k in range(offset, min(offset + limit, STUB_MARKETS))]
+            markets = []
+            for market_id in market_ids:
+                yes = (zlib.crc32(market_id.encode()) % 99 + 1) / 100
+                markets.append({"id": market_id, "question": f"Stub event {int(market_id) // 4} market {market_id}?",
+                                "outcomePrices": json.dumps([str(yes), str(round(1 - yes, 2))])})
+            body = json.dumps(markets).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Batched hedge price refresh")
+    parser.add_argument("command", choices=["refresh", "stub"])
+    parser.add_argument("--db", default=str(HEDGE_DB))
+    parser.add_argument("--base-url", default=GAMMA_API)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == "stub":
+        server = serve_stub_prices(args.port)
+        print(f"🦞 Stub price server on http://127.0.0.1:{args.port}/markets")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    client = PooledHTTPClient(args.base_url)
+    try:
+        stats = refresh_hedge_db(args.db, client)
+    finally:
+        client.close()
+    print(f"✅ Refreshed {stats.priced}/{stats.markets} markets in {stats.batches} batches "
+          f"({client.requests} requests, {stats.elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Columnar price-history store for hedge monitoring and the dashboard.
+
+price_history in hedge_testing.db holds one row per market per monitor
+tick, and every chart or P&L view re-parses those rows. This store keeps
+the same ticks as append-only column files per market - timestamps
+(float64 epoch seconds) and YES/NO prices (float32) - plus 1h and 1d
+rollups (close, high, low, tick count) maintained as ticks arrive:
+
+    price_store/<market_id>/raw/{ts,yes,no}.bin
+    price_store/<market_id>/1h/{ts,yes,no,high,low,count}.bin
+    price_store/<market_id>/1d/...
+
+Readers memory-map the column files, binary-search the timestamps and hand
+back NumPy views of the window, so loading a week of ticks copies nothing
+and parses nothing. A market that isn't in the store yet is read through
+from price_history once and served from the store afterwards.
+
+price_refresh appends every tick it writes to price_history. Writers hold
+an fcntl lock; the ts column is written last, so a concurrent reader never
+sees a timestamp without its prices. A writer that died mid-append leaves
+price columns longer than ts; the next append cuts them back to ts first.
+
+Usage:
+    window = price_window("512345", start=time.time() - 7 * 86400, resolution="1h")
+    window["ts"], window["yes"], window["high"]          # numpy views
+
+    python3 price_store.py sync                 # import price_history from hedge_testing.db
+    python3 price_store.py show 512345 --days 7 --resolution 1h
+    python3 price_store.py stats
+    python3 price_store.py bench --markets 50 --ticks 20000
+"""
+
+import array
+import bisect
+import fcntl
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from hedge_db_pool import get_pool
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+HEDGE_DB = POLYCLAW_DIR / "db" / "hedge_testing.db"
+PRICE_STORE_DIR = Path(os.environ.get("PRICE_STORE_DIR", POLYCLAW_DIR / "db" / "price_store"))
+
+RAW = "raw"
+ROLLUPS = {"1h": 3600, "1d": 86400}
+RESOLUTIONS = (RAW,) + tuple(ROLLUPS)
+
+# Column name -> little-endian dtype. ts is always first in read order and last in write order.
+RAW_COLUMNS = {"ts": "<f8", "yes": "<f4", "no": "<f4"}
+ROLLUP_COLUMNS = {"ts": "<f8", "yes": "<f4", "no": "<f4", "high": "<f4", "low": "<f4", "count": "<u4"}
+TYPECODES = {"<f8": "d", "<f4": "f", "<u4": "I"}   # array module fallback (no NumPy)
+ITEMSIZE = {"<f8": 8, "<f4": 4, "<u4": 4}
+
+SAFE_ID = re.compile(r"[^\w\-.]")
+
+
+def _columns(resolution: str) -> dict:
+    if resolution == RAW:
+        return RAW_COLUMNS
+    if resolution in ROLLUPS:
+        return ROLLUP_COLUMNS
+    raise ValueError(f"Unknown resolution {resolution!r} (expected one of {', '.join(RESOLUTIONS)})")
+
+
+def parse_timestamp(value) -> float:
+    """Epoch seconds from a price_history recorded_at (ISO 8601, 'Z' or naive UTC) or a number."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class PriceStore:
+    """Per-market memory-mapped column files with 1h/1d rollups."""
+
+    def __init__(self, root=PRICE_STORE_DIR, db_path=HEDGE_DB):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(db_path) if db_path else None
+        self._maps = {}   # path -> (length, numpy memmap)
+
+    # --- Layout -------------------------------------------------------------
+
+    def _dir(self, market_id: str, resolution: str) -> Path:
+        return self.root / SAFE_ID.sub("_", str(market_id)) / resolution
+
+    def length(self, market_id: str, resolution: str = RAW) -> int:
+        """Rows stored, judged by the ts column (written last)."""
+        path = self._dir(market_id, resolution) / "ts.bin"
+        try:
+            return path.stat().st_size // ITEMSIZE["<f8"]
+        except FileNotFoundError:
+            return 0
+
+    def markets(self) -> list:
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def _lock(self):
+        fd = os.open(self.root / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    @staticmethod
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    # --- Writing ------------------------------------------------------------
+
+    def _last_row(self, market_id: str, resolution: str, n: int) -> dict:
+        """The stored row n - 1 as {column: value}."""
+        row = {}
+        for column, dtype in _columns(resolution).items():
+            size = ITEMSIZE[dtype]
+            with open(self._dir(market_id, resolution) / f"{column}.bin", "rb") as f:
+                f.seek((n - 1) * size)
+                row[column] = array.array(TYPECODES[dtype], f.read(size))[0]
+        return row
+
+    def _write_rows(self, market_id: str, resolution: str, rows: list, at: int = None):
+        """Append rows ({column: value}), or overwrite from row `at` onwards; ts goes last.
+
+        Callers hold the lock. Appends first cut every column back to the
+        rows ts says are stored, dropping what an interrupted write left.
+        """
+        directory = self._dir(market_id, resolution)
+        directory.mkdir(parents=True, exist_ok=True)
+        columns = _columns(resolution)
+        n = self.length(market_id, resolution)
+        for column in [c for c in columns if c != "ts"] + ["ts"]:
+            dtype = columns[column]
+            data = array.array(TYPECODES[dtype], [row[column] for row in rows]).tobytes()
+            path = directory / f"{column}.bin"
+            if at is None:
+                with open(path, "ab") as f:
+                    if f.tell() > n * ITEMSIZE[dtype]:
+                        f.truncate(n * ITEMSIZE[dtype])
+                    f.write(data)
+            else:
+                with open(path, "r+b") as f:
+                    f.seek(at * ITEMSIZE[dtype])
+                    f.write(data)
+
+    def _roll_up(self, market_id: str, ticks: list):
+        for resolution, seconds in ROLLUPS.items():
+            n = self.length(market_id, resolution)
+            rows = [self._last_row(market_id, resolution, n)] if n else []
+            reopened = False   # ticks landed in the last stored bucket
+            for ts, yes, no in ticks:
+                bucket = ts - ts % seconds
+                last = rows[-1] if rows else None
+                if last is not None and last["ts"] == bucket:
+                    last.update(yes=yes, no=no, high=max(last["high"], yes), low=min(last["low"], yes),
+                                count=last["count"] + 1)
+                    reopened = reopened or (n and len(rows) == 1)
+                else:
+                    rows.append({"ts": bucket, "yes": yes, "no": no, "high": yes, "low": yes, "count": 1})
+            if reopened:
+                self._write_rows(market_id, resolution, rows[:1], at=n - 1)
+            new_rows = rows[1:] if n else rows
+            if new_rows:
+                self._write_rows(market_id, resolution, new_rows)
+
+    def append(self, market_id: str, ticks: list) -> int:
+        """Append (ts, yes, no) ticks in time order; ticks not newer than the last stored one are skipped."""
+        market_id = str(market_id)
+        fd = self._lock()
+        try:
+            n = self.length(market_id)
+            last_ts = self._last_row(market_id, RAW, n)["ts"] if n else float("-inf")
+            fresh = []
+            for ts, yes, no in sorted(ticks, key=lambda tick: tick[0]):
+                if ts > last_ts and yes is not None:
+                    no = 1.0 - yes if no is None else no
+                    fresh.append((float(ts), float(yes), float(no)))
+                    last_ts = ts
+            if fresh:
+                self._write_rows(market_id, RAW, [{"ts": t, "yes": y, "no": n_} for t, y, n_ in fresh])
+                self._roll_up(market_id, fresh)
+            return len(fresh)
+        finally:
+            self._unlock(fd)
+
+    def append_tick(self, prices: dict, recorded_at=None) -> int:
+        """One monitor tick: {market_id: (yes, no)} at recorded_at (default now)."""
+        ts = parse_timestamp(recorded_at) if recorded_at is not None else time.time()
+        return sum(self.append(market_id, [(ts, yes, no)]) for market_id, (yes, no) in prices.items())
+
+    def sync(self, conn: sqlite3.Connection = None, market_ids: list = None) -> int:
+        """Import price_history rows newer than what the store holds; returns ticks added."""
+        if conn is None:
+            if not self.db_path or not self.db_path.exists():
+                return 0
+            with get_pool(self.db_path).connection() as conn:
+                return self.sync(conn, market_ids)
+
+        query = "SELECT market_id, recorded_at, yes_price, no_price FROM price_history"
+        params = []
+        if market_ids is not None:
+            params = [str(m) for m in market_ids]
+            query += f" WHERE market_id IN ({','.join('?' * len(params))})"
+        try:
+            rows = conn.execute(query + " ORDER BY market_id, recorded_at", params).fetchall()
+        except sqlite3.OperationalError:
+            return 0   # no price_history table yet
+
+        by_market = {}
+        for market_id, recorded_at, yes, no in rows:
+            by_market.setdefault(str(market_id), []).append((parse_timestamp(recorded_at), yes, no))
+        return sum(self.append(market_id, ticks) for market_id, ticks in by_market.items())
+
+    # --- Reading ------------------------------------------------------------
+
+    def _column(self, path: Path, dtype: str, n: int):
+        if HAS_NUMPY:
+            if n == 0:
+                return np.empty(0, dtype=dtype)
+            cached = self._maps.get(path)
+            if cached is None or cached[0] != n:
+                cached = (n, np.memmap(path, dtype=dtype, mode="r", shape=(n,)))
+                self._maps[path] = cached
+            return cached[1]
+        values = array.array(TYPECODES[dtype])
+        if n:
+            with open(path, "rb") as f:
+                values.frombytes(f.read(n * ITEMSIZE[dtype]))
+        return values
+
+    def window(self, market_id: str, start: float = None, end: float = None, resolution: str = RAW) -> dict:
+        """{column: values} for start <= ts <= end (epoch seconds, either end open).
+
+        With NumPy the values are read-only views into the memory-mapped
+        column files; without it they are array.array copies.
+        """
+        market_id = str(market_id)
+        columns = _columns(resolution)
+        if not self.length(market_id) and self.db_path:
+            self.sync(market_ids=[market_id])   # read through from price_history
+        n = self.length(market_id, resolution)
+        directory = self._dir(market_id, resolution)
+        ts = self._column(directory / "ts.bin", columns["ts"], n)
+        if HAS_NUMPY:
+            lo = 0 if start is None else int(np.searchsorted(ts, start, "left"))
+            hi = n if end is None else int(np.searchsorted(ts, end, "right"))
+        else:
+            lo = 0 if start is None else bisect.bisect_left(ts, start)
+            hi = n if end is None else bisect.bisect_right(ts, end)
+        window = {"ts": ts[lo:hi]}
+        for column, dtype in columns.items():
+            if column != "ts":
+                window[column] = self._column(directory / f"{column}.bin", dtype, n)[lo:hi]
+        return window
+
+    def latest(self, market_id: str):
+        """(ts, yes, no) of the newest stored tick, or None."""
+        n = self.length(market_id)
+        if not n:
+            return None
+        row = self._last_row(str(market_id), RAW, n)
+        return row["ts"], row["yes"], row["no"]
+
+    def stats(self) -> dict:
+        markets = self.markets()
+        files = [p for p in self.root.rglob("*.bin")]
+        return {
+            "markets": len(markets),
+            "ticks": sum(self.length(m) for m in markets),
+            "hourly_rows": sum(self.length(m, "1h") for m in markets),
+            "daily_rows": sum(self.length(m, "1d") for m in markets),
+            "bytes": sum(p.stat().st_size for p in files),
+        }
+
+
+_STORE = None
+
+
+def price_window(market_id: str, start: float = None, end: float = None, resolution: str = RAW) -> dict:
+    """Window from the shared store (dashboard / analysis entry point)."""
+    global _STORE
+    if _STORE is None:
+        _STORE = PriceStore()
+    return _STORE.window(market_id, start, end, resolution)
+
+
+def _bench(markets: int, ticks: int):
+    """SQLite row scan vs store window for the last week of every market."""
+    import random
+    import tempfile
+
+    rng = random.Random(5)
+    end = 1_780_000_000.0
+    step = 1800.0
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(str(Path(tmp) / "hedge.db"))
+        from price_refresh import PRICE_HISTORY_SCHEMA
+        conn.executescript(PRICE_HISTORY_SCHEMA)
+        rows = []
+        for m in range(markets):
+            price = rng.uniform(0.1, 0.9)
+            for k in range(ticks):
+                price = min(0.99, max(0.01, price + rng.gauss(0, 0.01)))
+                recorded_at = datetime.fromtimestamp(end - (ticks - k) * step, timezone.utc)
+                rows.append((str(m), round(price, 4), round(1 - price, 4), recorded_at.strftime("%Y-%m-%dT%H:%M:%SZ")))
+        with conn:
+            conn.executemany("INSERT INTO price_history (market_id, yes_price, no_price, recorded_at) "
+                             "VALUES (?, ?, ?, ?)", rows)
+
+        store = PriceStore(Path(tmp) / "store", db_path=None)
+        started = time.monotonic()
+        store.sync(conn)
+        synced = time.monotonic() - started
+
+        since = end - 7 * 86400
+        since_iso = datetime.fromtimestamp(since, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        started = time.monotonic()
+        sql_points = 0
+        for m in range(markets):
+            series = conn.execute("SELECT recorded_at, yes_price FROM price_history WHERE market_id = ? "
+                                  "AND recorded_at >= ? ORDER BY recorded_at", (str(m), since_iso)).fetchall()
+            sql_points += len([(parse_timestamp(t), p) for t, p in series])
+        sql_time = time.monotonic() - started
+
+        started = time.monotonic()
+        store_points = sum(len(store.window(str(m), since)["yes"]) for m in range(markets))
+        store_time = time.monotonic() - started
+        conn.close()
+
+        print(f"🦞 {markets} markets × {ticks:,} ticks: store import {synced:.2f}s, {store.stats()['bytes']:,} bytes")
+        print(f"   last 7 days, SQLite rows:  {sql_points:,} points in {sql_time * 1000:.1f}ms")
+        print(f"   last 7 days, store window: {store_points:,} points in {store_time * 1000:.1f}ms"
+              f"{'' if HAS_NUMPY else ' (no NumPy: copies)'}")
+
+
+def main():
+    """Import, inspect and benchmark the columnar price store."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Columnar price-history store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync_parser = sub.add_parser("sync", help="Import price_history rows not yet in the store")
+    sync_parser.add_argument("--db", default=str(HEDGE_DB))
+    show_parser = sub.add_parser("show", help="Print a market's price window")
+    show_parser.add_argument("market_id")
+    show_parser.add_argument("--days", type=float, default=7)
+    show_parser.add_argument("--resolution", choices=RESOLUTIONS, default="1h")
+    sub.add_parser("stats", help="Store size")
+    bench_parser = sub.add_parser("bench", help="Window loads: SQLite rows vs the store")
+    bench_parser.add_argument("--markets", type=int, default=50)
+    bench_parser.add_argument("--ticks", type=int, default=20000)
+    parser.add_argument("--root", default=str(PRICE_STORE_DIR))
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        sys.path.insert(0, str(Path(__file__).parent))
+        _bench(args.markets, args.ticks)
+        return
+
+    if args.command == "sync":
+        store = PriceStore(args.root, args.db)
+        started = time.monotonic()
+        added = store.sync()
+        print(f"✅ {added:,} ticks imported from {args.db} in {time.monotonic() - started:.2f}s")
+    elif args.command == "show":
+        store = PriceStore(args.root)
+        window = store.window(args.market_id, time.time() - args.days * 86400, resolution=args.resolution)
+        if not len(window["ts"]):
+            print(f"❌ No {args.resolution} prices for {args.market_id} in the last {args.days:g} days")
+            return
+        for i in range(len(window["ts"])):
+            stamp = datetime.fromtimestamp(window["ts"][i], timezone.utc).strftime("%Y-%m-%d %H:%M")
+            line = f"   {stamp}  YES {window['yes'][i]:.3f}  NO {window['no'][i]:.3f}"
+            if args.resolution != RAW:
+                line += f"  high {window['high'][i]:.3f}  low {window['low'][i]:.3f}  ({window['count'][i]} ticks)"
+            print(line)
+    else:
+        for key, value in PriceStore(args.root).stats().items():
+            print(f"📊 {key}: {value:,}")
+
+
+if __name__ == "__main__":
+    main()
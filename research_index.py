@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Local full-text research index (SQLite FTS5).
+
+Indexes our own material (configured paths such as BETTY_PROJECT_LOG.md,
+BETTY.md and scan logs, plus market descriptions from hedge_testing.db)
+together with research results the Researcher has collected. Documents are
+split into sections; queries are ranked with bm25 and return highlighted
+snippets. Re-indexing is incremental: files are skipped when mtime and size
+are unchanged and re-read only when their content hash changed.
+
+Configured in betty_config.json:
+
+    "researcher": {"index": {"paths": [...], "extensions": [...], "market_db": "..."}}
+
+Usage:
+    index = ResearchIndex()
+    index.refresh()
+    hits = index.search("hedge coverage tiers")
+
+    python3 research_index.py reindex
+    python3 research_index.py search "hedge coverage"
+    python3 research_index.py stats
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from research_pipeline import DEFAULT_TTL, RESEARCH_DIR
+
+BETTY_DIR = Path(__file__).parent
+BETTY_CONFIG = BETTY_DIR / "betty_config.json"
+RESEARCH_INDEX_DB = RESEARCH_DIR / "research_index.db"
+
+DEFAULT_EXTENSIONS = (".md", ".txt", ".log", ".json")
+MAX_FILE_BYTES = 5 * 1024 * 1024
+SECTION_CHARS = 1500         # documents are indexed in sections of about this size
+CHUNK_BITS = 16              # rowid = doc_id << CHUNK_BITS | section
+REFRESH_INTERVAL = 60        # seconds between automatic re-index passes
+SNIPPET_TOKENS = 16
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "of",
+    "on", "or", "the", "to", "what", "when", "where", "which", "who", "why", "with",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    title TEXT,
+    mtime REAL,
+    size INTEGER,
+    digest TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_kind ON documents(kind);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+    title, body, tokenize = 'porter unicode61'
+);
+"""
+
+SEARCH = f"""
+SELECT d.source, d.kind, d.title,
+       snippet(sections, 1, '«', '»', ' … ', {SNIPPET_TOKENS}),
+       bm25(sections, 4.0, 1.0) AS rank
+FROM sections
+JOIN documents d ON d.id = sections.rowid >> {CHUNK_BITS}
+WHERE sections MATCH ? AND (d.kind != 'web' OR d.indexed_at > ?)
+ORDER BY rank
+LIMIT ?
+"""
+
+
+class Hit(NamedTuple):
+    source: str
+    kind: str          # "file", "market" or "web"
+    title: str
+    snippet: str
+    score: float       # bm25, lower is better
+
+
+class IndexStats(NamedTuple):
+    scanned: int
+    updated: int
+    removed: int
+    elapsed: float
+
+
+def load_index_config(path=BETTY_CONFIG) -> dict:
+    """The researcher's "index" section of betty_config.json."""
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return config.get("specialists", {}).get("researcher", {}).get("index", {})
+
+
+def split_sections(text: str, size: int = SECTION_CHARS) -> list:
+    """Paragraph-aligned sections of roughly `size` characters."""
+    sections, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        if current and len(current) + len(paragraph) > size:
+            sections.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+        while len(current) > size * 2:
+            sections.append(current[:size])
+            current = current[size:]
+    if current.strip():
+        sections.append(current)
+    return sections[: (1 << CHUNK_BITS)]
+
+
+def document_digest(title: str, body: str) -> str:
+    return hashlib.blake2b(f"{title}\0{body}".encode(), digest_size=16).hexdigest()
+
+
+def fts_query(text: str, any_term: bool = False) -> str:
+    """Free text to an FTS5 query: quoted terms, AND-ed (or OR-ed)."""
+    terms = [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+    return (" OR " if any_term else " ").join(f'"{t}"' for t in dict.fromkeys(terms))
+
+
+class ResearchIndex:
+    """Incremental FTS5 index over local files, markets and collected research."""
+
+    def __init__(self, path=RESEARCH_INDEX_DB, config: dict = None):
+        self.path = Path(path)
+        self.config = load_index_config() if config is None else config
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+        self.refreshed_at = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Writing ------------------------------------------------------------
+
+    def _replace(self, source: str, kind: str, title: str, body: str, digest: str,
+                 mtime: float = None, size: int = None):
+        """(Re)write one document and its sections; caller holds the transaction."""
+        row = self.conn.execute("SELECT id FROM documents WHERE source = ?", (source,)).fetchone()
+        if row:
+            doc_id = row[0]
+            self._delete_sections(doc_id)
+            self.conn.execute(
+                "UPDATE documents SET kind = ?, title = ?, mtime = ?, size = ?, digest = ?, indexed_at = ? "
+                "WHERE id = ?", (kind, title, mtime, size, digest, time.time(), doc_id),
+            )
+        else:
+            doc_id = self.conn.execute(
+                "INSERT INTO documents (source, kind, title, mtime, size, digest, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (source, kind, title, mtime, size, digest, time.time()),
+            ).lastrowid
+        self.conn.executemany(
+            "INSERT INTO sections (rowid, title, body) VALUES (?, ?, ?)",
+            [((doc_id << CHUNK_BITS) | i, title, section) for i, section in enumerate(split_sections(body))],
+        )
+
+    def _delete_sections(self, doc_id: int):
+        self.conn.execute(
+            "DELETE FROM sections WHERE rowid BETWEEN ? AND ?",
+            (doc_id << CHUNK_BITS, ((doc_id + 1) << CHUNK_BITS) - 1),
+        )
+
+    def _remove(self, source: str):
+        row = self.conn.execute("SELECT id FROM documents WHERE source = ?", (source,)).fetchone()
+        if row:
+            self._delete_sections(row[0])
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+
+    def add_document(self, source: str, title: str, body: str, kind: str = "web") -> bool:
+        """Index one document (e.g. a research result); False when unchanged."""
+        digest = document_digest(title, body)
+        row = self.conn.execute("SELECT digest FROM documents WHERE source = ?", (source,)).fetchone()
+        with self.conn:
+            if row and row[0] == digest:
+                self.conn.execute("UPDATE documents SET indexed_at = ? WHERE source = ?", (time.time(), source))
+                return False
+            self._replace(source, kind, title, body, digest)
+        return True
+
+    def add_results(self, results) -> int:
+        """Index research_pipeline SearchResults by URL.
+
+        The query that found a result is indexed with it, so the same
+        sub-query is answered locally next time.
+        """
+        return sum(self.add_document(r.url, r.title, f"{r.snippet}\n\n{r.query}", kind="web") for r in results)
+
+    def _files(self) -> list:
+        extensions = tuple(self.config.get("extensions", DEFAULT_EXTENSIONS))
+        files = []
+        for entry in self.config.get("paths", []):
+            path = Path(os.path.expanduser(entry))
+            path = path if path.is_absolute() else BETTY_DIR / path
+            if path.is_dir():
+                files.extend(p for p in path.rglob("*") if p.is_file() and p.suffix in extensions)
+            elif path.is_file():
+                files.append(path)
+        return sorted(set(files))
+
+    def index_files(self) -> tuple:
+        """Re-index configured files by mtime/size, then content hash; returns (scanned, updated, removed)."""
+        max_bytes = self.config.get("max_file_bytes", MAX_FILE_BYTES)
+        known = {
+            source: (mtime, size, digest)
+            for source, mtime, size, digest in self.conn.execute(
+                "SELECT source, mtime, size, digest FROM documents WHERE kind = 'file'")
+        }
+        files = self._files()
+        updated = 0
+        with self.conn:
+            for path in files:
+                source = str(path)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                previous = known.get(source)
+                if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                    continue
+                try:
+                    with open(path, "rb") as f:
+                        # Logs grow at the end: keep the most recent part of large files
+                        if stat.st_size > max_bytes:
+                            f.seek(stat.st_size - max_bytes)
+                        data = f.read(max_bytes)
+                except OSError:
+                    continue
+                digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+                if previous and previous[2] == digest:
+                    self.conn.execute("UPDATE documents SET mtime = ?, size = ? WHERE source = ?",
+                                      (stat.st_mtime, stat.st_size, source))
+                    continue
+                self._replace(source, "file", path.name, data.decode("utf-8", errors="replace"),
+                              digest, stat.st_mtime, stat.st_size)
+                updated += 1
+
+            current = {str(p) for p in files}
+            removed = [source for source in known if source not in current]
+            for source in removed:
+                self._remove(source)
+        return len(files), updated, len(removed)
+
+    def index_markets(self) -> tuple:
+        """Index market questions/descriptions from the configured hedge DB; returns (scanned, updated, removed).
+
+        Markets no longer in the hedge DB are dropped from the index.
+        """
+        market_db = self.config.get("market_db")
+        if not market_db:
+            return 0, 0, 0
+        path = Path(os.path.expanduser(market_db))
+        path = path if path.is_absolute() else BETTY_DIR / path
+        if not path.exists():
+            return 0, 0, 0
+        source_db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = source_db.execute("SELECT id, question, description FROM markets").fetchall()
+        except sqlite3.OperationalError:
+            return 0, 0, 0  # no markets table in this database
+        finally:
+            source_db.close()
+
+        known = dict(self.conn.execute("SELECT source, digest FROM documents WHERE kind = 'market'"))
+        current = set()
+        updated = 0
+        with self.conn:
+            for market_id, question, description in rows:
+                source = f"market:{market_id}"
+                title, body = question or str(market_id), description or ""
+                current.add(source)
+                digest = document_digest(title, body)
+                if known.get(source) != digest:
+                    self._replace(source, "market", title, body, digest)
+                    updated += 1
+
+            removed = [source for source in known if source not in current]
+            for source in removed:
+                self._remove(source)
+        return len(rows), updated, len(removed)
+
+    def refresh(self, force: bool = False) -> IndexStats:
+        """Incremental re-index, at most every REFRESH_INTERVAL seconds unless forced."""
+        if not force and time.monotonic() - self.refreshed_at < REFRESH_INTERVAL:
+            return IndexStats(0, 0, 0, 0.0)
+        started = time.monotonic()
+        scanned, updated, removed = (
+            files + markets for files, markets in zip(self.index_files(), self.index_markets()))
+        self.refreshed_at = time.monotonic()
+        return IndexStats(scanned, updated, removed, self.refreshed_at - started)
+
+    # --- Reading ------------------------------------------------------------
+
+    def search(self, text: str, limit: int = 10, max_web_age: float = DEFAULT_TTL,
+               fallback: bool = True) -> list:
+        """bm25-ranked hits for free text; all terms first, any term as fallback."""
+        hits = []
+        for any_term in ((False, True) if fallback else (False,)):
+            query = fts_query(text, any_term)
+            if not query:
+                return []
+            hits = [Hit(*row) for row in self.conn.execute(SEARCH, (query, time.time() - max_web_age, limit))]
+            if hits:
+                break
+        return hits
+
+    def stats(self) -> dict:
+        kinds = dict(self.conn.execute("SELECT kind, COUNT(*) FROM documents GROUP BY kind"))
+        sections = self.conn.execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+        return {"documents": kinds, "sections": sections, "path": str(self.path)}
+
+    def close(self):
+        self.conn.close()
+
+
+def format_hits(hits: list) -> str:
+    """Numbered hits with their snippets."""
+    lines = []
+    for i, hit in enumerate(hits, 1):
+        source = hit.source if hit.kind != "file" else os.path.relpath(hit.source, BETTY_DIR)
+        lines.append(f"{i}. **{hit.title}** ({source})\n   {' '.join(hit.snippet.split())}")
+    return "\n".join(lines)
+
+
+def main():
+    """Re-index, search or show index stats from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local research index")
+    parser.add_argument("command", choices=["reindex", "search", "stats"])
+    parser.add_argument("query", nargs="*")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    with ResearchIndex() as index:
+        if args.command == "reindex":
+            stats = index.refresh(force=True)
+            print(f"✅ Scanned {stats.scanned} files and markets, updated {stats.updated}, removed {stats.removed} "
+                  f"in {stats.elapsed * 1000:.0f} ms")
+        elif args.command == "search":
+            started = time.perf_counter()
+            hits = index.search(" ".join(args.query), args.limit)
+            print(format_hits(hits) or "No matches")
+            print(f"\n({len(hits)} hits in {(time.perf_counter() - started) * 1000:.1f} ms)")
+        else:
+            print(json.dumps(index.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Concurrent research pipeline for the Researcher.
+
+A task is expanded into several sub-queries which run concurrently through
+a pluggable search backend, throttled by a token bucket. Backend responses
+are kept in a persistent TTL cache (research_cache.db), and results are
+deduplicated by normalized URL and by content hash. Weekly competitor
+research over the same targets is therefore served mostly from cache.
+
+Backends:
+  tool  - the OpenClaw web_search tool (when importable)
+  stub  - deterministic local stand-in for tests and offline runs
+
+Usage:
+    pipeline = ResearchPipeline(get_backend("stub"))
+    research = await pipeline.run(expand_queries("compare Kalshi and Manifold", "competitor"))
+
+    python3 research_pipeline.py "research prediction market fees" --backend stub
+    python3 research_pipeline.py stats|purge
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+try:
+    # Available when run from the OpenClaw context
+    from tools import web_search
+    HAS_WEB_SEARCH = True
+except ImportError:
+    HAS_WEB_SEARCH = False
+
+RESEARCH_DIR = Path(os.environ.get("BETTY_RESEARCH_DIR", Path(__file__).parent / "research"))
+RESEARCH_CACHE_DB = RESEARCH_DIR / "research_cache.db"
+
+DEFAULT_TTL = 7 * 24 * 3600     # weekly research reuses last week's answers
+RESULTS_PER_QUERY = 5
+MAX_CONCURRENT_QUERIES = 4
+RATE_PER_SECOND = 2.0           # backend requests per second
+RATE_BURST = 4
+
+# Words that say what to do rather than what to look for
+COMMAND_WORDS = re.compile(
+    r"\b(?:please|betty|search(?: for)?|find|look up|lookup|research|investigate|analy[sz]e|study|"
+    r"information about|info on|about|competitors?|competitive analysis|compare|web|google)\b",
+    re.IGNORECASE,
+)
+TARGET_SPLIT = re.compile(r"\s*(?:,|\band\b|\bvs\.?\b|\bversus\b)\s*", re.IGNORECASE)
+
+# Sub-query facets per research kind (mirrors what each handler reports)
+FACETS = {
+    "search": ("",),
+    "topic": ("", "overview", "latest news", "statistics data", "expert analysis"),
+    "competitor": ("market position", "features", "strengths weaknesses", "user reviews"),
+}
+
+TRACKING_PARAMS = ("utm_", "ref", "fbclid", "gclid")
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    backend TEXT NOT NULL,
+    query TEXT NOT NULL,
+    results TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (backend, query)
+);
+CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created_at);
+"""
+
+
+class SearchResult(NamedTuple):
+    url: str
+    title: str
+    snippet: str
+    query: str = ""
+
+
+class Research(NamedTuple):
+    queries: list
+    results: list        # deduplicated SearchResults in query order
+    cached: int          # queries answered from cache
+    fetched: int         # queries sent to the backend
+    duplicates: int
+    elapsed: float
+
+
+def subject_of(task: str) -> str:
+    """The thing to research, without the command words."""
+    return re.sub(r"\s+", " ", COMMAND_WORDS.sub(" ", task)).strip(" ?.!:-'\"")
+
+
+def expand_queries(task: str, kind: str = "search") -> list:
+    """Sub-queries for a task; competitor tasks get one set per named target."""
+    subject = subject_of(task)
+    if not subject:
+        return []
+    targets = [t for t in TARGET_SPLIT.split(subject) if t] if kind == "competitor" else [subject]
+    queries = [f"{target} {facet}".strip() for target in targets for facet in FACETS[kind]]
+    return list(dict.fromkeys(queries))
+
+
+def normalize_url(url: str) -> str:
+    """Scheme-, www-, fragment- and tracking-insensitive form of a URL."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower().removeprefix("www.")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith(TRACKING_PARAMS)
+    ))
+    return f"{host}{parts.path.rstrip('/')}" + (f"?{query}" if query else "")
+
+
+def content_hash(result: SearchResult) -> str:
+    text = re.sub(r"\W+", " ", f"{result.title} {result.snippet}".lower()).strip()
+    return hashlib.blake2b(text.encode(), digest_size=12).hexdigest()
+
+
+def dedupe(results: list) -> tuple:
+    """Drop repeats by normalized URL or identical content; returns (kept, dropped)."""
+    seen_urls, seen_content, kept = set(), set(), []
+    for result in results:
+        url, digest = normalize_url(result.url), content_hash(result)
+        if url in seen_urls or digest in seen_content:
+            continue
+        seen_urls.add(url)
+        seen_content.add(digest)
+        kept.append(result)
+    return kept, len(results) - len(kept)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`.
+
+    Callers reserve a token up front (the balance may go negative) and sleep
+    off their share of the debt, so no lock is needed and the bucket can be
+    shared across event loops.
+    """
+
+    def __init__(self, rate: float = RATE_PER_SECOND, capacity: float = RATE_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class ResponseCache:
+    """Persistent TTL cache of backend responses keyed by (backend, query)."""
+
+    def __init__(self, path=RESEARCH_CACHE_DB, ttl: float = DEFAULT_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(CACHE_SCHEMA)
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return re.sub(r"\s+", " ", query.lower()).strip()
+
+    def get(self, backend: str, query: str):
+        row = self.conn.execute(
+            "SELECT results FROM responses WHERE backend = ? AND query = ? AND created_at > ?",
+            (backend, self._key(query), time.time() - self.ttl),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [SearchResult(**r) for r in json.loads(row[0])]
+
+    def put(self, backend: str, query: str, results: list):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (backend, query, results, created_at) VALUES (?, ?, ?, ?)",
+                (backend, self._key(query), json.dumps([r._asdict() for r in results]), time.time()),
+            )
+
+    def purge(self) -> int:
+        """Delete expired responses."""
+        with self.conn:
+            return self.conn.execute(
+                "DELETE FROM responses WHERE created_at <= ?", (time.time() - self.ttl,)
+            ).rowcount
+
+    def stats(self) -> dict:
+        total, fresh = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(created_at > ?), 0) FROM responses", (time.time() - self.ttl,)
+        ).fetchone()
+        return {"entries": total, "fresh": fresh, "hits": self.hits, "misses": self.misses, "path": str(self.path)}
+
+    def close(self):
+        self.conn.close()
+
+
+class SearchBackend:
+    """Search backend interface."""
+
+    name = ""
+
+    async def search(self, query: str, limit: int = RESULTS_PER_QUERY) -> list:
+        raise NotImplementedError
+
+
+class ToolSearchBackend(SearchBackend):
+    """The OpenClaw web_search tool (sync or async)."""
+
+    name = "tool"
+
+    async def search(self, query: str, limit: int = RESULTS_PER_QUERY) -> list:
+        if not HAS_WEB_SEARCH:
+            raise RuntimeError("web_search tool not available in this context")
+        response = web_search(query=query, count=limit)
+        if inspect.isawaitable(response):
+            response = await response
+        if isinstance(response, dict):
+            response = response.get("results", [])
+        return [
+            SearchResult(
+                url=item.get("url", ""),
+                title=item.get("title", ""),
+                snippet=item.get("snippet") or item.get("description", ""),
+                query=query,
+            )
+            for item in response[:limit]
+        ]
+
+
+class StubSearchBackend(SearchBackend):
+    """Deterministic offline backend; overlapping URLs exercise deduplication."""
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = 0
+
+    async def search(self, query: str, limit: int = RESULTS_PER_QUERY) -> list:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        words = subject_of(query).split() or ["topic"]
+        results = []
+        for i in range(limit):
+            word = words[i % len(words)].lower()
+            # The first result per word is shared by every query mentioning it
+            slug = word if i < len(words) else f"{word}-{hashlib.md5(query.encode()).hexdigest()[:6]}-{i}"
+            results.append(SearchResult(
+                url=f"https://www.example.org/{slug}?utm_source=stub",
+                title=f"{word.title()} - reference {slug}",
+                snippet=f"Background on {word} ({slug}).",
+                query=query,
+            ))
+        return results
+
+
+BACKENDS = {"tool": ToolSearchBackend, "stub": StubSearchBackend}
+
+
+def get_backend(name: str = None) -> SearchBackend:
+    """Backend by name; defaults to BETTY_SEARCH_BACKEND, else the web_search tool."""
+    name = name or os.environ.get("BETTY_SEARCH_BACKEND", "tool")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown search backend: {name} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+def backend_available(backend: SearchBackend) -> bool:
+    return not isinstance(backend, ToolSearchBackend) or HAS_WEB_SEARCH
+
+
+class ResearchPipeline:
+    """Cache-first, rate-limited, concurrent sub-query runner."""
+
+    def __init__(self, backend: SearchBackend = None, cache: ResponseCache = None,
+                 bucket: TokenBucket = None, concurrency: int = MAX_CONCURRENT_QUERIES,
+                 per_query: int = RESULTS_PER_QUERY):
+        self.backend = backend or get_backend()
+        self.cache = cache or ResponseCache()
+        self.bucket = bucket or TokenBucket()
+        self.per_query = per_query
+        self.concurrency = concurrency
+
+    async def _query(self, query: str, semaphore: asyncio.Semaphore) -> tuple:
+        """(results, from_cache) for one sub-query."""
+        cached = self.cache.get(self.backend.name, query)
+        if cached is not None:
+            return cached, True
+        async with semaphore:
+            await self.bucket.acquire()
+            results = await self.backend.search(query, self.per_query)
+        self.cache.put(self.backend.name, query, results)
+        return results, False
+
+    async def run(self, queries: list) -> Research:
+        """Run all sub-queries concurrently; failed sub-queries are skipped."""
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        outcomes = await asyncio.gather(*(self._query(q, semaphore) for q in queries), return_exceptions=True)
+
+        merged, cached, fetched, errors = [], 0, 0, []
+        for query, outcome in zip(queries, outcomes):
+            if isinstance(outcome, Exception):
+                errors.append(f"{query}: {outcome}")
+                continue
+            results, from_cache = outcome
+            merged.extend(results)
+            cached += from_cache
+            fetched += not from_cache
+
+        if errors and not merged:
+            raise RuntimeError("; ".join(errors))
+        kept, duplicates = dedupe(merged)
+        return Research(queries, kept, cached, fetched, duplicates, time.monotonic() - started)
+
+    def close(self):
+        self.cache.close()
+
+
+def format_research(title: str, research: Research, max_results: int = 10) -> str:
+    """Results plus a one-line cache/dedupe summary."""
+    result = f"{title}\n\n"
+    result += (f"✅ {len(research.queries)} sub-queries ({research.cached} cached, {research.fetched} fetched), "
+               f"{len(research.results)} unique results, {research.duplicates} duplicates dropped "
+               f"in {research.elapsed:.2f}s\n\n")
+    for i, item in enumerate(research.results[:max_results], 1):
+        result += f"{i}. **{item.title}**\n   {item.url}\n   {item.snippet}\n"
+    if not research.results:
+        result += "No results found\n"
+    return result
+
+
+def main():
+    """Run a research task from the command line or manage the cache."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Concurrent research pipeline")
+    parser.add_argument("task", nargs="+", help="Research task, or 'stats' / 'purge'")
+    parser.add_argument("--kind", choices=list(FACETS), default="topic")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=None)
+    args = parser.parse_args()
+
+    command = " ".join(args.task)
+    if command in ("stats", "purge"):
+        cache = ResponseCache()
+        print(json.dumps(cache.stats(), indent=2) if command == "stats" else f"✅ Purged {cache.purge()} responses")
+        cache.close()
+        return
+
+    pipeline = ResearchPipeline(get_backend(args.backend))
+    try:
+        research = asyncio.run(pipeline.run(expand_queries(command, args.kind)))
+    finally:
+        pipeline.close()
+    print(format_research(f"🔍 Research: {subject_of(command)}", research))
+
+
+if __name__ == "__main__":
+    main()
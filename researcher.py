@@ -3,25 +3,26 @@
 Researcher Agent
 
 Specialized in web research, competitive analysis, and information gathering.
-Uses web_search tool for research tasks.
+Uses web_search tool for research tasks, through research_pipeline
+(concurrent sub-queries, rate limiting, cached and deduplicated results).
 """
 
 import asyncio
-import json
 import sys
+import time
 from pathlib import Path
 
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-# Try to import web_search (available via tool)
-# If not available, we'll note it in response
-try:
-    # This would be available when run from OpenClaw context
-    from tools import web_search
-    HAS_WEB_SEARCH = True
-except ImportError:
-    HAS_WEB_SEARCH = False
+from betty_router import get_router
+# web_search (the OpenClaw tool) is imported by research_pipeline when available
+from research_pipeline import (ResearchPipeline, backend_available, expand_queries, format_research,
+                               get_backend, subject_of)
+from research_index import ResearchIndex, format_hits
+
+MIN_LOCAL_HITS = 2     # a sub-query with this many index hits skips the backend
+LOCAL_HITS = 5
 
 
 class Researcher:
@@ -32,81 +33,91 @@ class Researcher:
         self.creature = "Research AI Agent"
         self.emoji = "🔍"
         self.description = "Specializes in web research, competitive analysis, and information gathering"
+        self._pipeline = None
+        self._index = None
 
     async def handle_task(self, task: str) -> str:
         """Handle a research task."""
-        task_lower = task.lower()
-
-        # Web search
-        if any(k in task_lower for k in ["search", "find", "look up", "information", "about"]):
-            return await self.web_search(task)
+        handlers = {
+            "web_search": self.web_search,
+            "competitive_analysis": self.competitive_analysis,
+            "research_topic": self.research_topic,
+        }
+        intent = get_router().intent_for("researcher", task)
 
-        # Competitive analysis
-        elif any(k in task_lower for k in ["competitor", "analysis", "competitive", "compare"]):
-            return await self.competitive_analysis(task)
-
-        # Research/Investigate
-        elif any(k in task_lower for k in ["research", "investigate", "analyze", "study"]):
-            return await self.research_topic(task)
+        if intent in handlers:
+            return await handlers[intent](task)
 
         else:
             return f"❓ I'm Researcher. I understand: '{task}'"
 
-    async def web_search(self, task: str) -> str:
-        """Perform web search."""
-        if not HAS_WEB_SEARCH:
+    @property
+    def pipeline(self) -> ResearchPipeline:
+        """Shared pipeline, so the rate limiter and cache span tasks."""
+        if self._pipeline is None:
+            self._pipeline = ResearchPipeline(get_backend())
+        return self._pipeline
+
+    @property
+    def index(self) -> ResearchIndex:
+        """Local full-text index, re-indexed incrementally before use."""
+        if self._index is None:
+            self._index = ResearchIndex()
+        self._index.refresh()
+        return self._index
+
+    async def _research(self, task: str, kind: str, title: str, empty: str) -> str:
+        """Answer from the local index; send only uncovered sub-queries to the backend."""
+        queries = expand_queries(task, kind)
+        if not queries:
+            return empty
+        title = title.format(subject=subject_of(task))
+
+        started = time.perf_counter()
+        index = self.index
+        local, missing = {}, []
+        for query in queries:
+            hits = index.search(query, LOCAL_HITS, fallback=False)
+            if len(hits) < MIN_LOCAL_HITS:
+                missing.append(query)
+            for hit in hits:
+                local.setdefault(hit.source, hit)
+        lookup_ms = (time.perf_counter() - started) * 1000
+        local_hits = sorted(local.values(), key=lambda hit: hit.score)[:LOCAL_HITS * 2]
+
+        result = ""
+        if local_hits:
+            result = f"📚 Local index: {len(local_hits)} matches in {lookup_ms:.1f} ms\n\n{format_hits(local_hits)}\n\n"
+        if not missing:
+            return f"{title}\n\n{result}"
+
+        if not backend_available(self.pipeline.backend):
+            if local_hits:
+                return f"{title}\n\n{result}(Web search not available for: {', '.join(missing)})"
             return f"🔍 Web search not available in this context\n\nTask: '{task}'\n\n(Tip: Use web_search tool directly or run from main Claw session)"
 
-        # Extract search query from task
-        # Expected: "search X" or "find X" or "look up X"
-        query = task.replace("search", "").replace("find", "").replace("look up", "").strip()
-
-        if not query:
-            return "❌ No search query found"
-
         try:
-            # Use web_search tool
-            # This would call the actual web_search function
-            result = f"🔍 Searching for: '{query}'\n\n"
-            result += "✅ Web search initiated\n\n"
-            result += "(Results would be returned via web_search tool)"
-
-            return result
+            research = await self.pipeline.run(missing)
         except Exception as e:
-            return f"❌ Search failed: {e}"
+            return f"{result}❌ Search failed: {e}"
+        index.add_results(research.results)
+        return (f"{title}\n\n{result}" if result else "") + format_research(
+            "🌐 Web results" if result else title, research)
+
+    async def web_search(self, task: str) -> str:
+        """Perform web search."""
+        # Expected: "search X" or "find X" or "look up X"
+        return await self._research(task, "search", "🔍 Search results: '{subject}'", "❌ No search query found")
 
     async def competitive_analysis(self, task: str) -> str:
         """Perform competitive analysis."""
-        # Extract competitor/topic from task
         # Expected: "analyze X competitor" or "compare X and Y"
-        import re
-        match = re.search(r'(competitor|analyze|compare)\s+(\w+)', task, re.IGNORECASE)
-
-        if match:
-            target = match.group(2)
-            result = f"🔍 Competitive analysis: {target}\n\n"
-            result += f"✅ Analyzing {target}\n\n"
-            result += f"Would gather:\n"
-            result += f"  - Market position\n"
-            result += f"  - Key features\n"
-            result += f"  - Strengths/weaknesses\n"
-            result += f"  - User reviews\n"
-        else:
-            result = "🔍 Competitive analysis (no target specified)"
-
-        return result
+        return await self._research(task, "competitor", "🔍 Competitive analysis: {subject}",
+                                    "🔍 Competitive analysis (no target specified)")
 
     async def research_topic(self, task: str) -> str:
         """Research a topic in depth."""
-        result = f"🔍 Researching: '{task}'\n\n"
-        result += "✅ Research initiated\n\n"
-        result += "Would gather:\n"
-        result += "  - Background information\n"
-        result += "  - Key data points\n"
-        result += "  - Recent developments\n"
-        result += "  - Expert opinions\n"
-
-        return result
+        return await self._research(task, "topic", "🔍 Research: '{subject}'", "❌ No research topic found")
 
     async def main_loop(self):
         """Main loop for researcher."""
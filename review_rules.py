@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Pluggable code review rules run in a single AST pass.
+
+Every rule subscribes to the node types it cares about; RuleEngine walks
+each module once and dispatches every node only to the rules subscribed
+to its type, so adding a rule never adds a traversal. Time spent in each
+rule is counted, so slow rules are easy to spot.
+
+Adding a rule:
+
+    @register
+    class PrintCall(Rule):
+        code = "print-call"
+        severity, category = "P3", "quality"
+        node_types = (ast.Call,)
+        hint = "Use logging instead of print"
+
+        def visit(self, node, ctx):
+            if isinstance(node.func, ast.Name) and node.func.id == "print":
+                ctx.report(self, node, "print() call")
+"""
+
+import ast
+import time
+from typing import NamedTuple
+
+MAX_FUNCTION_LINES = 80
+DOCSTRING_MIN_LINES = 15    # shorter top-level functions need no docstring
+
+RULES = {}
+
+
+class Issue(NamedTuple):
+    line: int
+    severity: str      # P1 (bug) .. P3 (style)
+    category: str      # "bug" or "quality"
+    code: str
+    message: str
+
+
+def register(cls):
+    """Class decorator adding a rule to the registry."""
+    RULES[cls.code] = cls
+    return cls
+
+
+class Rule:
+    """Base rule: subscribe with node_types, report from visit()/finish()."""
+
+    code = ""
+    severity = "P3"
+    category = "quality"
+    node_types = ()
+    hint = ""
+
+    def start(self, ctx):
+        """Called before each file."""
+
+    def visit(self, node, ctx):
+        """Called for every node of a subscribed type."""
+
+    def finish(self, ctx):
+        """Called after the walk, for rules that need the whole file."""
+
+
+class FileContext:
+    """Per-file state shared by all rules during the walk."""
+
+    def __init__(self, path: str, tree: ast.AST):
+        self.path = path
+        self.tree = tree
+        self.is_package_init = path.endswith("__init__.py")
+        self.scopes = []       # enclosing FunctionDef / AsyncFunctionDef / ClassDef nodes
+        self.issues = []
+
+    @property
+    def depth(self) -> int:
+        return len(self.scopes)
+
+    def enclosing_function(self):
+        for scope in reversed(self.scopes):
+            if isinstance(scope, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                return scope
+        return None
+
+    def in_async(self) -> bool:
+        return isinstance(self.enclosing_function(), ast.AsyncFunctionDef)
+
+    def report(self, rule: Rule, node, message: str, line: int = None):
+        line = line if line is not None else getattr(node, "lineno", 0)
+        self.issues.append(Issue(line, rule.severity, rule.category, rule.code, message))
+
+
+SCOPE_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class RuleEngine:
+    """Dispatches one AST walk per file to all subscribed rules."""
+
+    def __init__(self, codes=None):
+        self.rules = [RULES[code]() for code in (codes or RULES)]
+        self.dispatch = {}
+        for rule in self.rules:
+            for node_type in rule.node_types:
+                self.dispatch.setdefault(node_type, []).append(rule)
+        self.timings = {rule.code: [0, 0.0] for rule in self.rules}   # code -> [calls, seconds]
+        self.counts = {"functions": 0, "classes": 0}
+
+    def _call(self, rule, method, *args):
+        started = time.perf_counter()
+        method(*args)
+        timing = self.timings[rule.code]
+        timing[0] += 1
+        timing[1] += time.perf_counter() - started
+
+    def run(self, tree: ast.AST, path: str) -> tuple:
+        """Walk tree once; returns (issues, {"functions": n, "classes": n})."""
+        ctx = FileContext(path, tree)
+        counts = {"functions": 0, "classes": 0}
+        for rule in self.rules:
+            self._call(rule, rule.start, ctx)
+
+        dispatch = self.dispatch
+        stack = [(tree, False)]
+        while stack:
+            node, leaving = stack.pop()
+            if leaving:
+                ctx.scopes.pop()
+                continue
+
+            for rule in dispatch.get(type(node), ()):
+                self._call(rule, rule.visit, node, ctx)
+
+            if isinstance(node, SCOPE_TYPES):
+                counts["classes" if isinstance(node, ast.ClassDef) else "functions"] += 1
+                ctx.scopes.append(node)
+                stack.append((node, True))
+            # Reversed so children are visited in source order
+            stack.extend((child, False) for child in reversed(list(ast.iter_child_nodes(node))))
+
+        for rule in self.rules:
+            self._call(rule, rule.finish, ctx)
+        for key, value in counts.items():
+            self.counts[key] += value
+        return ctx.issues, counts
+
+    def timing_table(self) -> list:
+        """[(code, calls, seconds)] slowest first."""
+        return sorted(((code, calls, secs) for code, (calls, secs) in self.timings.items()),
+                      key=lambda row: -row[2])
+
+
+def _dotted(node) -> str:
+    """'subprocess.run' for Attribute/Name chains, '' otherwise."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return ""
+
+
+def _length(node) -> int:
+    return (node.end_lineno or node.lineno) - node.lineno + 1
+
+
+# --- Bugs -------------------------------------------------------------------
+
+@register
+class BareExcept(Rule):
+    code = "bare-except"
+    severity, category = "P2", "bug"
+    node_types = (ast.ExceptHandler,)
+    hint = "Catch specific exceptions (or Exception) instead of everything"
+
+    def visit(self, node, ctx):
+        if node.type is None:
+            ctx.report(self, node, "Bare 'except:' also catches KeyboardInterrupt and SystemExit")
+
+
+@register
+class MutableDefault(Rule):
+    code = "mutable-default"
+    severity, category = "P2", "bug"
+    node_types = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+    hint = "Default to None and create the list/dict inside the function"
+
+    def visit(self, node, ctx):
+        name = getattr(node, "name", "lambda")
+        for default in node.args.defaults + [d for d in node.args.kw_defaults if d]:
+            if isinstance(default, (ast.List, ast.Dict, ast.Set)):
+                ctx.report(self, default, f"Mutable default argument in '{name}'")
+
+
+BLOCKING_CALLS = {
+    "subprocess.run", "subprocess.call", "subprocess.check_call", "subprocess.check_output",
+    "time.sleep", "os.system", "requests.get", "requests.post", "requests.request",
+    "urllib.request.urlopen", "urlopen",
+}
+
+
+@register
+class BlockingCallInAsync(Rule):
+    code = "blocking-in-async"
+    severity, category = "P2", "bug"
+    node_types = (ast.Call,)
+    hint = "Use asyncio.create_subprocess_exec / asyncio.sleep, or run it with asyncio.to_thread"
+
+    def visit(self, node, ctx):
+        name = _dotted(node.func)
+        if name in BLOCKING_CALLS and ctx.in_async():
+            function = ctx.enclosing_function().name
+            ctx.report(self, node, f"Blocking {name}() inside async def '{function}' stalls the event loop")
+
+
+@register
+class SubprocessWithoutTimeout(Rule):
+    code = "subprocess-no-timeout"
+    severity, category = "P2", "bug"
+    node_types = (ast.Call,)
+    hint = "Pass timeout= so a hung child cannot hang the caller"
+
+    def visit(self, node, ctx):
+        name = _dotted(node.func)
+        if name in ("subprocess.run", "subprocess.check_output", "subprocess.check_call", "subprocess.call"):
+            if not any(kw.arg == "timeout" for kw in node.keywords):
+                ctx.report(self, node, f"{name}() without a timeout")
+
+
+STREAM_NAMES = ("stdout", "stderr", "stdin", "response", "resp", "sock", "socket", "pipe", "proc", "conn")
+
+
+@register
+class UnboundedRead(Rule):
+    code = "unbounded-read"
+    severity, category = "P2", "bug"
+    node_types = (ast.Call,)
+    hint = "Read in chunks or lines (or pass a size) instead of reading a whole stream"
+
+    def visit(self, node, ctx):
+        func = node.func
+        if not isinstance(func, ast.Attribute) or node.args or node.keywords:
+            return
+        if func.attr == "readlines":
+            ctx.report(self, node, "readlines() loads the whole stream into memory")
+        elif func.attr == "read":
+            receiver = _dotted(func.value).rsplit(".", 1)[-1].lower()
+            if any(stream in receiver for stream in STREAM_NAMES):
+                ctx.report(self, node, f"Unbounded {_dotted(func.value)}.read() of a stream")
+
+
+@register
+class ShellTrue(Rule):
+    code = "shell-true"
+    severity, category = "P2", "bug"
+    node_types = (ast.Call,)
+    hint = "Pass an argument list instead of shell=True"
+
+    def visit(self, node, ctx):
+        if _dotted(node.func).startswith("subprocess."):
+            for kw in node.keywords:
+                if kw.arg == "shell" and isinstance(kw.value, ast.Constant) and kw.value.value is True:
+                    ctx.report(self, node, "subprocess call with shell=True")
+
+
+# --- Quality ----------------------------------------------------------------
+
+@register
+class SwallowedException(Rule):
+    code = "swallowed-exception"
+    severity, category = "P3", "quality"
+    node_types = (ast.ExceptHandler,)
+    hint = "Log or comment why the exception can be ignored"
+
+    def visit(self, node, ctx):
+        if node.type is not None and len(node.body) == 1 and isinstance(node.body[0], ast.Pass):
+            ctx.report(self, node, "Exception silently ignored")
+
+
+@register
+class NoneComparison(Rule):
+    code = "none-comparison"
+    severity, category = "P3", "quality"
+    node_types = (ast.Compare,)
+    hint = "Compare with 'is None' / 'is not None'"
+
+    def visit(self, node, ctx):
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.Eq, ast.NotEq)) and isinstance(right, ast.Constant) and right.value is None:
+                ctx.report(self, node, "Use 'is None' / 'is not None'")
+
+
+@register
+class LongFunction(Rule):
+    code = "long-function"
+    severity, category = "P3", "quality"
+    node_types = (ast.FunctionDef, ast.AsyncFunctionDef)
+    hint = "Break long functions into smaller helpers"
+
+    def visit(self, node, ctx):
+        length = _length(node)
+        if length > MAX_FUNCTION_LINES:
+            ctx.report(self, node, f"Function '{node.name}' is {length} lines long")
+
+
+@register
+class MissingDocstring(Rule):
+    code = "missing-docstring"
+    severity, category = "P3", "quality"
+    node_types = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    hint = "Add docstrings to public top-level functions and classes"
+
+    def visit(self, node, ctx):
+        if (ctx.depth == 0 and not node.name.startswith("_") and _length(node) >= DOCSTRING_MIN_LINES
+                and ast.get_docstring(node) is None):
+            kind = "Class" if isinstance(node, ast.ClassDef) else "Function"
+            ctx.report(self, node, f"{kind} '{node.name}' has no docstring")
+
+
+@register
+class UnusedImport(Rule):
+    code = "unused-import"
+    severity, category = "P3", "quality"
+    node_types = (ast.Import, ast.ImportFrom, ast.Name)
+    hint = "Remove unused imports"
+
+    def start(self, ctx):
+        self.imported = {}     # name -> line
+        self.used = set()
+
+    def visit(self, node, ctx):
+        if isinstance(node, ast.Name):
+            self.used.add(node.id)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                self.imported.setdefault((alias.asname or alias.name).split(".")[0], node.lineno)
+        else:
+            for alias in node.names:
+                if alias.name != "*":
+                    self.imported.setdefault(alias.asname or alias.name, node.lineno)
+
+    def finish(self, ctx):
+        # Package __init__ modules import names to re-export them
+        if ctx.is_package_init:
+            return
+        exported = set()
+        for node in ctx.tree.body:
+            if isinstance(node, ast.Assign) and any(
+                    isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+                exported = {elt.value for elt in getattr(node.value, "elts", []) if isinstance(elt, ast.Constant)}
+        for name, line in self.imported.items():
+            if name not in self.used and name not in exported:
+                ctx.report(self, None, f"'{name}' imported but unused", line=line)
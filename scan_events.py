@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Structured hedge scan events.
+
+Scans append one JSON object per line to EVENTS_FILE as things happen, so
+consumers (hedge_notifier.py, dashboards, ad-hoc `tail -f`) react within
+seconds instead of grepping scan stdout after the process exits:
+
+  {"event": "scan_started", "scan_id": ..., "ts": ..., "command": [...], ...}
+  {"event": "market_evaluated", "scan_id": ..., "markets_scanned": 12, "markets_total": 50}
+  {"event": "hedge_logged", "scan_id": ..., "hedge_id": 812, "tier": 1, "coverage": 0.93, ...}
+  {"event": "scan_finished", "scan_id": ..., "returncode": 0, "hedges_logged": 3, ...}
+
+hedge_logged events carry the hedge's row from hedge_testing.db, read
+through hedge_db_pool after every evaluated market and whenever the scanner
+reports a new hedge count. If the database can't be read, the event carries
+only the scanner's count.
+
+Appends are single write() calls on an O_APPEND descriptor under an flock,
+so concurrent scans never interleave lines. The file rotates to
+EVENTS_FILE.1 past MAX_EVENTS_BYTES; EventTail follows across rotation.
+
+Usage:
+    events = ScanEventLog()
+    run_scan(scan_command(50), events=events)        # hedge_scan_stream
+
+    tail = EventTail()
+    for record in tail.read(): ...                   # new events since the last read
+
+    python3 scan_events.py tail [--follow]
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+
+from hedge_db_pool import get_pool
+
+POLYCLAW_DIR = Path(__file__).parent.parent / "skills" / "polyclaw"
+HEDGE_DB = POLYCLAW_DIR / "db" / "hedge_testing.db"
+
+EVENTS_FILE = Path(os.environ.get("HEDGE_EVENTS_FILE", "/tmp/hedge_scan_events.jsonl"))
+MAX_EVENTS_BYTES = 16 * 1024 * 1024   # rotate to EVENTS_FILE.1 past this
+POLL_INTERVAL = 0.5                   # seconds between reads when following
+
+SCAN_STARTED = "scan_started"
+MARKET_EVALUATED = "market_evaluated"
+HEDGE_LOGGED = "hedge_logged"
+SCAN_FINISHED = "scan_finished"
+
+HEDGE_COLUMNS = ("id", "tier", "coverage", "total_real_cost", "target_market_id", "cover_market_id")
+OPTIONAL_HEDGE_COLUMNS = ("target_question", "cover_question")
+
+
+def rotated_path(path: Path) -> Path:
+    return path.with_name(path.name + ".1")
+
+
+def emit(event: str, path: Path = EVENTS_FILE, **fields) -> dict:
+    """Append one event line; returns the record written."""
+    record = {"event": event, "ts": round(time.time(), 3), **fields}
+    line = (json.dumps(record, default=str) + "\n").encode()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                continue          # rotated away while we waited for the lock
+            size = os.fstat(fd)
+            if (size.st_ino, size.st_dev) != (current.st_ino, current.st_dev):
+                continue          # ditto: reopen the new file
+            if size.st_size and size.st_size + len(line) > MAX_EVENTS_BYTES:
+                os.replace(path, rotated_path(path))
+                continue
+            os.write(fd, line)
+            return record
+        finally:
+            os.close(fd)
+
+
+class ScanEventLog:
+    """Events for one scan, tagged with its scan_id."""
+
+    def __init__(self, path: Path = EVENTS_FILE, db_path=HEDGE_DB, scan_id: str = None):
+        self.path = Path(path)
+        self.db_path = Path(db_path) if db_path else None
+        self.scan_id = scan_id or uuid.uuid4().hex[:12]
+        self.markets_scanned = 0
+        self.hedges_logged = 0
+        self._last_hedge_id = None    # newest hedges.id before this scan's hedges
+
+    def emit(self, event: str, **fields) -> dict:
+        return emit(event, self.path, scan_id=self.scan_id, **fields)
+
+    def _new_hedges(self) -> list:
+        """Rows logged since the last look, or None when the hedge DB can't be read."""
+        if not self.db_path or not self.db_path.exists():
+            return None
+        db = get_pool(self.db_path)
+        try:
+            if self._last_hedge_id is None:
+                self._last_hedge_id = db.read_one("SELECT COALESCE(MAX(id), 0) FROM hedges")[0]
+                return []
+            columns = {row[1] for row in db.read("PRAGMA table_info(hedges)")}
+            names = HEDGE_COLUMNS + tuple(c for c in OPTIONAL_HEDGE_COLUMNS if c in columns)
+            rows = db.read(f"SELECT {', '.join(names)} FROM hedges WHERE id > ? ORDER BY id",
+                           (self._last_hedge_id,))
+        except sqlite3.OperationalError:
+            return None   # no hedges table yet
+        if rows:
+            self._last_hedge_id = rows[-1][0]
+        return [dict(zip(("hedge_id",) + names[1:], row)) for row in rows]
+
+    def _sweep(self):
+        """Emit hedge_logged for rows committed since the last sweep; None if the DB can't be read."""
+        hedges = self._new_hedges()
+        for hedge in hedges or ():
+            self.emit(HEDGE_LOGGED, **hedge)
+        return hedges
+
+    def started(self, **fields):
+        self._new_hedges()            # remember where this scan's hedges start
+        self.emit(SCAN_STARTED, **fields)
+
+    def market_evaluated(self, markets_scanned: int, markets_total: int = 0):
+        if markets_scanned > self.markets_scanned:
+            self.markets_scanned = markets_scanned
+            self.emit(MARKET_EVALUATED, markets_scanned=markets_scanned, markets_total=markets_total)
+            self._sweep()             # one primary-key lookup per market
+
+    def hedge_count(self, hedges_logged: int):
+        """The scanner reported hedges_logged so far; emit hedge_logged for each new one."""
+        if hedges_logged <= self.hedges_logged:
+            return
+        if self._sweep() is None:
+            self.emit(HEDGE_LOGGED, hedge_id=None, count=hedges_logged - self.hedges_logged)
+        self.hedges_logged = hedges_logged
+
+    def finished(self, **fields):
+        self._sweep()                 # rows committed after the last progress line
+        fields.setdefault("hedges_logged", self.hedges_logged)
+        self.emit(SCAN_FINISHED, **fields)
+
+
+class EventTail:
+    """Incremental reader of the events file that survives rotation and truncation."""
+
+    def __init__(self, path: Path = EVENTS_FILE, offset: int = 0, inode: int = None):
+        self.path = Path(path)
+        self.offset = offset
+        self.inode = inode
+
+    @property
+    def position(self) -> dict:
+        return {"inode": self.inode, "offset": self.offset}
+
+    def _read_from(self, path: Path, offset: int):
+        """Complete lines after offset; returns (records, new offset)."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1     # leave a half-written last line for the next read
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records, offset + end
+
+    def read(self) -> list:
+        """Events appended since the last call."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        records = []
+        if self.inode is not None and stat.st_ino != self.inode:
+            # Rotated: finish the old file first if it's still around
+            old = rotated_path(self.path)
+            try:
+                if os.stat(old).st_ino == self.inode:
+                    records, _ = self._read_from(old, self.offset)
+            except FileNotFoundError:
+                pass
+            self.offset = 0
+        elif stat.st_size < self.offset:
+            self.offset = 0             # truncated
+        self.inode = stat.st_ino
+        if stat.st_size > self.offset:
+            new, self.offset = self._read_from(self.path, self.offset)
+            records += new
+        return records
+
+    def skip_to_end(self):
+        """Start from the current end of the file (ignore history)."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        self.inode, self.offset = stat.st_ino, stat.st_size
+
+
+def main():
+    """Print scan events, optionally following new ones."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Structured hedge scan events")
+    parser.add_argument("command", choices=["tail"])
+    parser.add_argument("--follow", action="store_true", help="Keep printing new events")
+    parser.add_argument("--lines", type=int, default=20, help="Recent events to show first")
+    parser.add_argument("--file", default=str(EVENTS_FILE))
+    args = parser.parse_args()
+
+    tail = EventTail(Path(args.file))
+    recent = tail.read()
+    for record in recent[-args.lines:] if args.lines else []:
+        print(json.dumps(record))
+    if not args.follow:
+        return
+    try:
+        while True:
+            for record in tail.read():
+                print(json.dumps(record), flush=True)
+            time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Specialist Worker Pool
+
+Keeps long-lived specialist workers (specialist_worker.py) warm and hands
+them tasks over a JSON-lines pipe. Each specialist gets its own pool with a
+configurable size; dead workers are restarted and busy ones are recycled
+after max_tasks so leaks can't build up.
+
+Pool settings live under specialists.<label>.pool in betty_config.json:
+  {"size": 2, "max_tasks": 200, "timeout": 60}
+"""
+
+import atexit
+import json
+import os
+import queue
+import select
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from betty_tracing import RECORDER, current_trace_id, span
+
+WORKER_SCRIPT = Path(__file__).parent / "specialist_worker.py"
+
+DEFAULT_POOL = {"size": 1, "max_tasks": 100, "timeout": 60}
+START_TIMEOUT = 30
+PING_TIMEOUT = 5
+
+
+class WorkerError(Exception):
+    """A worker died, timed out or broke protocol."""
+
+
+class SpecialistWorker:
+    """One long-lived specialist process."""
+
+    def __init__(self, label: str, script=WORKER_SCRIPT):
+        self.label = label
+        self.script = script
+        self.tasks_done = 0
+        self.process = None
+        self._buffer = b""
+        self._next_id = 0
+
+    def start(self, timeout: float = START_TIMEOUT):
+        """Spawn the worker and wait for its ready line."""
+        self.process = subprocess.Popen(
+            [sys.executable, str(self.script), "--specialist", self.label],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        ready = self._read_message(timeout)
+        if ready.get("type") != "ready":
+            self.stop()
+            raise WorkerError(f"{self.label} worker sent {ready!r} instead of ready")
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def request(self, message: dict, timeout: float) -> dict:
+        """Send one request and wait for the matching reply."""
+        if not self.alive():
+            raise WorkerError(f"{self.label} worker is not running")
+
+        self._next_id += 1
+        message = dict(message, id=self._next_id)
+        try:
+            self.process.stdin.write((json.dumps(message) + "\n").encode())
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"{self.label} worker pipe closed: {e}")
+
+        reply = self._read_message(timeout)
+        if reply.get("id") != self._next_id:
+            raise WorkerError(f"{self.label} worker reply out of sequence: {reply!r}")
+        return reply
+
+    def ping(self, timeout: float = PING_TIMEOUT) -> bool:
+        """Health check: is the worker alive and answering?"""
+        try:
+            return self.request({"type": "ping"}, timeout).get("ok", False)
+        except WorkerError:
+            return False
+
+    def _read_message(self, timeout: float) -> dict:
+        """Read one JSON line from the worker within the timeout."""
+        deadline = time.monotonic() + timeout
+        fd = self.process.stdout.fileno()
+
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerError(f"{self.label} worker timed out after {timeout}s")
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise WorkerError(f"{self.label} worker exited (code {self.process.poll()})")
+            self._buffer += chunk
+
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise WorkerError(f"{self.label} worker sent malformed line: {line[:200]!r}")
+
+    def stop(self, timeout: float = 5):
+        """Close stdin so the worker exits; kill it if it lingers."""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+
+class SpecialistPool:
+    """Pool of warm workers for one specialist."""
+
+    def __init__(self, label: str, size: int = 1, max_tasks: int = 100, timeout: float = 60,
+                 script=WORKER_SCRIPT):
+        self.label = label
+        self.script = script
+        self.size = max(1, size)
+        self.max_tasks = max_tasks
+        self.timeout = timeout
+        self.restarts = 0
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _spawn(self) -> SpecialistWorker:
+        worker = SpecialistWorker(self.label, self.script)
+        with span("spawn_worker", specialist=self.label):
+            worker.start()
+        return worker
+
+    def _acquire(self, timeout: float) -> SpecialistWorker:
+        """Take a live idle worker, growing the pool up to its size."""
+        while True:
+            worker = self._take(timeout)
+            if worker.alive():
+                return worker
+            # Crashed while idle: restart it
+            self.restarts += 1
+            self._replace(worker)
+
+    def _take(self, timeout: float) -> SpecialistWorker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise WorkerError(f"{self.label} pool is closed")
+            grow = len(self._workers) < self.size
+            if grow:
+                self._workers.append(None)  # reserve the slot
+        if grow:
+            try:
+                worker = self._spawn()
+            except Exception:
+                with self._lock:
+                    if None in self._workers:
+                        self._workers.remove(None)
+                raise
+            with self._lock:
+                closed = self._closed
+                if not closed:
+                    self._workers[self._workers.index(None)] = worker
+            if closed:
+                # close() ran while we were spawning: don't leak the new process
+                worker.stop()
+                raise WorkerError(f"{self.label} pool is closed")
+            return worker
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerError(f"No idle {self.label} worker within {timeout}s")
+
+    def _replace(self, worker: SpecialistWorker) -> None:
+        """Retire a worker; a fresh one is spawned on next demand."""
+        worker.stop()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def _release(self, worker: SpecialistWorker) -> None:
+        if not worker.alive():
+            self.restarts += 1
+            self._replace(worker)
+        elif worker.tasks_done >= self.max_tasks:
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+
+    def submit(self, task: str, timeout: float = None) -> str:
+        """Run a task on a warm worker and return its result."""
+        timeout = timeout or self.timeout
+        worker = self._acquire(timeout)
+        try:
+            # The worker times handle_task under our trace and sends the spans back
+            reply = worker.request({"type": "task", "task": task, "trace_id": current_trace_id()}, timeout)
+            RECORDER.merge(reply.get("spans"))
+        except WorkerError:
+            # Stream is out of sync or the process is gone: never reuse it
+            worker.stop()
+            raise
+        finally:
+            worker.tasks_done += 1
+            self._release(worker)
+
+        if not reply.get("ok"):
+            raise WorkerError(reply.get("error", "unknown worker error"))
+        return reply.get("result") or ""
+
+    def health_check(self) -> dict:
+        """Ping idle workers and retire the ones that don't answer."""
+        healthy, retired = 0, 0
+        checked = []
+        while True:
+            try:
+                checked.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in checked:
+            if worker.ping():
+                healthy += 1
+                self._idle.put(worker)
+            else:
+                retired += 1
+                self.restarts += 1
+                self._replace(worker)
+        return {
+            "workers": len(self._workers),
+            "healthy": healthy,
+            "retired": retired,
+            "restarts": self.restarts,
+        }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            workers, self._workers = [w for w in self._workers if w], []
+        for worker in workers:
+            worker.stop()
+
+
+class WorkerPoolManager:
+    """Specialist pools keyed by label, created on first use."""
+
+    def __init__(self, specialists: dict, script=WORKER_SCRIPT):
+        self.specialists = specialists
+        self.script = script    # stand-in workers (betty_bench.py) speak the same protocol
+        self.pools = {}
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._stop = threading.Event()
+        atexit.register(self.close)
+
+    def _settings(self, label: str) -> dict:
+        return dict(DEFAULT_POOL, **self.specialists.get(label, {}).get("pool", {}))
+
+    def pool(self, label: str) -> SpecialistPool:
+        with self._lock:
+            if label not in self.pools:
+                self.pools[label] = SpecialistPool(label, script=self.script, **self._settings(label))
+            return self.pools[label]
+
+    def reload(self, specialists: dict) -> list:
+        """Switch to a new config; pools whose settings changed are rebuilt on next use."""
+        with self._lock:
+            self.specialists = specialists
+            stale = [
+                label for label, pool in self.pools.items()
+                if label not in specialists
+                or self._settings(label) != {"size": pool.size, "max_tasks": pool.max_tasks, "timeout": pool.timeout}
+            ]
+            retired = [self.pools.pop(label) for label in stale]
+        for pool in retired:
+            pool.close()
+        return stale
+
+    def submit(self, label: str, task: str, timeout: float = None) -> str:
+        """Run a task on the given specialist's pool."""
+        return self.pool(label).submit(task, timeout)
+
+    def health_check(self) -> dict:
+        return {label: pool.health_check() for label, pool in list(self.pools.items())}
+
+    def start_health_checks(self, interval: float = 30):
+        """Ping idle workers in the background every interval seconds."""
+        if self._health_thread:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.health_check()
+
+        self._health_thread = threading.Thread(target=loop, name="pool-health", daemon=True)
+        self._health_thread.start()
+
+    def close(self):
+        self._stop.set()
+        for pool in list(self.pools.values()):
+            pool.close()
+        self.pools = {}
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Specialist Worker
+
+Long-lived specialist process driven by Betty's worker pool.
+Reads one JSON request per line on stdin and answers with one JSON line on
+stdout, so a specialist pays interpreter start-up and imports once.
+
+Protocol:
+  → {"id": 1, "type": "task", "task": "research X", "trace_id": "..."}
+  ← {"id": 1, "ok": true, "result": "...", "spans": [...]}
+  → {"id": 2, "type": "ping"}
+  ← {"id": 2, "ok": true, "result": "pong", "tasks": 1}
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from betty_tracing import collect_spans, span, trace
+
+# Specialist label -> (module, class)
+SPECIALISTS = {
+    "hedge-specialist": ("hedge_specialist", "HedgeSpecialist"),
+    "researcher": ("researcher", "Researcher"),
+    "code-reviewer": ("code_reviewer", "CodeReviewer"),
+}
+
+
+def send(stream, message: dict):
+    """Write one framed JSON line."""
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+
+def serve(label: str):
+    """Serve tasks for one specialist until stdin closes."""
+    protocol = sys.stdout
+    # Specialists print freely; keep that off the protocol pipe
+    sys.stdout = sys.stderr
+
+    module_name, class_name = SPECIALISTS[label]
+    specialist = getattr(importlib.import_module(module_name), class_name)()
+    loop = asyncio.new_event_loop()
+    tasks = 0
+
+    send(protocol, {"type": "ready", "pid": os.getpid()})
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            send(protocol, {"id": None, "ok": False, "error": f"Bad request: {e}"})
+            continue
+
+        request_id = request.get("id")
+        if request.get("type") == "ping":
+            send(protocol, {"id": request_id, "ok": True, "result": "pong", "tasks": tasks})
+            continue
+
+        with trace(request.get("trace_id")), collect_spans() as spans:
+            try:
+                with span("handle_task", specialist=label):
+                    result = loop.run_until_complete(specialist.handle_task(request["task"]))
+                reply = {"id": request_id, "ok": True, "result": result}
+            except Exception as e:
+                reply = {"id": request_id, "ok": False, "error": str(e)}
+        send(protocol, dict(reply, spans=spans))
+        tasks += 1
+
+    loop.close()
+
+
+def main():
+    """Main entry point when spawned by the worker pool."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Specialist worker")
+    parser.add_argument("--specialist", required=True, choices=sorted(SPECIALISTS))
+    args = parser.parse_args()
+
+    serve(args.specialist)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Persistent priority task queue in front of the specialists.
+
+Tasks from the CLI, Discord and cron are written to a shared SQLite queue
+(betty_tasks.db) instead of running immediately:
+
+- priorities: interactive requests run before scheduled ones
+- per-specialist concurrency limits (config "concurrency", else pool size)
+- single-flight coalescing: a task whose dedupe_key matches a queued or
+  running task joins it and gets the same result, so three `!hedge_scan`s
+  start one scan
+- depth, wait-time and coalescing metrics
+
+The daemon's dispatcher (serve_all=True) runs any queued task of the kinds
+it has handlers for; other processes only run the tasks they submitted or
+joined, so a one-shot CLI never picks up a daemon or scheduled task. Claims
+are atomic, so the daemon, the CLI and cron can share one queue.
+
+Usage:
+    queue = TaskQueue({"execute": run_fn}, limits={"hedge-specialist": 1})
+    result = queue.execute("execute", "hedge-specialist", "scan 20",
+                           dedupe_key="hedge-specialist:scan_markets:20")
+
+    python3 task_queue.py stats|list|purge|recover
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from betty_tracing import current_trace_id, trace
+
+QUEUE_DB = Path(os.environ.get("BETTY_QUEUE_DB", "/tmp/betty_tasks.db"))
+
+PRIORITY_INTERACTIVE = 0    # CLI, Discord
+PRIORITY_SCHEDULED = 10     # cron / scheduler
+PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "scheduled": PRIORITY_SCHEDULED}
+
+DEFAULT_CONCURRENCY = 1
+POLL_INTERVAL = 0.25        # seconds; picks up work and results from other processes
+RESULT_TTL = 24 * 3600      # finished tasks kept for metrics
+METRICS_WINDOW = 3600
+TASK_TIMEOUT = float(os.environ.get("BETTY_TASK_TIMEOUT", 600))   # queue wait plus run; betty_client reads it too
+RECOVER_INTERVAL = 2.0      # seconds between sweeps for tasks orphaned by dead processes
+MAX_RUNNING = 32            # threads running claimed tasks in one process
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    specialist TEXT NOT NULL,
+    task TEXT NOT NULL,
+    dedupe_key TEXT,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    waiters INTEGER NOT NULL DEFAULT 1,
+    owner_pid INTEGER,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    trace_id TEXT,
+    timeout REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, priority, id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_inflight
+    ON tasks(dedupe_key) WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running');
+"""
+
+
+class QueuedTask(NamedTuple):
+    id: int
+    coalesced: bool
+
+
+class TaskFailed(RuntimeError):
+    """The queued task raised; the message is the stored error."""
+
+
+def default_dedupe_key(specialist: str, task: str) -> str:
+    return f"{specialist}:{' '.join(task.lower().split())}"
+
+
+def concurrency_limits(specialists: dict) -> dict:
+    """Per-specialist limits: "concurrency" from config, else the worker pool size."""
+    return {
+        label: spec.get("concurrency") or spec.get("pool", {}).get("size", DEFAULT_CONCURRENCY)
+        for label, spec in specialists.items()
+    }
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class TaskQueue:
+    """SQLite-backed priority queue with coalescing and per-specialist limits."""
+
+    def __init__(self, handlers: dict, limits: dict = None, path=QUEUE_DB,
+                 default_limit: int = DEFAULT_CONCURRENCY, serve_all: bool = False):
+        self.handlers = handlers         # kind -> fn(specialist, task, on_progress, timeout) -> str
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self.serve_all = serve_all       # False: only run tasks submitted or joined by this process
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+        for column, decl in (("trace_id", "TEXT"), ("timeout", "REAL")):
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} {decl}")   # queue from an older version
+                except sqlite3.OperationalError:
+                    pass   # another process added it first
+        conn.close()
+        self._wake = threading.Event()
+        self._changed = threading.Condition()
+        self._progress = {}              # task id -> [callbacks] of local waiters
+        self._own = set()                # ids this process submitted or joined and still waits on
+        self._stop = threading.Event()
+        self._dispatcher = None
+        self._executor = ThreadPoolExecutor(max_workers=MAX_RUNNING, thread_name_prefix="betty-queue")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def limit(self, specialist: str) -> int:
+        return self.limits.get(specialist, self.default_limit)
+
+    # --- Submitting ---------------------------------------------------------
+
+    def submit(self, kind: str, specialist: str, task: str, priority: int = PRIORITY_INTERACTIVE,
+               dedupe_key: str = None, on_progress=None, timeout: float = TASK_TIMEOUT) -> QueuedTask:
+        """Queue a task, or join the identical one already queued or running.
+
+        timeout is passed on to the handler as the time the submitter will wait.
+        """
+        dedupe_key = dedupe_key or default_dedupe_key(specialist, task)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, priority FROM tasks WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+                (dedupe_key,),
+            ).fetchone()
+            if row:
+                # Joining an interactive request lifts a queued scheduled task
+                conn.execute("UPDATE tasks SET waiters = waiters + 1, priority = MIN(priority, ?), "
+                             "timeout = MAX(COALESCE(timeout, 0), ?) WHERE id = ?",
+                             (priority, timeout, row[0]))
+                queued = QueuedTask(row[0], True)
+            else:
+                task_id = conn.execute(
+                    "INSERT INTO tasks (kind, specialist, task, dedupe_key, priority, submitted_at, trace_id, "
+                    "timeout) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, specialist, task, dedupe_key, priority, time.time(), current_trace_id(), timeout),
+                ).lastrowid
+                queued = QueuedTask(task_id, False)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        with self._changed:
+            self._own.add(queued.id)
+            if on_progress:
+                self._progress.setdefault(queued.id, []).append(on_progress)
+        self.start()
+        self._wake.set()
+        return queued
+
+    def wait(self, task_id: int, timeout: float = TASK_TIMEOUT, on_progress=None) -> str:
+        """Block until the task finishes (here or in another process)."""
+        deadline = time.monotonic() + timeout
+        conn = self._connect()
+        try:
+            while True:
+                status, result, error = conn.execute(
+                    "SELECT status, result, error FROM tasks WHERE id = ?", (task_id,)
+                ).fetchone()
+                if status == "done":
+                    return result
+                if status == "failed":
+                    raise TaskFailed(error)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Task {task_id} still {status} after {timeout:.0f}s")
+                with self._changed:
+                    self._changed.wait(min(POLL_INTERVAL, remaining))
+        finally:
+            conn.close()
+            with self._changed:
+                # Given up on or finished: leave a still-queued task to the daemon
+                self._own.discard(task_id)
+                if on_progress:
+                    callbacks = self._progress.get(task_id, [])
+                    if on_progress in callbacks:
+                        callbacks.remove(on_progress)
+                    if not callbacks:
+                        self._progress.pop(task_id, None)
+
+    def execute(self, kind: str, specialist: str, task: str, priority: int = PRIORITY_INTERACTIVE,
+                dedupe_key: str = None, on_progress=None, timeout: float = TASK_TIMEOUT) -> str:
+        """Submit and wait; coalesced callers share one execution and result."""
+        queued = self.submit(kind, specialist, task, priority, dedupe_key, on_progress, timeout)
+        return self.wait(queued.id, timeout, on_progress)
+
+    async def aexecute(self, *args, **kwargs) -> str:
+        """execute() for async callers, waiting off the event loop."""
+        return await asyncio.to_thread(self.execute, *args, **kwargs)
+
+    # --- Dispatching --------------------------------------------------------
+
+    def start(self):
+        """Start the dispatcher thread (idempotent)."""
+        if self._dispatcher and self._dispatcher.is_alive():
+            return
+        self.recover()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="betty-queue-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def recover(self) -> int:
+        """Requeue tasks whose running process has died."""
+        conn = self._connect()
+        try:
+            stale = [
+                task_id for task_id, pid in conn.execute(
+                    "SELECT id, owner_pid FROM tasks WHERE status = 'running'")
+                if not _pid_alive(pid)
+            ]
+            for task_id in stale:
+                conn.execute("UPDATE tasks SET status = 'queued', owner_pid = NULL, started_at = NULL "
+                             "WHERE id = ? AND status = 'running'", (task_id,))
+            return len(stale)
+        finally:
+            conn.close()
+
+    def _claim(self, conn):
+        """Atomically claim the best runnable task, or None."""
+        if not self.handlers:
+            return None
+        query = (f"SELECT id, kind, specialist, task, trace_id, timeout FROM tasks WHERE status = 'queued' "
+                 f"AND kind IN ({','.join('?' * len(self.handlers))})")
+        params = list(self.handlers)
+        if not self.serve_all:
+            with self._changed:
+                own = list(self._own)
+            if not own:
+                return None
+            query += f" AND id IN ({','.join('?' * len(own))})"
+            params += own
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            running = dict(conn.execute(
+                "SELECT specialist, COUNT(*) FROM tasks WHERE status = 'running' GROUP BY specialist"))
+            rows = conn.execute(query + " ORDER BY priority, id", params)
+            for task_id, kind, specialist, task, trace_id, timeout in rows:
+                if running.get(specialist, 0) < self.limit(specialist):
+                    conn.execute(
+                        "UPDATE tasks SET status = 'running', owner_pid = ?, started_at = ? WHERE id = ?",
+                        (os.getpid(), time.time(), task_id),
+                    )
+                    conn.execute("COMMIT")
+                    return task_id, kind, specialist, task, trace_id, timeout or TASK_TIMEOUT
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return None
+
+    def _dispatch_loop(self):
+        conn = None
+        last_purge = last_recover = 0.0
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn = conn or self._connect()
+                    # Rows left 'running' by a dead process hold their specialist's slots
+                    if time.monotonic() - last_recover > RECOVER_INTERVAL:
+                        last_recover = time.monotonic()
+                        self.recover()
+                    while (claimed := self._claim(conn)) is not None:
+                        self._executor.submit(self._run, *claimed)
+                    if time.monotonic() - last_purge > 3600:
+                        last_purge = time.monotonic()
+                        self.purge()
+                except Exception as e:
+                    # A locked or broken database must not stop the dispatcher for good
+                    print(f"⚠️  Task queue dispatcher error: {type(e).__name__}: {e}", file=sys.stderr)
+                    if conn is not None:
+                        conn.close()
+                        conn = None
+                self._wake.wait(POLL_INTERVAL)
+                self._wake.clear()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _run(self, task_id: int, kind: str, specialist: str, task: str, trace_id: str = None,
+             timeout: float = TASK_TIMEOUT):
+        def on_progress(event):
+            with self._changed:
+                callbacks = list(self._progress.get(task_id, ()))
+            for callback in callbacks:
+                callback(event)
+
+        result, error = None, None
+        try:
+            # Spans of the run join the submitter's trace, even from another process
+            with trace(trace_id):
+                result = self.handlers[kind](specialist, task, on_progress, timeout)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                ("failed" if error else "done", result, error, time.time(), task_id),
+            )
+        finally:
+            conn.close()
+        with self._changed:
+            self._changed.notify_all()
+        self._wake.set()   # a slot is free
+
+    def purge(self, max_age: float = RESULT_TTL) -> int:
+        """Delete finished tasks older than max_age."""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "DELETE FROM tasks WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - max_age,),
+            ).rowcount
+        finally:
+            conn.close()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._executor.shutdown(wait=False)
+
+    # --- Metrics ------------------------------------------------------------
+
+    def metrics(self, window: float = METRICS_WINDOW) -> dict:
+        """Queue depth, running counts, wait/run times and coalescing over `window` seconds."""
+        return queue_metrics(self.path, window)
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def queue_metrics(path=QUEUE_DB, window: float = METRICS_WINDOW) -> dict:
+    """Metrics straight from the queue database (no dispatcher needed)."""
+    conn = sqlite3.connect(str(path), timeout=30)
+    try:
+        conn.executescript(SCHEMA)
+        now = time.time()
+        depth = {s: n for s, n in conn.execute(
+            "SELECT specialist, COUNT(*) FROM tasks WHERE status = 'queued' GROUP BY specialist")}
+        running = {s: n for s, n in conn.execute(
+            "SELECT specialist, COUNT(*) FROM tasks WHERE status = 'running' GROUP BY specialist")}
+        oldest = conn.execute("SELECT MIN(submitted_at) FROM tasks WHERE status = 'queued'").fetchone()[0]
+        rows = conn.execute(
+            "SELECT specialist, started_at - submitted_at, finished_at - started_at, waiters, status "
+            "FROM tasks WHERE status IN ('done', 'failed') AND finished_at > ?",
+            (now - window,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    per_specialist = {}
+    for specialist, waited, ran, waiters, status in rows:
+        entry = per_specialist.setdefault(specialist, {"waits": [], "runs": [], "coalesced": 0, "failed": 0})
+        entry["waits"].append(waited)
+        entry["runs"].append(ran)
+        entry["coalesced"] += waiters - 1
+        entry["failed"] += status == "failed"
+
+    return {
+        "depth": depth,
+        "queued": sum(depth.values()),
+        "running": running,
+        "oldest_wait": now - oldest if oldest else 0.0,
+        "window": window,
+        "specialists": {
+            specialist: {
+                "completed": len(entry["runs"]),
+                "failed": entry["failed"],
+                "coalesced": entry["coalesced"],
+                "wait_p50": _percentile(entry["waits"], 50),
+                "wait_p95": _percentile(entry["waits"], 95),
+                "run_p50": _percentile(entry["runs"], 50),
+                "run_p95": _percentile(entry["runs"], 95),
+            }
+            for specialist, entry in per_specialist.items()
+        },
+    }
+
+
+def main():
+    """Show queue metrics, list active tasks, or clean up."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Betty task queue")
+    parser.add_argument("command", nargs="?", default="stats", choices=["stats", "list", "purge", "recover"])
+    parser.add_argument("--db", default=str(QUEUE_DB))
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(queue_metrics(args.db), indent=2))
+    elif args.command == "list":
+        conn = sqlite3.connect(args.db)
+        conn.executescript(SCHEMA)
+        now = time.time()
+        for row in conn.execute(
+                "SELECT id, status, priority, specialist, waiters, submitted_at, task FROM tasks "
+                "WHERE status IN ('queued', 'running') ORDER BY status DESC, priority, id"):
+            task_id, status, priority, specialist, waiters, submitted, task = row
+            print(f"#{task_id} {status:8} p{priority} {specialist:18} x{waiters} "
+                  f"{now - submitted:6.0f}s  {task[:60]}")
+        conn.close()
+    else:
+        queue = TaskQueue({}, path=args.db)
+        count = queue.purge() if args.command == "purge" else queue.recover()
+        print(f"✅ {'Purged' if args.command == 'purge' else 'Requeued'} {count} tasks")
+
+
+if __name__ == "__main__":
+    main()
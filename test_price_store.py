@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Regression tests for price_store.py (run: python3 -m pytest test_price_store.py)."""
+
+import array
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from price_store import RAW, PriceStore
+
+T0 = 1_780_000_000.0
+
+
+def test_append_after_interrupted_write_keeps_columns_aligned(tmp_path):
+    store = PriceStore(tmp_path, db_path=None)
+    store.append("m1", [(T0, 0.40, 0.60), (T0 + 60, 0.42, 0.58)])
+
+    # A writer died after the price columns but before ts: one orphan row in yes/no
+    raw = store._dir("m1", RAW)
+    for column, value in (("yes", 0.99), ("no", 0.01)):
+        with open(raw / f"{column}.bin", "ab") as f:
+            f.write(array.array("f", [value]).tobytes())
+
+    assert store.append("m1", [(T0 + 120, 0.45, 0.55)]) == 1
+
+    window = store.window("m1")
+    assert list(window["ts"]) == [T0, T0 + 60, T0 + 120]
+    assert [round(float(v), 2) for v in window["yes"]] == [0.40, 0.42, 0.45]
+    assert [round(float(v), 2) for v in window["no"]] == [0.60, 0.58, 0.55]
+    assert store.latest("m1") == (T0 + 120, window["yes"][-1], window["no"][-1])
+    for column in ("yes", "no"):
+        assert (raw / f"{column}.bin").stat().st_size == 3 * 4
+
+
+def test_rollups_survive_interrupted_write(tmp_path):
+    store = PriceStore(tmp_path, db_path=None)
+    store.append("m1", [(T0, 0.40, 0.60)])
+
+    hourly = store._dir("m1", "1h")
+    with open(hourly / "high.bin", "ab") as f:
+        f.write(b"\0" * 4)
+
+    store.append("m1", [(T0 + 7200, 0.50, 0.50)])
+
+    window = store.window("m1", resolution="1h")
+    assert len(window["ts"]) == len(window["high"]) == len(window["count"]) == 2
+    assert round(float(window["high"][-1]), 2) == 0.50